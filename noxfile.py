@@ -17,6 +17,7 @@ REQUIREMENT_IN_FILES = [
     pathlib.Path("requirements/requirements.in"),
     pathlib.Path("requirements/requirements-dev.in"),
     pathlib.Path("requirements/requirements-test.in"),
+    pathlib.Path("requirements/requirements-fast.in"),
 ]
 
 # What we allowed to clean (delete)
@@ -44,14 +44,20 @@ def gridsample(request: Request) -> HTMLResponse:
 
 
 @routes.get("/matchview")
-def matchview_main(request: Request, limit: int = 100, offset: int = 0) -> HTMLResponse:
+def matchview_main(
+    request: Request,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: str = "",
+) -> HTMLResponse:
     """Main view for MatchView model."""
     headers = {
-        "HX-Push-Url": f"/matchview?limit={limit}&offset={offset}",
+        "HX-Push-Url": _matchview_url(limit, offset, cursor),
     }
     context = {
         "limit": limit,
         "offset": offset,
+        "cursor": cursor,
     }
 
     return template.TemplateResponse(
@@ -81,12 +87,13 @@ def matchview_table(
     request: Request,
     limit: int = 100,
     offset: int = 0,
+    cursor: str = "",
 ) -> HTMLResponse:
     """Render table partial for MatchView"""
-    context = api_handler.get_matchview_context(limit, offset)
+    context = api_handler.get_matchview_context(limit, offset, cursor)
 
     headers = {
-        "HX-Push-Url": f"/matchview?limit={limit}&offset={offset}",
+        "HX-Push-Url": _matchview_url(limit, context.offset, context.cursor),
     }
 
     return template.TemplateResponse(
@@ -95,3 +102,10 @@ def matchview_table(
         context=context.to_dict(),
         headers=headers,
     )
+
+
+def _matchview_url(limit: int, offset: int, cursor: str) -> str:
+    """Url of a MatchView page, by cursor when there is one."""
+    if cursor:
+        return f"/matchview?limit={limit}&cursor={cursor}"
+    return f"/matchview?limit={limit}&offset={offset}"
@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
+import base64
+import json
 import logging
 
 from .database import Database as _Database
+from .model import MatchView
 from .model import MatchViewContext
 
 
@@ -19,34 +22,123 @@ class APIHandler:
         self,
         limit: int = 100,
         offset: int = 0,
+        cursor: str = "",
     ) -> MatchViewContext:
-        """Get a MatchViewContext object for rendering."""
+        """
+        Get a MatchViewContext object for rendering.
+
+        Args:
+            limit: Rows per page
+            offset: Rows skipped to reach the page, used when there is no cursor
+            cursor: Opaque position of a page, from `next_cursor` or
+                `previous_cursor` of a prior context
+        """
         row_count = self._database.match_count()
+        position = self._decode_cursor(cursor) if cursor else None
+        if position is None:
+            cursor = ""
+            offset = self._align_offset(limit, offset, row_count)
 
-        # Align pagination to valid values to prevent offset overflow on row delete
-        if offset > row_count:
-            offset = row_count // limit * limit
-
-            if offset == row_count:
-                offset = row_count - limit
+        offset, rows = self._get_page(limit, offset, position)
+        if offset == 0:
+            cursor = ""
+        matchviews, has_next = rows[:limit], len(rows) > limit
 
         total_pages = row_count // limit
         total_pages = total_pages + 1 if row_count % limit else total_pages
         current_page = (offset // limit) + 1
 
+        next_cursor = ""
+        if has_next and matchviews:
+            next_cursor = self._encode_cursor("after", offset + limit, matchviews[-1])
+
+        previous_cursor = ""
+        if offset > 0 and matchviews:
+            previous_offset = max(0, offset - limit)
+            previous_cursor = self._encode_cursor(
+                "before", previous_offset, matchviews[0]
+            )
+
         return MatchViewContext(
             limit=limit,
             offset=offset,
             current_page=current_page,
             total_pages=total_pages,
             total_rows=row_count,
-            matchviews=self._database.get_match_views(limit, offset),
+            matchviews=matchviews,
+            cursor=cursor,
+            next_cursor=next_cursor,
+            previous_cursor=previous_cursor,
         )
 
+    def _get_page(
+        self,
+        limit: int,
+        offset: int,
+        position: tuple[str, int, MatchView] | None,
+    ) -> tuple[int, list[MatchView]]:
+        """Return the offset and up to limit + 1 rows of a page, extra if more follow."""
+        if position is None:
+            return offset, self._database.get_match_views(limit + 1, offset)
+
+        direction, offset, row = position
+        if direction == "after":
+            return offset, self._database.get_match_views(limit + 1, after=row)
+
+        rows = self._database.get_match_views(limit + 1, before=row)
+        if len(rows) <= limit:
+            # Reached the first page, rows may have been deleted since
+            return 0, self._database.get_match_views(limit + 1)
+
+        # The row the cursor was taken from follows, so there is a next page
+        return offset, rows[1:] + [row]
+
+    @staticmethod
+    def _align_offset(limit: int, offset: int, row_count: int) -> int:
+        """Align pagination to valid values to prevent offset overflow on row delete."""
+        if offset > row_count:
+            offset = row_count // limit * limit
+
+            if offset == row_count:
+                offset = row_count - limit
+
+        return offset
+
     def delete_matchview(self, key: str) -> bool:
         """Delete a MatchView record."""
         return self._database.delete_match_view(key)
 
+    @staticmethod
+    def _encode_cursor(direction: str, offset: int, row: MatchView) -> str:
+        """Encode a page position as an opaque, url safe, cursor."""
+        position = {
+            "direction": direction,
+            "offset": offset,
+            "row": [row.date, row.key, row.match_name, row.match_value],
+        }
+        encoded = base64.urlsafe_b64encode(json.dumps(position).encode())
+        return encoded.decode().rstrip("=")
+
+    def _decode_cursor(self, cursor: str) -> tuple[str, int, MatchView] | None:
+        """Decode a cursor to (direction, offset, row), None if invalid."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded))
+            date, key, match_name, match_value = position["row"]
+            direction = position["direction"]
+            offset = int(position["offset"])
+
+        except (ValueError, TypeError, KeyError):
+            self.logger.warning("Invalid cursor ignored: %s", cursor)
+            return None
+
+        if direction not in ("after", "before"):
+            self.logger.warning("Invalid cursor ignored: %s", cursor)
+            return None
+
+        row = MatchView(key, date, "", "", match_name, match_value)
+        return direction, max(0, offset), row
+
     @staticmethod
     def _clean_split(text: str, delimiter: str = ",") -> list[str]:
         """Split text on delimeter, strips leading/trailing whitespace."""
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import logging
+
 from .paste_scanner import PasteScanner
 from .runtime import Runtime
 
@@ -10,6 +12,8 @@ runtime.load_config()
 runtime.set_logging()
 runtime.set_database(runtime.get_config().database_file)
 
+logger = logging.getLogger(__name__)
+
 
 def scan() -> int:
     """Point of entry for paste scanning."""
@@ -18,6 +22,25 @@ def scan() -> int:
         patterns=runtime.get_patterns(),
         pastebin_api=runtime.get_api(),
         save_paste_content=True,
+        scan_workers=runtime.get_config().scan_workers,
+        max_in_flight=runtime.get_config().scan_max_in_flight,
+        stream_chunk_size=runtime.get_config().stream_chunk_size,
+        stream_overlap=runtime.get_config().stream_overlap,
+        max_paste_bytes=runtime.get_config().max_paste_bytes,
+        max_saved_bytes=runtime.get_config().max_saved_bytes,
+        dedup_cache_size=runtime.get_config().dedup_cache_size,
+        near_duplicate_threshold=runtime.get_config().near_duplicate_threshold,
+        near_duplicate_capacity=runtime.get_config().near_duplicate_capacity,
+        near_duplicate_mode=runtime.get_config().near_duplicate_mode,
+        pipeline_queue_size=runtime.get_config().pipeline_queue_size,
+        pull_priority=runtime.get_pull_priority(),
+        scrape_target_overlap=runtime.get_config().scrape_target_overlap,
+        retry_base_delay=runtime.get_config().retry_base_delay,
+        retry_max_delay=runtime.get_config().retry_max_delay,
+        retry_max_attempts=runtime.get_config().retry_max_attempts,
+        seen_key_capacity=runtime.get_config().seen_key_capacity,
+        lease_seconds=runtime.get_config().lease_seconds,
+        async_api=runtime.get_async_api() if runtime.get_config().async_fetch else None,
     )
 
     gatherer.run()
@@ -25,5 +48,16 @@ def scan() -> int:
     return 0
 
 
+def rebuild_counters() -> int:
+    """Point of entry for recounting the rows of the counted tables."""
+    drift = runtime.get_database().rebuild_counters()
+    for name, off_by in drift.items():
+        # Drift is reported at the default logging level, matching counts are not
+        level = logging.WARNING if off_by else logging.INFO
+        logger.log(level, "Counter '%s' rebuilt, off by %d", name, off_by)
+
+    return 0
+
+
 if __name__ == "__main__":
     raise SystemExit(scan())
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import logging
+import time
 from collections.abc import Generator
 from collections.abc import Sequence
 from contextlib import closing
@@ -9,27 +11,173 @@ from contextlib import contextmanager
 from sqlite3 import Connection
 from sqlite3 import Cursor
 
+from wypt import migrations
 from wypt import model
 
+# Tables with row counts kept in the counter table
+COUNTED_TABLES = ("meta", "paste", "match")
+
 
 class Database:
-    def __init__(self, database_connection: Connection) -> None:
-        """Read/Write actions to the sqlite3 database."""
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        database_connection: Connection,
+        *,
+        commit_rows: int = 0,
+        commit_interval: float = 0.0,
+    ) -> None:
+        """
+        Read/Write actions to the sqlite3 database.
+
+        Paste, match, meta, retry, and lease release writes can be grouped
+        into a single commit, saving a sync of the database file for each.
+        Grouped rows are held in memory and written in one short transaction
+        when flushed, so no write lock is held between flushes. Reads flush
+        first so this connection sees its own writes at once. Other
+        connections see them once flushed.
+
+        Args:
+            database_connection: Connection to the sqlite3 database
+
+        Keyword Args:
+            commit_rows: When above zero, group writes until this many rows
+                are written
+            commit_interval: When above zero, group writes until the first
+                has waited this many seconds. Checked on each write, see
+                `.flush()` to commit on a timer.
+        """
         self._dbconn = database_connection
         self._nexts: dict[str, int] = {}
 
+        self._commit_rows = commit_rows
+        self._commit_interval = commit_interval
+        # Grouped writes of (sql, rows) in the order made
+        self._pending: list[tuple[str, list[Sequence[object]]]] = []
+        self._pending_rows = 0
+        self._pending_since = 0.0
+
+    @property
+    def commit_interval(self) -> float:
+        """Seconds writes are grouped for, zero if not grouped by time."""
+        return self._commit_interval
+
+    @property
+    def pending_rows(self) -> int:
+        """Rows held for a group commit and not yet written."""
+        return self._pending_rows
+
+    def flush(self) -> None:
+        """
+        Write and commit all grouped writes in one transaction.
+
+        Grouped writes are held until committed, a failed flush keeps them
+        to write again on the next.
+        """
+        with closing(self._dbconn.cursor()) as cursor:
+            try:
+                for sql, values in self._pending:
+                    cursor.executemany(sql, values)
+                self._dbconn.commit()
+
+            except BaseException:
+                self._dbconn.rollback()
+                raise
+
+        rows = self._pending_rows
+        self._pending = []
+        self._pending_rows = 0
+        if rows:
+            self.logger.debug("Committed %d grouped rows.", rows)
+
+    def _write(self, sql: str, values: list[Sequence[object]]) -> None:
+        """Write and commit rows, or hold them for a group commit when enabled."""
+        if self._commit_rows <= 0 and self._commit_interval <= 0:
+            with closing(self._dbconn.cursor()) as cursor:
+                cursor.executemany(sql, values)
+            self._dbconn.commit()
+            return
+
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append((sql, values))
+        self._pending_rows += max(1, len(values))
+
+        full = 0 < self._commit_rows <= self._pending_rows
+        waited = time.monotonic() - self._pending_since
+        if full or 0 < self._commit_interval <= waited:
+            self.flush()
+
+    @contextmanager
+    def _reader(self) -> Generator[Cursor, None, None]:
+        """Cursor for reads, grouped writes are committed first to be seen."""
+        if self._pending:
+            self.flush()
+        with closing(self._dbconn.cursor()) as cursor:
+            yield cursor
+
     def init_tables(self) -> None:
-        """Create/Add defined tables to the database."""
+        """Create/Add defined tables to the database, migrating existing tables."""
+        if self._table_exists("meta"):
+            count = migrations.migrate(self._dbconn)
+            if count:
+                self.logger.info("Applied %d database migrations.", count)
+        else:
+            migrations.set_version(self._dbconn, len(migrations.MIGRATIONS))
+
+        # Tables are created at the latest schema, indexes and triggers
+        # dropped by a migration are created again
         with self.cursor(commit_on_exit=True) as cursor:
             cursor.executescript(model.Paste.as_sql())
             cursor.executescript(model.Meta.as_sql())
             cursor.executescript(model.Match.as_sql())
+            cursor.executescript(model.Retry.as_sql())
+            cursor.executescript(model.Lease.as_sql())
+            cursor.executescript(model.Counter.as_sql())
+
+        with self.cursor(commit_on_exit=True) as cursor:
+            cursor.executescript(model.Paste.as_index_sql())
+
+    def _table_exists(self, table: str) -> bool:
+        """True if the table exists in the database."""
+        with closing(self._dbconn.cursor()) as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;",
+                (table,),
+            )
+            return cursor.fetchone() is not None
 
     def match_count(self) -> int:
         """Current count of rows on the match table."""
+        return self.get_counters().get("match", 0)
+
+    def get_counters(self) -> dict[str, int]:
+        """Return the row counts of the meta, paste, and match tables."""
+        with self._reader() as cursor:
+            query = cursor.execute("SELECT name, count FROM counter;")
+            return {name: count for name, count in query.fetchall()}
+
+    def rebuild_counters(self) -> dict[str, int]:
+        """
+        Recount the rows of counted tables, correcting any drift.
+
+        Returns:
+            The drift of each counter, the stored count less the actual count.
+        """
+        before = self.get_counters()
+        self.flush()
         with closing(self._dbconn.cursor()) as cursor:
-            query = cursor.execute("SELECT count(key) FROM match;")
-            return query.fetchone()[0]
+            cursor.execute("BEGIN IMMEDIATE;")
+            for name in COUNTED_TABLES:
+                cursor.execute(
+                    "INSERT OR REPLACE INTO counter "
+                    f"SELECT '{name}', count(*) FROM {name};"
+                )
+            self._dbconn.commit()
+
+        after = self.get_counters()
+        return {name: before.get(name, 0) - after[name] for name in COUNTED_TABLES}
 
     @contextmanager
     def cursor(self, *, commit_on_exit: bool = False) -> Generator[Cursor, None, None]:
@@ -61,37 +209,37 @@ class Database:
                     ?,
                     ?,
                     ?,
+                    CAST(? AS INTEGER),
+                    CAST(? AS INTEGER),
+                    CAST(? AS INTEGER),
                     ?,
                     ?,
                     ?,
-                    ?,
-                    ?,
-                    ?,
-                    ?
+                    CAST(? AS INTEGER)
                 )
         """
-        values = [list(meta.to_dict().values()) for meta in metas]
-
-        with closing(self._dbconn.cursor()) as cursor:
-            cursor.executemany(sql, values)
-            self._dbconn.commit()
+        values: list[Sequence[object]] = [
+            list(meta.to_dict().values()) for meta in metas
+        ]
+        self._write(sql, values)
 
     def insert_paste(self, paste: model.Paste) -> None:
         """Insert row into paste table. Constraint violations are ignored."""
         sql = """\
                 INSERT OR IGNORE INTO paste (
                     key,
-                    content
+                    content,
+                    truncated,
+                    digest
                 ) VALUES (
+                    ?,
+                    ?,
                     ?,
                     ?
                 )
         """
-        values = [paste.key, paste.content]
-
-        with closing(self._dbconn.cursor()) as cursor:
-            cursor.execute(sql, values)
-            self._dbconn.commit()
+        values = [paste.key, paste.content, paste.truncated, paste.digest]
+        self._write(sql, [values])
 
     def insert_matches(self, matches: Sequence[model.Match]) -> None:
         """Insert Match rows in batch. Primary key conflicts are ignored."""
@@ -106,24 +254,94 @@ class Database:
                     ?
                 )
         """
-        values = [list(match.to_dict().values()) for match in matches]
+        values: list[Sequence[object]] = [
+            list(match.to_dict().values()) for match in matches
+        ]
+        self._write(sql, values)
 
-        with closing(self._dbconn.cursor()) as cursor:
-            cursor.executemany(sql, values)
-            self._dbconn.commit()
+    def copy_matches(self, source_key: str, target_key: str) -> int:
+        """Copy the Match rows of one paste key to another, return count copied."""
+        existing = {
+            (match.match_name, match.match_value)
+            for match in self.get_matches(target_key)
+        }
+        matches = [
+            model.Match(target_key, match.match_name, match.match_value)
+            for match in self.get_matches(source_key)
+            if (match.match_name, match.match_value) not in existing
+        ]
+        if matches:
+            self.insert_matches(matches)
+        return len(matches)
+
+    def get_matches(self, key: str) -> list[model.Match]:
+        """Return the Match rows of a paste key."""
+        with self._reader() as cursor:
+            cursor.execute("SELECT * FROM match WHERE key = ?;", (key,))
+            rows = cursor.fetchall()
+
+        return [model.Match(*row) for row in rows]
+
+    def get_paste(self, key: str) -> model.Paste | None:
+        """
+        Return the Paste row of a paste key, None if not found.
+
+        Pastes stored by reference have no content of their own. Their content
+        is read from another paste with the same digest.
+        """
+        sql = """\
+            SELECT
+                paste.key,
+                CASE
+                    WHEN paste.content = '' AND paste.digest != '' THEN
+                        coalesce(
+                            (
+                                SELECT ref.content
+                                FROM paste AS ref
+                                WHERE ref.digest = paste.digest AND ref.content != ''
+                                LIMIT 1
+                            ),
+                            ''
+                        )
+                    ELSE paste.content
+                END,
+                paste.truncated,
+                paste.digest
+            FROM paste
+            WHERE paste.key = ?;
+        """
+        with self._reader() as cursor:
+            cursor.execute(sql, (key,))
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+        return model.Paste(
+            key=row[0], content=row[1], truncated=bool(row[2]), digest=row[3]
+        )
 
     def get_match_views(
         self,
         limit: int = 100,
         offset: int = 0,
+        *,
+        after: model.MatchView | None = None,
+        before: model.MatchView | None = None,
     ) -> list[model.MatchView]:
         """
-        Get a list of match views from the database.
+        Get a list of match views from the database, ordered by date.
+
+        Paging by `after` or `before` seeks to the given row on an index so
+        the cost of a page does not grow with its depth, unlike `offset`.
 
         Args:
             limit: Limit the number of rows to return.
             offset: Determine the offset start of the rows returned
 
+        Keyword Args:
+            after: Return rows following this row. Offset is ignored.
+            before: Return rows preceding this row. Offset is ignored.
+
         Returns:
             A list of model.MatchView object. List can be empty.
         """
@@ -136,19 +354,41 @@ class Database:
                 match.match_name,
                 match.match_value
             FROM
-                match
-                INNER JOIN meta ON meta.key = match.key
-            ORDER BY meta.date
+                -- CROSS JOIN keeps meta outer so rows are walked on meta_date
+                meta
+                CROSS JOIN match ON match.key = meta.key
+            {where}
+            ORDER BY
+                meta.date {order},
+                meta.key {order},
+                match.match_name {order},
+                match.match_value {order}
             LIMIT ? OFFSET ?;
         """
-        with closing(self._dbconn.cursor()) as cursor:
-            cursor.execute(sql, (limit, offset))
+        where = "(meta.date, meta.key, match.match_name, match.match_value)"
+        seek = after or before
+        values: list[object] = []
+        if seek is not None:
+            where = f"WHERE {where} {'>' if after else '<'} (?, ?, ?, ?)"
+            values = [seek.date, seek.key, seek.match_name, seek.match_value]
+            offset = 0
+        else:
+            where = ""
+
+        order = "ASC" if before is None else "DESC"
+        with self._reader() as cursor:
+            cursor.execute(
+                sql.format(where=where, order=order), (*values, limit, offset)
+            )
             rows = cursor.fetchall()
 
+        if before is not None:
+            rows.reverse()
+
         return [
             model.MatchView(
                 key=row[0],
-                date=row[1],
+                date=str(row[1]),
                 title=row[2],
                 full_url=row[3],
                 match_name=row[4],
@@ -157,6 +397,33 @@ class Database:
             for row in rows
         ]
 
+    def get_meta(self, key: str) -> model.Meta | None:
+        """Return the Meta row of a paste key, None if not found."""
+        with self._reader() as cursor:
+            cursor.execute("SELECT * FROM meta WHERE key = ?;", (key,))
+            row = cursor.fetchone()
+
+        return _to_meta(row) if row else None
+
+    def get_recent_meta_keys(self, limit: int = 25) -> list[str]:
+        """Return keys of the meta table, oldest to newest of the `limit` newest."""
+        sql = """\
+            SELECT key FROM (
+                SELECT
+                    key,
+                    date
+                FROM meta
+                ORDER BY date DESC
+                LIMIT ?
+            )
+            ORDER BY date;
+        """
+        with self._reader() as cursor:
+            cursor.execute(sql, (limit,))
+            rows = cursor.fetchall()
+
+        return [row[0] for row in rows]
+
     def get_keys_to_pull(self, limit: int = 25) -> list[str]:
         """Return keys from meta table that have not been pulled into paste table."""
         sql = """\
@@ -169,24 +436,237 @@ class Database:
                 paste.key IS NULL
             LIMIT ?;
         """
-        with closing(self._dbconn.cursor()) as cursor:
+        with self._reader() as cursor:
             cursor.execute(sql, (limit,))
             rows = cursor.fetchall()
 
         return [row[0] for row in rows]
 
+    def get_metas_to_pull(
+        self,
+        limit: int = 25,
+        *,
+        now: int = 0,
+        owner: str = "",
+        horizon: int = 0,
+    ) -> list[model.Meta]:
+        """
+        Return Meta rows, newest first, that have not been pulled into paste table.
+
+        Rows expiring within `horizon` seconds of `now` come before all others,
+        soonest first, so older pastes near expiry are not cut by the limit.
+
+        Rows of keys in the retry table are left out, see `get_retry_metas()`.
+
+        Args:
+            limit: Limit the number of rows to return.
+            now: Unix time. Rows with an expire time at or before it are left
+                out. Zero includes all rows.
+            owner: Rows leased by any other owner, unexpired at `now`, are
+                left out.
+            horizon: Seconds after `now` at which rows count as near expiry.
+                Zero, or a `now` of zero, orders all rows by date.
+        """
+        cutoff = now + horizon if now and horizon else 0
+        sql = """\
+            SELECT
+                meta.*
+            FROM
+                meta
+                LEFT JOIN paste ON paste.key = meta.key
+            WHERE
+                paste.key IS NULL
+                AND meta.key NOT IN (SELECT key FROM retry)
+                AND meta.key NOT IN (
+                    SELECT key FROM lease WHERE owner != ? AND expires > ?
+                )
+                AND (
+                    ? = 0
+                    OR meta.expire <= 0
+                    OR meta.expire > ?
+                )
+            ORDER BY
+                (meta.expire > 0 AND meta.expire <= ?) DESC,
+                CASE WHEN meta.expire > 0 AND meta.expire <= ? THEN meta.expire END,
+                meta.date DESC
+            LIMIT ?;
+        """
+        with self._reader() as cursor:
+            cursor.execute(sql, (owner, now, now, now, cutoff, cutoff, limit))
+            rows = cursor.fetchall()
+
+        return [_to_meta(row) for row in rows]
+
+    def claim_keys(
+        self,
+        keys: Sequence[str],
+        owner: str,
+        *,
+        now: float,
+        expires: float,
+    ) -> list[str]:
+        """
+        Lease keys to an owner, skipping keys leased to others until expired.
+
+        Claims are made in a single write transaction so no two owners can
+        claim the same key.
+
+        Args:
+            keys: Paste keys to claim
+            owner: Unique name of the claiming process
+            now: Unix time, leases expired at or before it are reclaimed
+            expires: Unix time the new leases expire
+
+        Returns:
+            The keys now leased to the owner.
+        """
+        sql = """\
+            INSERT INTO lease (key, owner, expires) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                owner = excluded.owner,
+                expires = excluded.expires
+            WHERE lease.owner = excluded.owner OR lease.expires <= ?;
+        """
+        claimed: list[str] = []
+        # Commit grouped writes so the claim takes the write lock
+        self.flush()
+        with closing(self._dbconn.cursor()) as cursor:
+            cursor.execute("BEGIN IMMEDIATE;")
+            try:
+                for key in keys:
+                    cursor.execute(sql, (key, owner, expires, now))
+                    if cursor.rowcount:
+                        claimed.append(key)
+
+            except BaseException:
+                self._dbconn.rollback()
+                raise
+
+            self._dbconn.commit()
+
+        return claimed
+
+    def renew_leases(self, keys: Sequence[str], owner: str, *, expires: float) -> int:
+        """Extend the leases of an owner on keys, return count renewed."""
+        sql = "UPDATE lease SET expires = ? WHERE key = ? AND owner = ?;"
+        with self._reader() as cursor:
+            cursor.executemany(sql, [(expires, key, owner) for key in keys])
+            self._dbconn.commit()
+            return cursor.rowcount
+
+    def release_leases(self, owner: str, keys: Sequence[str] | None = None) -> None:
+        """Release the leases of an owner on keys, or all if keys is None."""
+        if keys is None:
+            self._write("DELETE FROM lease WHERE owner = ?;", [(owner,)])
+        else:
+            self._write(
+                "DELETE FROM lease WHERE key = ? AND owner = ?;",
+                [(key, owner) for key in keys],
+            )
+
+    def get_retry(self, key: str) -> model.Retry | None:
+        """Return the Retry row of a paste key, None if not found."""
+        with self._reader() as cursor:
+            cursor.execute("SELECT * FROM retry WHERE key = ?;", (key,))
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+        return model.Retry(row[0], row[1], row[2], row[3], bool(row[4]))
+
+    def save_retry(self, retry: model.Retry) -> None:
+        """Insert or replace the Retry row of a paste key."""
+        sql = """\
+                INSERT OR REPLACE INTO retry (
+                    key,
+                    attempts,
+                    next_attempt,
+                    last_error,
+                    dead
+                ) VALUES (
+                    ?,
+                    ?,
+                    ?,
+                    ?,
+                    ?
+                )
+        """
+        values = list(retry.to_dict().values())
+        self._write(sql, [values])
+
+    def delete_retry(self, key: str) -> None:
+        """Delete the Retry row of a paste key if present."""
+        self._write("DELETE FROM retry WHERE key = ?;", [(key,)])
+
+    def get_retry_metas(self, now: float, limit: int = 25) -> list[model.Meta]:
+        """Return Meta rows of retries due at `now`, soonest due first."""
+        sql = """\
+            SELECT
+                meta.*
+            FROM
+                retry
+                INNER JOIN meta ON meta.key = retry.key
+                LEFT JOIN paste ON paste.key = retry.key
+            WHERE
+                paste.key IS NULL
+                AND retry.dead = 0
+                AND retry.next_attempt <= ?
+            ORDER BY retry.next_attempt
+            LIMIT ?;
+        """
+        with self._reader() as cursor:
+            cursor.execute(sql, (now, limit))
+            rows = cursor.fetchall()
+
+        return [_to_meta(row) for row in rows]
+
     def delete_match_view(self, key: str) -> bool:
-        """Delete a MatchView record from all tables."""
+        """
+        Delete a MatchView record from all tables.
+
+        Content of the paste that other pastes store by reference is moved to
+        one of them before the paste is deleted.
+        """
+        rehome_sql = """\
+            UPDATE paste SET content = (SELECT content FROM paste WHERE key = ?)
+            WHERE key = (
+                SELECT ref.key
+                FROM paste AS ref
+                INNER JOIN paste AS src ON src.digest = ref.digest
+                WHERE
+                    src.key = ?
+                    AND src.digest != ''
+                    AND src.content != ''
+                    AND ref.key != src.key
+                    AND ref.content = ''
+                    AND NOT EXISTS (
+                        SELECT 1 FROM paste AS other
+                        WHERE
+                            other.digest = src.digest
+                            AND other.content != ''
+                            AND other.key != src.key
+                    )
+                LIMIT 1
+            );
+        """
         queries = [
             "DELETE FROM match WHERE key = ?;",
             "DELETE FROM meta WHERE key = ?;",
             "DELETE FROM paste WHERE key = ?;",
+            "DELETE FROM retry WHERE key = ?;",
+            "DELETE FROM lease WHERE key = ?;",
         ]
         delete_count = 0
-        with closing(self._dbconn.cursor()) as cursor:
+        with self._reader() as cursor:
+            cursor.execute(rehome_sql, (key, key))
             for sql in queries:
                 cursor.execute(sql, (key,))
                 delete_count += cursor.rowcount
             self._dbconn.commit()
 
         return bool(delete_count)
+
+
+def _to_meta(row: Sequence[object]) -> model.Meta:
+    """Build a Meta from a row, integer columns are kept as str on the model."""
+    return model.Meta(*(str(value) for value in row))
@@ -9,22 +9,28 @@ class ThrottleError(Exception):
     def __init__(
         self,
         last_call: int | None = None,
-        cooldown: int | None = None,
+        cooldown: float | None = None,
+        *,
+        remaining: float | None = None,
     ) -> None:
         """
         Raise when action is not permitted by cooldown window.
 
         Args:
-            msg: Text of exception message
             last_call: Unix seconds since last call
             cooldown: Cooldown seconds
+            remaining: Seconds until the action is permitted. Computed from
+                last_call and cooldown if not given.
         """
         self.last_call = last_call
         self.cooldown = cooldown
         self.msg = "Item Scrape throttle has not expired"
 
-        diff = int(time.time()) - (last_call or 0)
-        super().__init__(f"{self.msg} - (Remaining cooldown: {diff} ({cooldown}")
+        if remaining is None:
+            remaining = (last_call or 0) + (cooldown or 0) - time.time()
+        self.remaining = max(0.0, remaining)
+
+        super().__init__(f"{self.msg} - (Remaining cooldown: {self.remaining:.3f}s)")
 
 
 class ResponseError(Exception):
@@ -46,3 +52,17 @@ class ResponseError(Exception):
         self.status_code = status_code
         self.msg = msg
         super().__init__(f"[{status_code}] - {str(method).upper()} - {msg}")
+
+
+class TransientError(Exception):
+    def __init__(self, msg: str, route: str | None = None) -> None:
+        """
+        Raise when a request fails in a way that may succeed on retry.
+
+        Args:
+            msg: Text of exception message
+            route: Route of the failed request
+        """
+        self.msg = msg
+        self.route = route
+        super().__init__(f"{route} - {msg}")
@@ -0,0 +1,88 @@
+"""
+Coverage of the recent pastes feed.
+
+Each scrape of the feed returns the newest pastes. When a response shares
+keys with the previous response, no pastes were missed between them. The
+share of repeated keys, the overlap, is used to size the next request so it
+reaches back just past the previous one.
+"""
+
+from __future__ import annotations
+
+import logging
+
+DEFAULT_LIMIT = 100
+MIN_LIMIT = 10
+MAX_LIMIT = 250
+
+
+class FeedCoverage:
+    """Track overlap of feed scrapes and the limit that keeps a target overlap."""
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        target_overlap: float = 0.0,
+        *,
+        min_limit: int = MIN_LIMIT,
+        max_limit: int = MAX_LIMIT,
+    ) -> None:
+        """
+        Create coverage tracking starting at the default limit.
+
+        Args:
+            target_overlap: Share, 0.0 to 1.0, of each response that should
+                repeat the previous response. Zero keeps the default limit.
+
+        Keyword Args:
+            min_limit: Smallest limit requested
+            max_limit: Largest limit requested
+        """
+        self._target_overlap = min(max(target_overlap, 0.0), 0.95)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._previous: set[str] | None = None
+
+        self.limit = DEFAULT_LIMIT
+        self.scrapes = 0
+        self.possible_gaps = 0
+        self.last_overlap = 0.0
+
+    def update(self, keys: list[str]) -> float:
+        """
+        Record the keys of a scrape, adjusting the limit of the next.
+
+        Args:
+            keys: Paste keys returned by the scrape
+
+        Returns:
+            The share of keys that repeat the previous scrape.
+        """
+        if not keys:
+            return 0.0
+
+        previous, self._previous = self._previous, set(keys)
+        self.scrapes += 1
+        if previous is None:
+            return 0.0
+
+        repeated = len(previous.intersection(keys))
+        self.last_overlap = repeated / len(keys)
+
+        if not repeated:
+            self.possible_gaps += 1
+            self.logger.warning("No overlap with the previous scrape, possible gap.")
+
+        if self._target_overlap > 0 and not repeated:
+            # The number of new keys is unknown, reach back as far as allowed
+            self.limit = self._max_limit
+        elif self._target_overlap > 0:
+            self.limit = self._next_limit(len(keys) - repeated)
+
+        return self.last_overlap
+
+    def _next_limit(self, new_count: int) -> int:
+        """Limit where `new_count` new keys leave the target share repeated."""
+        limit = round(new_count / (1 - self._target_overlap))
+        return min(max(limit, self._min_limit), self._max_limit)
@@ -0,0 +1,352 @@
+"""
+Versioned migrations of the database schema.
+
+The schema version is kept in `PRAGMA user_version`. A new database is
+created at the latest schema by the models and marked with the latest
+version. An existing database runs each migration after its version, in
+order, recording the version as each completes.
+
+A migration describes the change it makes as of the version it was written
+for, not as of the current models, so it can always be applied to a
+database created before it.
+
+Several processes may open the same database at once. The next migration is
+claimed in the `migration_claim` table, so only one process runs it while
+the others wait for the version to change. A claim not kept alive for
+`CLAIM_STALE_SECONDS` is taken over, left by a process that was stopped.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from collections.abc import Callable
+from collections.abc import Sequence
+from contextlib import closing
+from sqlite3 import Connection
+from sqlite3 import Cursor
+
+# Rows copied per transaction when rewriting a table
+BATCH_SIZE = 10_000
+
+# Seconds between checks for the migration claimed by another process
+CLAIM_POLL_SECONDS = 1.0
+
+# Seconds without a heartbeat before a migration claim is taken over
+CLAIM_STALE_SECONDS = 60.0
+
+CLAIM_SQL = """\
+    CREATE TABLE IF NOT EXISTS migration_claim (
+        owner text NOT NULL,
+        version integer NOT NULL,
+        heartbeat real NOT NULL
+    );
+"""
+
+Migration = Callable[[Connection], None]
+
+logger = logging.getLogger(__name__)
+
+
+def get_version(connection: Connection) -> int:
+    """Return the schema version of the database."""
+    return connection.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def set_version(connection: Connection, version: int) -> None:
+    """Set the schema version of the database."""
+    connection.execute(f"PRAGMA user_version = {int(version)};")
+    connection.commit()
+
+
+def migrate(
+    connection: Connection,
+    migrations: Sequence[Migration] | None = None,
+) -> int:
+    """
+    Run the migrations after the version of the database.
+
+    Each migration is claimed before it is run. While another process holds
+    the claim this waits for it to finish rather than running it again.
+
+    Args:
+        connection: Connection to an existing database
+        migrations: Migrations in version order, the first is version 1.
+            Defaults to all migrations.
+
+    Returns:
+        The number of migrations run by this connection.
+
+    Raises:
+        RuntimeError: Raised if the claim of a running migration was taken
+            over by another process. The database is left at the prior version.
+    """
+    migrations = MIGRATIONS if migrations is None else migrations
+    owner = uuid.uuid4().hex
+    connection.execute(CLAIM_SQL)
+    connection.commit()
+
+    count = 0
+    while True:
+        number = _claim_next(connection, len(migrations), owner)
+        if number is None:
+            return count
+
+        if number == 0:
+            time.sleep(CLAIM_POLL_SECONDS)
+            continue
+
+        migration = migrations[number - 1]
+        logger.info("Migrating database to version %d: %s", number, migration.__doc__)
+        try:
+            migration(connection)
+            _complete_claim(connection, number, owner)
+
+        except BaseException:
+            # Free the claim so others need not wait for it to be stale
+            connection.rollback()
+            connection.execute("DELETE FROM migration_claim WHERE owner = ?;", (owner,))
+            connection.commit()
+            raise
+
+        count += 1
+
+
+def _claim_next(connection: Connection, target: int, owner: str) -> int | None:
+    """
+    Claim the migration after the version of the database.
+
+    Returns:
+        The version claimed, zero if claimed by another process, or None if
+        the database is at the target version.
+    """
+    with closing(connection.cursor()) as cursor:
+        cursor.execute("BEGIN IMMEDIATE;")
+        try:
+            version = get_version(connection)
+            if version >= target:
+                connection.commit()
+                return None
+
+            now = time.time()
+            cursor.execute("SELECT owner, heartbeat FROM migration_claim;")
+            claim = cursor.fetchone()
+            if claim is not None and claim[0] != owner:
+                if now - claim[1] < CLAIM_STALE_SECONDS:
+                    connection.commit()
+                    return 0
+                logger.warning("Taking over stale migration claim of %s.", claim[0])
+
+            cursor.execute("DELETE FROM migration_claim;")
+            cursor.execute(
+                "INSERT INTO migration_claim (owner, version, heartbeat) "
+                "VALUES (?, ?, ?);",
+                (owner, version + 1, now),
+            )
+
+        except BaseException:
+            connection.rollback()
+            raise
+
+        connection.commit()
+        return version + 1
+
+
+def _complete_claim(connection: Connection, version: int, owner: str) -> None:
+    """Record the version reached and release the claim in one transaction."""
+    with closing(connection.cursor()) as cursor:
+        cursor.execute("BEGIN IMMEDIATE;")
+        try:
+            _check_claim(cursor, owner)
+            cursor.execute(f"PRAGMA user_version = {int(version)};")
+            cursor.execute("DELETE FROM migration_claim WHERE owner = ?;", (owner,))
+
+        except BaseException:
+            connection.rollback()
+            raise
+
+        connection.commit()
+
+
+def _check_claim(cursor: Cursor, owner: str | None = None) -> str:
+    """
+    Keep the migration claim alive, returning its owner.
+
+    Args:
+        cursor: Cursor within the write transaction of the caller
+        owner: Owner expected to hold the claim, any owner if None
+
+    Raises:
+        RuntimeError: Raised if the claim is not held by the owner.
+    """
+    cursor.execute("SELECT owner FROM migration_claim;")
+    claim = cursor.fetchone()
+    if claim is None or (owner is not None and claim[0] != owner):
+        raise RuntimeError(f"Migration claim of {owner} was taken over.")
+
+    cursor.execute(
+        "UPDATE migration_claim SET heartbeat = ? WHERE owner = ?;",
+        (time.time(), claim[0]),
+    )
+    return claim[0]
+
+
+def _integer_meta_columns(connection: Connection) -> None:
+    """Store meta date, size, expire, and hits as integers."""
+    _copy_and_swap(
+        connection,
+        "meta",
+        """\
+            CREATE TABLE meta_migrate (
+                key text NOT NULL,
+                scrape_url text NOT NULL,
+                full_url text NOT NULL,
+                date integer NOT NULL,
+                size integer NOT NULL,
+                expire integer NOT NULL,
+                title text NOT NULL,
+                syntax text NOT NULL,
+                user text NOT NULL,
+                hits integer NOT NULL
+            );
+        """,
+        """\
+            key,
+            scrape_url,
+            full_url,
+            CAST(date AS INTEGER),
+            CAST(size AS INTEGER),
+            CAST(expire AS INTEGER),
+            title,
+            syntax,
+            user,
+            CAST(hits AS INTEGER)
+        """,
+    )
+
+
+def _paste_truncated_and_digest(connection: Connection) -> None:
+    """Add the truncated and digest columns of paste."""
+    columns = {
+        "truncated": "integer NOT NULL DEFAULT 0",
+        "digest": "text NOT NULL DEFAULT ''",
+    }
+    with closing(connection.cursor()) as cursor:
+        cursor.execute("BEGIN IMMEDIATE;")
+        try:
+            _check_claim(cursor)
+            # Absent if never created, then created by the models with columns
+            existing = {row[1] for row in cursor.execute("PRAGMA table_info(paste);")}
+            for name, definition in columns.items():
+                if existing and name not in existing:
+                    cursor.execute(f"ALTER TABLE paste ADD COLUMN {name} {definition};")
+
+        except BaseException:
+            connection.rollback()
+            raise
+
+        connection.commit()
+
+
+def _copy_and_swap(
+    connection: Connection,
+    table: str,
+    create_sql: str,
+    select_sql: str,
+) -> None:
+    """
+    Rewrite a table by copying its rows into a new table then swapping them.
+
+    Rows are copied by rowid in batches, each its own transaction, so other
+    connections keep reading and writing between batches. The swap copies
+    rows written since the last batch, drops rows deleted since, and moves
+    the indexes and triggers of the table, all within a single transaction.
+
+    The new table is created by the owner of the migration claim. Each batch
+    keeps the claim alive, and the swap is only made while the claim is still
+    held, so a new table recreated by a process taking over is never swapped
+    in by the process that lost it.
+
+    Args:
+        connection: Connection to the database
+        table: Name of the table to rewrite
+        create_sql: Creates the new table, named `<table>_migrate`
+        select_sql: Columns selected from the old table into the new
+
+    Raises:
+        RuntimeError: Raised if the migration is not claimed, or the claim was
+            taken over. The table is left as it was.
+    """
+    new_table = f"{table}_migrate"
+    copy_sql = f"""\
+        INSERT INTO {new_table} (rowid, {_column_names(connection, table)})
+        SELECT rowid, {select_sql} FROM {table}
+        WHERE rowid > ? ORDER BY rowid LIMIT ?;
+    """
+
+    with closing(connection.cursor()) as cursor:
+        cursor.execute("BEGIN IMMEDIATE;")
+        try:
+            owner = _check_claim(cursor)
+            # Left behind if a prior attempt was interrupted
+            cursor.execute(f"DROP TABLE IF EXISTS {new_table};")
+            cursor.execute(create_sql)
+            connection.commit()
+
+            last_rowid = 0
+            while True:
+                cursor.execute(copy_sql, (last_rowid, BATCH_SIZE))
+                if cursor.rowcount <= 0:
+                    break
+                last_rowid = cursor.execute(
+                    f"SELECT max(rowid) FROM {new_table};"
+                ).fetchone()[0]
+                _check_claim(cursor, owner)
+                connection.commit()
+                logger.debug("Copied %s rows through rowid %d.", table, last_rowid)
+
+        except BaseException:
+            connection.rollback()
+            raise
+
+        # Ends the transaction of the final, empty, batch
+        connection.commit()
+        cursor.execute("BEGIN IMMEDIATE;")
+        try:
+            # The new table is still the one this run created
+            _check_claim(cursor, owner)
+            cursor.execute(copy_sql, (last_rowid, -1))
+            cursor.execute(
+                f"DELETE FROM {new_table} WHERE rowid NOT IN (SELECT rowid FROM {table});"
+            )
+            cursor.execute(
+                "SELECT sql FROM sqlite_master "
+                "WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL;",
+                (table,),
+            )
+            schema = [row[0] for row in cursor.fetchall()]
+
+            cursor.execute(f"DROP TABLE {table};")
+            cursor.execute(f"ALTER TABLE {new_table} RENAME TO {table};")
+            for sql in schema:
+                cursor.execute(sql)
+
+        except BaseException:
+            connection.rollback()
+            raise
+
+        connection.commit()
+
+
+def _column_names(connection: Connection, table: str) -> str:
+    """Return the column names of a table, comma separated in table order."""
+    rows = connection.execute(f"PRAGMA table_info({table});").fetchall()
+    return ", ".join(row[1] for row in rows)
+
+
+# Version N of the schema is reached by running MIGRATIONS[N - 1]
+MIGRATIONS: list[Migration] = [
+    _integer_meta_columns,
+    _paste_truncated_and_digest,
+]
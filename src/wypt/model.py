@@ -6,7 +6,7 @@ import dataclasses
 import json
 from datetime import datetime
 
-__all__ = ["Serializable", "Meta", "Paste", "Match"]
+__all__ = ["Serializable", "Meta", "Paste", "Match", "Retry", "Lease", "Counter"]
 
 
 @dataclasses.dataclass(frozen=True)
@@ -54,19 +54,21 @@ class Meta(Serializable):
                 key text NOT NULL,
                 scrape_url text NOT NULL,
                 full_url text NOT NULL,
-                date text NOT NULL,
-                size text NOT NULL,
-                expire text NOT NULL,
+                date integer NOT NULL,
+                size integer NOT NULL,
+                expire integer NOT NULL,
                 title text NOT NULL,
                 syntax text NOT NULL,
                 user text NOT NULL,
-                hits text NOT NULL
+                hits integer NOT NULL
             );
 
             -- Create a unique index on the paste_key
             CREATE UNIQUE INDEX IF NOT EXISTS meta_key ON meta(key);
             -- Create an index on the syntax flag for searching
             CREATE INDEX IF NOT EXISTS syntax_flag ON meta(syntax);
+            -- Create an index to page through matches in date order
+            CREATE INDEX IF NOT EXISTS meta_date ON meta(date, key);
         """
 
 
@@ -80,11 +82,21 @@ class Paste(Serializable):
 
     key: str
     content: str
+    truncated: bool = False
+    digest: str = ""
 
     def __str__(self) -> str:
         url = "https://pastebin.com/"
         return f"{url + self.key:21} | {self.content[:51]:51}"
 
+    @staticmethod
+    def as_index_sql() -> str:
+        """Render indexes on added columns, run once the columns exist."""
+        return """\
+            -- Create an index on the content digest to find shared content
+            CREATE INDEX IF NOT EXISTS paste_digest ON paste(digest);
+        """
+
     @staticmethod
     def as_sql() -> str:
         """Render model as sql table creation string."""
@@ -92,7 +104,9 @@ class Paste(Serializable):
             -- Order of table columns much match the `Paste` dataclass model.
             CREATE TABLE IF NOT EXISTS paste (
                 key text NOT NULL,
-                content text NOT NULL
+                content text NOT NULL,
+                truncated integer NOT NULL DEFAULT 0,
+                digest text NOT NULL DEFAULT ''
             );
 
             -- Create a unique index on the paste key
@@ -131,6 +145,136 @@ class Match(Serializable):
         """
 
 
+@dataclasses.dataclass(frozen=True)
+class Retry(Serializable):
+    """
+    Model data from the `retry` table.
+
+    NOTE: Order of attributes is important and should match the respective table.
+    """
+
+    key: str
+    attempts: int
+    next_attempt: float
+    last_error: str
+    dead: bool = False
+
+    def __str__(self) -> str:
+        state = "dead" if self.dead else f"next {self.next_attempt:.0f}"
+        return (
+            f"{self.key:8} | {self.attempts:2} attempts | {state} | {self.last_error}"
+        )
+
+    @staticmethod
+    def as_sql() -> str:
+        """Render model as sql table creation string."""
+        return """\
+            -- Order of table columns much match the `Retry` dataclass model.
+            CREATE TABLE IF NOT EXISTS retry (
+                key text NOT NULL,
+                attempts integer NOT NULL,
+                next_attempt real NOT NULL,
+                last_error text NOT NULL,
+                dead integer NOT NULL DEFAULT 0
+            );
+
+            -- Create a unique index on the paste key
+            CREATE UNIQUE INDEX IF NOT EXISTS retry_key ON retry(key);
+            -- Create an index to find retries that are due
+            CREATE INDEX IF NOT EXISTS retry_due ON retry(dead, next_attempt);
+        """
+
+
+@dataclasses.dataclass(frozen=True)
+class Lease(Serializable):
+    """
+    Model data from the `lease` table.
+
+    NOTE: Order of attributes is important and should match the respective table.
+    """
+
+    key: str
+    owner: str
+    expires: float
+
+    def __str__(self) -> str:
+        return f"{self.key:8} | {self.owner[:40]:40} | {self.expires:.0f}"
+
+    @staticmethod
+    def as_sql() -> str:
+        """Render model as sql table creation string."""
+        return """\
+            -- Order of table columns much match the `Lease` dataclass model.
+            CREATE TABLE IF NOT EXISTS lease (
+                key text NOT NULL,
+                owner text NOT NULL,
+                expires real NOT NULL
+            );
+
+            -- Create a unique index on the paste key
+            CREATE UNIQUE INDEX IF NOT EXISTS lease_key ON lease(key);
+            -- Create an index to find the leases of an owner
+            CREATE INDEX IF NOT EXISTS lease_owner ON lease(owner);
+        """
+
+
+@dataclasses.dataclass(frozen=True)
+class Counter(Serializable):
+    """
+    Model data from the `counter` table.
+
+    NOTE: Order of attributes is important and should match the respective table.
+    """
+
+    name: str
+    count: int
+
+    def __str__(self) -> str:
+        return f"{self.name:8} | {self.count}"
+
+    @staticmethod
+    def as_sql() -> str:
+        """Render model as sql table and trigger creation string."""
+        return """\
+            -- Order of table columns much match the `Counter` dataclass model.
+            CREATE TABLE IF NOT EXISTS counter (
+                name text PRIMARY KEY,
+                count integer NOT NULL
+            );
+
+            -- Count rows already stored when the counters are first created
+            INSERT OR IGNORE INTO counter SELECT 'meta', count(*) FROM meta;
+            INSERT OR IGNORE INTO counter SELECT 'paste', count(*) FROM paste;
+            INSERT OR IGNORE INTO counter SELECT 'match', count(*) FROM match;
+
+            -- Keep counters exact as rows are inserted and deleted
+            CREATE TRIGGER IF NOT EXISTS meta_count_insert AFTER INSERT ON meta
+            BEGIN
+                UPDATE counter SET count = count + 1 WHERE name = 'meta';
+            END;
+            CREATE TRIGGER IF NOT EXISTS meta_count_delete AFTER DELETE ON meta
+            BEGIN
+                UPDATE counter SET count = count - 1 WHERE name = 'meta';
+            END;
+            CREATE TRIGGER IF NOT EXISTS paste_count_insert AFTER INSERT ON paste
+            BEGIN
+                UPDATE counter SET count = count + 1 WHERE name = 'paste';
+            END;
+            CREATE TRIGGER IF NOT EXISTS paste_count_delete AFTER DELETE ON paste
+            BEGIN
+                UPDATE counter SET count = count - 1 WHERE name = 'paste';
+            END;
+            CREATE TRIGGER IF NOT EXISTS match_count_insert AFTER INSERT ON match
+            BEGIN
+                UPDATE counter SET count = count + 1 WHERE name = 'match';
+            END;
+            CREATE TRIGGER IF NOT EXISTS match_count_delete AFTER DELETE ON match
+            BEGIN
+                UPDATE counter SET count = count - 1 WHERE name = 'match';
+            END;
+        """
+
+
 @dataclasses.dataclass(frozen=True)
 class MatchView(Serializable):
     """A view of a match used by the web front-end to render results."""
@@ -153,3 +297,6 @@ class MatchViewContext(Serializable):
     total_pages: int
     total_rows: int
     matchviews: list[MatchView]
+    cursor: str = ""
+    next_cursor: str = ""
+    previous_cursor: str = ""
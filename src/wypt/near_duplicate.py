@@ -0,0 +1,155 @@
+"""
+Find pastes that are near-identical to recently scanned pastes.
+
+Pastes are fingerprinted with a 64-bit SimHash over their distinct lines.
+Template spam that differs only by a timestamp or tracking link changes few
+lines, leaving fingerprints a small Hamming distance apart. Fingerprints are
+split into bands and indexed per band. Two fingerprints within the allowed
+distance always share at least one identical band, so only pastes sharing
+a band are compared.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import logging
+from collections import OrderedDict
+
+FINGERPRINT_BITS = 64
+DEFAULT_CAPACITY = 1_000
+
+
+@dataclasses.dataclass(frozen=True)
+class Fingerprint:
+    """SimHash of a paste and the hashes of its distinct lines."""
+
+    value: int
+    lines: frozenset[int]
+
+
+class NearDuplicateIndex:
+    """Banded index of recent paste fingerprints."""
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, threshold: float, capacity: int = DEFAULT_CAPACITY) -> None:
+        """
+        Create an index of recent paste fingerprints.
+
+        Args:
+            threshold: Similarity, 0.0 to 1.0, at or above which pastes are
+                near-duplicates. Measured as the share of equal fingerprint bits.
+            capacity: Number of recent fingerprints kept, oldest dropped first.
+        """
+        self._max_distance = int((1.0 - threshold) * FINGERPRINT_BITS)
+        self._capacity = max(1, capacity)
+
+        band_count = min(self._max_distance + 1, FINGERPRINT_BITS)
+        band_width = FINGERPRINT_BITS // band_count
+        self._bands = [
+            (index * band_width, (1 << band_width) - 1) for index in range(band_count)
+        ]
+        # The last band takes the remaining bits
+        start, _ = self._bands[-1]
+        self._bands[-1] = (start, (1 << (FINGERPRINT_BITS - start)) - 1)
+
+        self._entries: OrderedDict[str, Fingerprint] = OrderedDict()
+        self._buckets: dict[tuple[int, int], set[str]] = {}
+
+        self.hits = 0
+        self.skipped_bytes = 0
+
+    @staticmethod
+    def fingerprint(content: str | bytes) -> Fingerprint:
+        """Compute the fingerprint of content."""
+        lines = frozenset(_hash_line(line) for line in content.splitlines())
+
+        value = 0
+        majority = len(lines) / 2
+        for bit in range(FINGERPRINT_BITS):
+            mask = 1 << bit
+            if sum(1 for line in lines if line & mask) > majority:
+                value |= mask
+
+        return Fingerprint(value, lines)
+
+    def find(self, fingerprint: Fingerprint) -> tuple[str, Fingerprint] | None:
+        """Return the closest indexed (key, fingerprint) within the threshold."""
+        candidates: set[str] = set()
+        for band in self._band_values(fingerprint.value):
+            candidates.update(self._buckets.get(band, ()))
+
+        best: tuple[int, str] | None = None
+        for key in candidates:
+            distance = (self._entries[key].value ^ fingerprint.value).bit_count()
+            if distance <= self._max_distance and (best is None or distance < best[0]):
+                best = (distance, key)
+
+        if best is None:
+            return None
+
+        self._entries.move_to_end(best[1])
+        return best[1], self._entries[best[1]]
+
+    def add(self, key: str, fingerprint: Fingerprint) -> None:
+        """Index a fingerprint, dropping the oldest beyond capacity."""
+        self._remove(key)
+        self._entries[key] = fingerprint
+        for band in self._band_values(fingerprint.value):
+            self._buckets.setdefault(band, set()).add(key)
+
+        while len(self._entries) > self._capacity:
+            self._remove(next(iter(self._entries)))
+
+    def diff(
+        self,
+        content: str | bytes,
+        reference: Fingerprint,
+    ) -> str | bytes:
+        """
+        Return the lines of content not found in the reference paste.
+
+        The count of bytes left out is added to `.skipped_bytes`.
+        """
+        lines = content.splitlines(keepends=True)
+        kept = [line for line in lines if _hash_line(line) not in reference.lines]
+        diff = content[:0].join(kept)  # type: ignore[arg-type]
+
+        self.hits += 1
+        self.skipped_bytes += len(content) - len(diff)
+        return diff
+
+    def skip(self, content: str | bytes) -> str | bytes:
+        """Return empty content, adding all of its bytes to `.skipped_bytes`."""
+        self.hits += 1
+        self.skipped_bytes += len(content)
+        return content[:0]
+
+    def _remove(self, key: str) -> None:
+        """Remove a key from the index if present."""
+        fingerprint = self._entries.pop(key, None)
+        if fingerprint is None:
+            return
+
+        for band in self._band_values(fingerprint.value):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _band_values(self, value: int) -> list[tuple[int, int]]:
+        """Split a fingerprint into (band index, band bits)."""
+        return [
+            (index, (value >> start) & mask)
+            for index, (start, mask) in enumerate(self._bands)
+        ]
+
+
+def _hash_line(line: str | bytes) -> int:
+    """Hash a line, ignoring surrounding whitespace, to a 64-bit integer."""
+    if isinstance(line, str):
+        line = line.encode()
+    digest = hashlib.blake2b(line.strip(), digest_size=FINGERPRINT_BITS // 8)
+    return int.from_bytes(digest.digest(), "big")
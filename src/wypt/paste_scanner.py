@@ -4,15 +4,104 @@ Gather and scan paste data from pastebin.
 
 from __future__ import annotations
 
+import asyncio
+import codecs
+import functools
+import hashlib
 import logging
+import math
+import os
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from collections import deque
+from collections.abc import Callable
+from collections.abc import Generator
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+from typing import TypeVar
 
 from .database import Database as _Database
+from .exceptions import ResponseError as _ResponseError
+from .exceptions import ThrottleError as _ThrottleError
+from .exceptions import TransientError as _TransientError
+from .feed_coverage import FeedCoverage as _FeedCoverage
 from .model import Match
+from .model import Meta
 from .model import Paste
+from .near_duplicate import Fingerprint as _Fingerprint
+from .near_duplicate import NearDuplicateIndex as _NearDuplicateIndex
+from .pastebin_api import AsyncPastebinAPI as _AsyncPastebinAPI
 from .pastebin_api import PastebinAPI as _PastebinAPI
+from .pastebin_api import PasteStream as _PasteStream
 from .pattern_config import PatternConfig as _PatternConfig
+from .pattern_config import PatternStats as _PatternStats
+from .pipeline import AsyncStage as _AsyncStage
+from .pipeline import Stage as _Stage
+from .pipeline import StageStats as _StageStats
+from .pull_queue import EXPIRY_HORIZON as _EXPIRY_HORIZON
+from .pull_queue import PullPriority as _PullPriority
+from .pull_queue import PullQueue as _PullQueue
+from .retry_queue import RetryQueue as _RetryQueue
+from .scheduler import Scheduler as _Scheduler
+from .seen_keys import SeenKeys as _SeenKeys
 
 PULL_PASTE_LIMIT = 100
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_STREAM_OVERLAP = 1_024
+DEFAULT_MAX_SAVED_BYTES = 1_048_576
+DIGEST_SIZE = 16
+NEAR_DUPLICATE_MODES = ("skip", "diff")
+
+# Result of a pooled scan: (paste key, content length, [(label, value), ...],
+# cost accounting of the patterns called)
+_ScanResult = tuple[str, int, list[tuple[str, str]], list[_PatternStats]]
+
+# Paste key handed to fetching: (paste key, syntax)
+_FetchItem = tuple[str, str | None]
+
+# Fetched paste handed to scanning: (paste key, content, syntax)
+_ScanItem = tuple[str, str | bytes, str | None]
+
+# Content scanned with the patterns of a syntax: (content digest, syntax)
+_DigestKey = tuple[str, str | None]
+
+_T = TypeVar("_T")
+
+# Compiled patterns held by each scan worker process
+_worker_patterns: _PatternConfig | None = None
+
+
+def _content_digest(content: str | bytes) -> str:
+    """Return the hex digest used to identify identical paste content."""
+    if isinstance(content, str):
+        content = content.encode()
+    return hashlib.blake2b(content, digest_size=DIGEST_SIZE).hexdigest()
+
+
+def _contains(content: str | bytes, value: str) -> bool:
+    """True if a saved match value is present in content."""
+    if isinstance(content, bytes):
+        return value.encode() in content
+    return value in content
+
+
+def _init_scan_worker(patterns: _PatternConfig) -> None:
+    """Store the patterns, recompiled on unpickle, for the worker process."""
+    global _worker_patterns
+    _worker_patterns = patterns
+
+
+def _scan_worker(key: str, content: str | bytes, syntax: str | None) -> _ScanResult:
+    """Scan content in a worker process."""
+    if _worker_patterns is None:  # pragma: no cover
+        raise RuntimeError("Scan worker was not initialized with patterns.")
+    results = _worker_patterns.scan(content, syntax=syntax)
+    # Stats of the worker copy are returned so the scanner can merge them
+    return key, len(content), results, _worker_patterns.pop_stats()
 
 
 class PasteScanner:
@@ -27,6 +116,25 @@ class PasteScanner:
         pastebin_api: _PastebinAPI,
         *,
         save_paste_content: bool = False,
+        scan_workers: int = 0,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        stream_chunk_size: int = 0,
+        stream_overlap: int = DEFAULT_STREAM_OVERLAP,
+        max_paste_bytes: int = 0,
+        max_saved_bytes: int = DEFAULT_MAX_SAVED_BYTES,
+        dedup_cache_size: int = 0,
+        near_duplicate_threshold: float = 0.0,
+        near_duplicate_capacity: int = 1_000,
+        near_duplicate_mode: str = "diff",
+        pipeline_queue_size: int = 0,
+        pull_priority: _PullPriority | None = None,
+        scrape_target_overlap: float = 0.2,
+        retry_base_delay: float = 30.0,
+        retry_max_delay: float = 3_600.0,
+        retry_max_attempts: int = 5,
+        seen_key_capacity: int = 10_000,
+        lease_seconds: float = 0.0,
+        async_api: _AsyncPastebinAPI | None = None,
     ) -> None:
         """
         Initialize PasteScanner controller class.
@@ -36,80 +144,902 @@ class PasteScanner:
             patterns: PatternConfig provider
             pastebin_api: PastebinAPI provider
             save_paste_content: When true, full paste content saved to database
+            scan_workers: When above zero, scan in a pool of this many processes
+            max_in_flight: Limit of pastes waiting on the scan pool at once
+            stream_chunk_size: When above zero, stream pastes and scan in chunks
+                of this many bytes. Streamed pastes are always scanned inline.
+            stream_overlap: Length carried between chunks so matches crossing a
+                chunk boundary are found
+            max_paste_bytes: Stop reading streamed pastes after this many bytes,
+                marking the paste as truncated. Zero is unlimited.
+            max_saved_bytes: Content of a streamed paste held in memory to save,
+                when saving content. Content past it is scanned, not saved,
+                and the paste is marked as truncated. Zero holds whole pastes.
+            dedup_cache_size: Number of recent content digests remembered. A
+                paste identical to a remembered one is not scanned, the prior
+                matches are copied to it. Zero disables.
+            near_duplicate_threshold: Similarity, 0.0 to 1.0, at which a paste
+                is a near-duplicate of a recent one. Zero disables.
+            near_duplicate_capacity: Number of recent fingerprints remembered
+            near_duplicate_mode: On a near-duplicate, "skip" copies the prior
+                matches still in the paste without scanning, "diff" also scans
+                the lines that differ from the prior paste. Matches spanning
+                lines are missed where they cross a changed line.
+            pipeline_queue_size: When above zero, scan and write to the database
+                on their own stage threads, each fed by a queue of this size.
+                Can not be combined with scan_workers or stream_chunk_size.
+            pull_priority: Weights ordering the pastes to pull, defaults if None
+            scrape_target_overlap: Share, 0.0 to 1.0, of each recent pastes
+                scrape that should repeat the previous. The scrape limit is
+                adjusted to keep it. Zero keeps the default limit.
+            retry_base_delay: Seconds before retrying a failed item scrape,
+                doubled on each further failure
+            retry_max_delay: Longest seconds between retries
+            retry_max_attempts: Failed item scrapes before a key is given up
+            seen_key_capacity: Number of recent meta keys remembered so only
+                new meta rows are stored. Zero stores every row scraped.
+            lease_seconds: When above zero, claim keys for this many seconds
+                before pulling them so several scanners can share a database.
+                Leases are renewed while held and released once done.
+            async_api: When given, pastes are fetched on an event loop stage
+                ahead of the scan stage. Each request starts at its throttle
+                slot without waiting on earlier responses, up to
+                pipeline_queue_size at once. Requires the pipeline.
+
+        Raises:
+            ValueError: Raised on an invalid near_duplicate_mode, when the
+                pipeline is combined with scan_workers or stream_chunk_size, or
+                when async_api is given without the pipeline.
         """
         self._database = database
         self._patterns = patterns
 
         self._pastebin_api = pastebin_api
 
-        self._to_pull: list[str] = []
+        self._to_pull = _PullQueue(pull_priority)
+        self._feed = _FeedCoverage(scrape_target_overlap)
+        self._seen_key_capacity = seen_key_capacity
+        self._seen_keys = _SeenKeys(seen_key_capacity)
+        self._retries = _RetryQueue(
+            database,
+            base_delay=retry_base_delay,
+            max_delay=retry_max_delay,
+            max_attempts=retry_max_attempts,
+        )
         self._save_paste_content = save_paste_content
 
+        self._lease_seconds = lease_seconds
+        self._lease_owner = (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        # Keys claimed by this scanner and not yet released
+        self._leased: set[str] = set()
+        # Keys popped to pull whose paste row is not yet written
+        self._in_progress: set[str] = set()
+        # Syntax of the hydrated keys, when patterns are scoped by syntax
+        self._syntaxes: dict[str, str] = {}
+
+        self._scan_workers = scan_workers
+        self._max_in_flight = max(1, max_in_flight)
+        self._scan_pool: ProcessPoolExecutor | None = None
+        self._in_flight: deque[tuple[str, Future[_ScanResult]]] = deque()
+        # Paste rows of scans in the pool, written once their matches are saved
+        self._pending_pastes: dict[str, Paste] = {}
+
+        self._stream_chunk_size = stream_chunk_size
+        self._stream_overlap = stream_overlap
+        self._max_paste_bytes = max_paste_bytes
+        self._max_saved_bytes = max_saved_bytes
+
+        self._dedup_cache_size = dedup_cache_size
+        # Matches depend on the patterns scoped to the syntax as well as content
+        self._digests: OrderedDict[_DigestKey, str] = OrderedDict()
+        self._pending_digests: dict[str, _DigestKey] = {}
+
+        if near_duplicate_mode not in NEAR_DUPLICATE_MODES:
+            raise ValueError(f"Invalid near duplicate mode: {near_duplicate_mode}")
+
+        self._near_duplicate_mode = near_duplicate_mode
+        self._near_duplicates: _NearDuplicateIndex | None = None
+        if near_duplicate_threshold > 0:
+            self._near_duplicates = _NearDuplicateIndex(
+                threshold=near_duplicate_threshold,
+                capacity=near_duplicate_capacity,
+            )
+        self._pending_fingerprints: dict[str, _Fingerprint] = {}
+
+        self._scheduler = _Scheduler()
+
+        if pipeline_queue_size > 0 and (scan_workers > 0 or stream_chunk_size > 0):
+            raise ValueError("Pipeline can not be combined with workers or streams.")
+
+        if async_api is not None and pipeline_queue_size <= 0:
+            raise ValueError("Async fetching requires the pipeline.")
+
+        self._async_api = async_api
+        self._pipeline_queue_size = pipeline_queue_size
+        self._fetch_stage: _AsyncStage[_FetchItem] | None = None
+        self._scan_stage: _Stage[_ScanItem] | None = None
+        self._write_stage: _Stage[Callable[[], object]] | None = None
+        self._stage_stats: list[_StageStats] = []
+
     def run(self) -> None:
         """Run main gather loop. CTRL + C to exit loop."""
+        self._warm_seen_keys()
         self._hydrate_to_pull()
 
         self.logger.info("Starting main gather loop. Press CTRL + C to stop.")
         self.logger.info("%d keys discovered for pulling.", len(self._to_pull))
-        self._run()
+        self._start_scan_pool()
+        self._start_pipeline()
+        try:
+            self._run()
+        finally:
+            try:
+                self._stop_pipeline()
+            finally:
+                self._stop_scan_pool()
+                self._release_all_leases()
+                self._database.flush()
+                self._log_scan_stats()
+
+    def get_stage_stats(self) -> list[_StageStats]:
+        """Return queue depth and latency of the pipeline stages, live or last run."""
+        if self._scan_stage is None or self._write_stage is None:
+            return list(self._stage_stats)
+
+        stats = [self._scan_stage.get_stats(), self._write_stage.get_stats()]
+        if self._fetch_stage is not None:
+            stats.insert(0, self._fetch_stage.get_stats())
+        return stats
 
     def _run(self) -> None:  # pragma: no cover
         """Internal main event loop."""
+        self._scheduler.add_job("scrape", self._run_scrape_job)
+        self._scheduler.add_job("scrape_item", self._run_scrape_item_job)
+        self._scheduler.add_job("collect", self._run_collect_job, delay=math.inf)
+        if self._database.commit_interval > 0:
+            self._scheduler.add_job(
+                "flush",
+                self._run_flush_job,
+                delay=self._database.commit_interval,
+            )
+        if self._lease_seconds > 0:
+            self._scheduler.add_job(
+                "lease",
+                self._run_lease_job,
+                delay=self._lease_seconds / 3,
+            )
         try:
-            while "dreams flow":
-                if self._pastebin_api.can_scrape:
-                    self._run_scrape()
-                if self._to_pull and self._pastebin_api.can_scrape_item:
-                    self._run_scrape_item()
+            self._scheduler.run()
         except KeyboardInterrupt:
             self.logger.info("Exiting loop process.")
 
+    def _run_scrape_job(self) -> float:
+        """Scheduled batch scrape, returns seconds until the next."""
+        if self._pastebin_api.can_scrape:
+            try:
+                self._run_scrape()
+            except _ThrottleError:
+                # A shared limiter's token was taken since it was checked
+                self.logger.debug("Scrape throttled, waiting for the next token.")
+            except (_ResponseError, _TransientError) as err:
+                self.logger.warning("Scrape failed, retrying next round: %s", err)
+            if self._to_pull:
+                self._scheduler.wake("scrape_item")
+        return self._pastebin_api.scrape_delay
+
+    def _run_scrape_item_job(self) -> float:
+        """Scheduled item scrape, returns seconds until the next."""
+        if self._fetch_stage is not None:
+            # Fetches wait on their throttle slot, woken as each is done
+            while self._to_pull and not self._fetch_stage.full:
+                self._run_scrape_item()
+            return math.inf
+
+        if self._to_pull and self._pastebin_api.can_scrape_item:
+            self._run_scrape_item()
+        # With nothing to pull, wait to be woken by the next batch scrape
+        return self._pastebin_api.scrape_item_delay if self._to_pull else math.inf
+
+    def _run_collect_job(self) -> float:
+        """Scheduled save of completed scans, woken as scans complete."""
+        self._collect_scans()
+        return math.inf
+
+    def _run_flush_job(self) -> float:
+        """Scheduled commit of grouped writes, returns seconds until the next."""
+        if self._database.pending_rows:
+            self._write(self._database.flush)
+        return self._database.commit_interval
+
+    def _run_lease_job(self) -> float:
+        """Scheduled renewal of held leases, returns seconds until the next."""
+        self._write(self._renew_leases)
+        return self._lease_seconds / 3
+
     def _run_scrape(self) -> None:
         """Scrape the most recent paste meta data."""
         self.logger.debug("Pulling most recent paste meta.")
-        results = self._pastebin_api.scrape()
+        results = self._pastebin_api.scrape(limit=self._feed.limit)
+        overlap = self._feed.update([meta.key for meta in results])
+        self.logger.debug(
+            "Scrape overlap %.2f, next limit %d", overlap, self._feed.limit
+        )
+
+        new_keys = self._seen_keys.filter_new(meta.key for meta in results)
+        new_metas = [meta for meta in results if meta.key in new_keys]
+        if new_metas:
+            self._write(self._database.insert_metas, new_metas)
+            self.logger.info(
+                "Discovered %d meta rows, stored %d new.",
+                len(results),
+                len(new_metas),
+            )
 
-        if results:
-            self._database.insert_metas(results)
-            self.logger.info("Discovered %d meta rows, stored new.", len(results))
+        # Nothing new to pull unless keys arrived or the queue ran dry
+        if new_metas or not self._to_pull:
             self._hydrate_to_pull()
 
     def _run_scrape_item(self) -> None:
         """Scrape pastes from meta table that have not been collected."""
         key = self._to_pull.pop()
-        result = self._pastebin_api.scrape_item(key)
-        if result is None:
+        if key is None:
+            return
+
+        self._in_progress.add(key)
+        syntax = self._get_syntax(key)
+        if self._fetch_stage is not None:
+            future = self._fetch_stage.put((key, syntax))
+            future.add_done_callback(lambda _: self._scheduler.wake("scrape_item"))
+            return
+
+        try:
+            if self._stream_chunk_size > 0:
+                fetched = self._run_stream_item(key, syntax)
+                content = None
+            else:
+                content = self._fetch_content(key)
+                fetched = content is not None
+
+        except (_ResponseError, _TransientError) as err:
+            self._write(self._fail_key, key, str(err))
+            return
+
+        if not fetched:
+            self._requeue(key, syntax)
+            return
+
+        if content is None:
+            # Streamed pastes are written by now
+            self._write(self._retries.succeed, key)
+            self._write(self._finish_key, key)
+            return
+
+        self._hand_off(key, content, syntax)
+
+    async def _fetch_item(self, item: _FetchItem) -> None:
+        """Fetch a paste on the fetch stage, waiting for its throttle slot."""
+        key, syntax = item
+        try:
+            content = await self._fetch_content_async(key)
+
+        except (_ResponseError, _TransientError) as err:
+            await asyncio.to_thread(self._write, self._fail_key, key, str(err))
+            return
+
+        if content is None:
+            # Not returned while waiting on the throttle, retried if ever
+            await asyncio.to_thread(self._write, self._fail_key, key, "throttled")
+            return
+
+        # Blocking hand offs run off the loop so other fetches keep going
+        await asyncio.to_thread(self._hand_off, key, content, syntax)
+
+    def _hand_off(self, key: str, content: str | bytes, syntax: str | None) -> None:
+        """Record a fetched paste and pass it on to scanning."""
+        self._write(self._retries.succeed, key)
+        if self._scan_stage is not None:
+            self._scan_stage.put((key, content, syntax))
+        else:
+            self._scan_item((key, content, syntax))
+
+    def _scan_item(self, item: _ScanItem) -> None:
+        """Scan a fetched (key, content, syntax) paste and write the results."""
+        key, content, syntax = item
+        digest = _content_digest(content)
+        if self._run_duplicate(key, (digest, syntax)):
+            self._write(self._finish_key, key)
+            return
+
+        paste = self._to_paste(key, content, digest=digest)
+        fingerprint, content = self._reduce_near_duplicate(key, content)
+
+        if self._scan_pool is not None:
+            self._pending_pastes[key] = paste
+            self._pending_digests[key] = (digest, syntax)
+            if fingerprint is not None:
+                self._pending_fingerprints[key] = fingerprint
+            self._submit_scan(key, content, syntax)
+            return
+
+        results = self._patterns.scan(content, syntax=syntax)
+        self._write(self._save_scan, key, len(content), results)
+        # Safe before the write is done, later copies are written after it
+        self._remember_digest((digest, syntax), key)
+        self._remember_fingerprint(fingerprint, key)
+
+        self._write(self._database.insert_paste, paste)
+        # Once the paste is stored the key is no longer offered to pull
+        self._write(self._finish_key, key)
+
+    def _write(self, write: Callable[..., object], *args: Any) -> None:
+        """Run a database write on the writer stage, if running, or inline."""
+        if self._write_stage is not None:
+            self._write_stage.put(functools.partial(write, *args))
+        else:
+            write(*args)
+
+    def _read(self, read: Callable[..., _T], *args: Any) -> _T:
+        """
+        Run a database read on the writer stage, if running, or inline.
+
+        The database connection is only used by one thread at a time. On the
+        writer stage the read sees every write queued before it.
+        """
+        if self._write_stage is None:
+            return read(*args)
+
+        future: Future[_T] = Future()
+
+        def run() -> None:
+            try:
+                future.set_result(read(*args))
+            except Exception as err:
+                future.set_exception(err)
+
+        self._write_stage.put(run)
+        return future.result()
+
+    def _run_duplicate(self, key: str, digest: _DigestKey) -> bool:
+        """Copy matches of an identical recent paste. True if it was a duplicate."""
+        source_key = self._digests.get(digest)
+        if source_key is None:
+            return False
+
+        self._digests.move_to_end(digest)
+        self._write(self._copy_matches, source_key, key, "identical")
+
+        # Content is stored once, by reference to the digest
+        self._write(self._database.insert_paste, Paste(key, "", digest=digest[0]))
+        return True
+
+    def _copy_matches(
+        self,
+        source_key: str,
+        key: str,
+        relation: str,
+        content: str | bytes | None = None,
+    ) -> None:
+        """Copy the saved matches of a similar paste, those in content if given."""
+        if content is None:
+            match_count = self._database.copy_matches(source_key, key)
+        else:
+            matches = [
+                Match(key, match.match_name, match.match_value)
+                for match in self._database.get_matches(source_key)
+                if _contains(content, match.match_value)
+            ]
+            if matches:
+                self._database.insert_matches(matches)
+            match_count = len(matches)
+
+        self.logger.info(
+            "Paste content for key %s %s to %s - %d matches copied",
+            key,
+            relation,
+            source_key,
+            match_count,
+        )
+
+    def _reduce_near_duplicate(
+        self,
+        key: str,
+        content: str | bytes,
+    ) -> tuple[_Fingerprint | None, str | bytes]:
+        """
+        Reduce the content to scan when it is near-identical to a recent paste.
+
+        The matches of the recent paste whose values are still in the content
+        are copied. The content left to scan is the lines that differ in "diff"
+        mode and nothing in "skip" mode. A match spanning a changed line and an
+        unchanged line is not found in either mode.
+
+        Returns:
+            Tuple of the fingerprint (None if disabled) and the content to scan.
+        """
+        if self._near_duplicates is None:
+            return None, content
+
+        fingerprint = self._near_duplicates.fingerprint(content)
+        found = self._near_duplicates.find(fingerprint)
+        if found is None:
+            return fingerprint, content
+
+        source_key, reference = found
+        self._write(self._copy_matches, source_key, key, "near-identical", content)
+        if self._near_duplicate_mode == "skip":
+            reduced = self._near_duplicates.skip(content)
+        else:
+            reduced = self._near_duplicates.diff(content, reference)
+
+        self.logger.debug(
+            "Scanning %d of %d for key %s", len(reduced), len(content), key
+        )
+        return fingerprint, reduced
+
+    def _remember_fingerprint(self, fingerprint: _Fingerprint | None, key: str) -> None:
+        """Index the fingerprint of a paste whose matches are saved."""
+        if self._near_duplicates is not None and fingerprint is not None:
+            self._near_duplicates.add(key, fingerprint)
+
+    def _remember_digest(self, digest: _DigestKey, key: str) -> None:
+        """Remember the key that holds the matches of a digest, dropping oldest."""
+        if self._dedup_cache_size <= 0:
             return
 
-        match_count = self._save_pattern_matches(key, result.content)
+        self._digests[digest] = key
+        self._digests.move_to_end(digest)
+        while len(self._digests) > self._dedup_cache_size:
+            self._digests.popitem(last=False)
+
+    def _run_stream_item(self, key: str, syntax: str | None = None) -> bool:
+        """Stream a paste, scanning each chunk as it arrives. False if throttled."""
+        stream = self._pastebin_api.scrape_item_stream(
+            key,
+            chunk_size=self._stream_chunk_size,
+            max_bytes=self._max_paste_bytes,
+            raise_on_throttle=False,
+        )
+        if stream is None:
+            return False
+
+        kept = bytearray()
+        hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        chunks = self._iter_stream(stream, kept, hasher)
+        results = self._patterns.scan_chunks(
+            chunks, self._stream_overlap, syntax=syntax
+        )
+        self._log_scan(key, stream.size, self._save_matches(key, results))
+
+        if stream.truncated:
+            self.logger.warning("Paste %s truncated at %d bytes.", key, stream.size)
+
+        capped = self._save_paste_content and len(kept) < stream.size
+        if capped:
+            self.logger.info(
+                "Saved content of paste %s capped at %d of %d bytes.",
+                key,
+                len(kept),
+                stream.size,
+            )
+
+        if stream.truncated or capped:
+            paste = self._to_paste(key, bytes(kept), truncated=True)
+
+        elif (hasher.hexdigest(), syntax) in self._digests:
+            # The digest is only known once read, store content by reference
+            paste = Paste(key, "", digest=hasher.hexdigest())
+
+        else:
+            self._remember_digest((hasher.hexdigest(), syntax), key)
+            paste = self._to_paste(key, bytes(kept), digest=hasher.hexdigest())
+
+        self._database.insert_paste(paste)
+        return True
+
+    def _requeue(self, key: str, syntax: str | None) -> None:
+        """Return a popped key to pull later, keeping its lease, when throttled."""
+        self.logger.debug("Throttled pulling key %s, queued again.", key)
+        self._to_pull.requeue_last()
+        if syntax is not None:
+            self._syntaxes[key] = syntax
+        self._in_progress.discard(key)
+
+    def _get_syntax(self, key: str) -> str | None:
+        """Return the syntax of a paste when patterns are scoped by syntax."""
+        if not self._patterns.is_syntax_scoped:
+            return None
+
+        if key in self._syntaxes:
+            return self._syntaxes.pop(key)
+
+        meta = self._read(self._database.get_meta, key)
+        return meta.syntax if meta is not None else None
+
+    def _iter_stream(
+        self,
+        stream: _PasteStream,
+        kept: bytearray,
+        hasher: hashlib.blake2b,
+    ) -> Generator[str | bytes, None, None]:
+        """Yield chunks for scanning, decoded unless patterns scan bytes."""
+        room = self._max_saved_bytes if self._max_saved_bytes > 0 else math.inf
+        decoder = None
+        if not self._patterns.scans_bytes:
+            decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+        for chunk in stream:
+            hasher.update(chunk)
+            if self._save_paste_content and len(kept) < room:
+                kept += chunk[: int(min(len(chunk), room - len(kept)))]
+            yield chunk if decoder is None else decoder.decode(chunk)
+
+        remainder = decoder.decode(b"", final=True) if decoder is not None else ""
+        if remainder:
+            yield remainder
+
+    def _to_paste(
+        self,
+        key: str,
+        content: str | bytes,
+        *,
+        truncated: bool = False,
+        digest: str = "",
+    ) -> Paste:
+        """Create the Paste row, dropping content if class flag is False."""
+        if not self._save_paste_content:
+            return Paste(key, "", truncated, digest)
 
+        if isinstance(content, bytes):
+            content = content.decode("utf-8", "replace")
+        return Paste(key, content, truncated, digest)
+
+    def _fetch_content(self, key: str) -> str | bytes | None:
+        """Fetch paste content, bytes if patterns scan bytes, None if throttled."""
+        # A shared limiter's token can be taken after can_scrape_item is checked
+        if self._patterns.scans_bytes:
+            return self._pastebin_api.scrape_item_content(key, raise_on_throttle=False)
+
+        result = self._pastebin_api.scrape_item(key, raise_on_throttle=False)
+        return result.content if result is not None else None
+
+    async def _fetch_content_async(self, key: str) -> str | bytes | None:
+        """Fetch paste content with the async API, waiting for a throttle slot."""
+        if self._async_api is None:
+            raise RuntimeError("Async fetching is not configured.")
+
+        if self._patterns.scans_bytes:
+            return await self._async_api.scrape_item_content(key, wait_on_throttle=True)
+
+        result = await self._async_api.scrape_item(key, wait_on_throttle=True)
+        return result.content if result is not None else None
+
+    def _log_scan(self, key: str, size: int, match_count: int) -> None:
+        """Log the outcome of a paste scan."""
         self.logger.info(
             "Paste content for key %s (size: %d) - %d matches - remaining: %d",
             key,
-            len(result.content),
+            size,
             match_count,
             len(self._to_pull),
         )
 
-        # Remove content from model if class flag is False
-        result = result if self._save_paste_content else Paste(key, "")
-        self._database.insert_paste(result)
+    def _log_scan_stats(self) -> None:
+        """Log scan savings, job drift, and the cost of each pattern scanned."""
+        self.logger.info(
+            "Feed: %d scrapes - %d possible gaps - %.2f last overlap - limit %d",
+            self._feed.scrapes,
+            self._feed.possible_gaps,
+            self._feed.last_overlap,
+            self._feed.limit,
+        )
 
-    def _save_pattern_matches(self, key: str, content: str) -> int:
-        """Save matches from content to database, return count of matches."""
-        matches: list[Match] = []
+        self.logger.info(
+            "Pull queue: %d pulled - %d expired before they were pulled",
+            self._to_pull.pulled,
+            self._to_pull.expired,
+        )
 
-        for label, pattern in self._patterns.pattern_iter():
-            match = pattern.findall(content)
-            if match:
-                matches.extend([Match(key, label, val) for val in match])
+        self.logger.info(
+            "Retries: %d failed attempts - %d recovered - %d dead-lettered",
+            self._retries.failed,
+            self._retries.recovered,
+            self._retries.dead,
+        )
+
+        if self._near_duplicates is not None:
+            self.logger.info(
+                "Near-duplicates: %d pastes - %d bytes not scanned",
+                self._near_duplicates.hits,
+                self._near_duplicates.skipped_bytes,
+            )
+
+        for stage in self.get_stage_stats():
+            self.logger.log(
+                logging.WARNING if stage.errors else logging.INFO,
+                "Stage '%s' - %d items - %d errors - %d queued (max %d) - "
+                "%.1fms mean - %.1fms max - %.3fs blocked",
+                stage.name,
+                stage.items,
+                stage.errors,
+                stage.depth,
+                stage.max_depth,
+                stage.mean_seconds * 1_000,
+                stage.max_seconds * 1_000,
+                stage.blocked_seconds,
+            )
+
+        for job in self._scheduler.get_stats():
+            self.logger.info(
+                "Job '%s' - %d runs - %.1fms mean drift - %.1fms max drift",
+                job.name,
+                job.runs,
+                job.mean_drift * 1_000,
+                job.max_drift * 1_000,
+            )
+
+        for stats in self._patterns.get_stats():
+            self.logger.info(
+                "Pattern '%s' - %d calls - %.3fs - %d bytes - %d hits%s",
+                stats.label,
+                stats.calls,
+                stats.seconds,
+                stats.bytes_scanned,
+                stats.hits,
+                " - quarantined" if stats.quarantined else "",
+            )
+
+    def _save_scan(self, key: str, size: int, results: list[tuple[str, str]]) -> None:
+        """Save and log the (label, value) results of a scan."""
+        self._log_scan(key, size, self._save_matches(key, results))
+
+    def _save_matches(self, key: str, results: list[tuple[str, str]]) -> int:
+        """Save (label, value) results to database, return count of matches."""
+        matches = [Match(key, label, value) for label, value in results]
 
         if matches:
             self._database.insert_matches(matches)
 
         return len(matches)
 
+    def _start_pipeline(self) -> None:
+        """Start the fetch, scan, and database writer stages if configured."""
+        if self._pipeline_queue_size <= 0 or self._scan_stage is not None:
+            return
+
+        self._write_stage = _Stage(
+            "wypt-writer",
+            lambda write: write(),
+            maxsize=self._pipeline_queue_size,
+        )
+        self._scan_stage = _Stage(
+            "wypt-scanner",
+            self._scan_item,
+            maxsize=self._pipeline_queue_size,
+        )
+        self._write_stage.start()
+        self._scan_stage.start()
+        self.logger.info("Started scan and writer stages.")
+
+        if self._async_api is not None:
+            self._fetch_stage = _AsyncStage(
+                "wypt-fetcher",
+                self._fetch_item,
+                maxsize=self._pipeline_queue_size,
+                cleanup=self._async_api.aclose,
+            )
+            self._fetch_stage.start()
+            self.logger.info("Started async fetch stage.")
+
+    def _stop_pipeline(self) -> None:
+        """Finish fetches, queued scans, and writes then stop the stages."""
+        if self._scan_stage is None or self._write_stage is None:
+            return
+
+        stages: list[_Stage[Any] | _AsyncStage[Any]] = [
+            self._scan_stage,
+            self._write_stage,
+        ]
+        if self._fetch_stage is not None:
+            stages.insert(0, self._fetch_stage)
+        errors: list[Exception] = []
+        # In order, each stage feeds the next
+        for stage in stages:
+            try:
+                stage.close()
+            except Exception as err:
+                errors.append(err)
+
+        self._stage_stats = [stage.get_stats() for stage in stages]
+        self._fetch_stage = None
+        self._scan_stage = None
+        self._write_stage = None
+        self.logger.info("Stopped scan and writer stages.")
+        if errors:
+            # Each was logged as it failed, raise so lost writes are not silent
+            raise errors[0]
+
+    def _start_scan_pool(self) -> None:
+        """Start the scan worker pool if scanning is configured for processes."""
+        if self._scan_workers <= 0 or self._scan_pool is not None:
+            return
+
+        self._scan_pool = ProcessPoolExecutor(
+            max_workers=self._scan_workers,
+            initializer=_init_scan_worker,
+            initargs=(self._patterns,),
+        )
+        self.logger.info("Started %d scan worker processes.", self._scan_workers)
+
+    def _stop_scan_pool(self) -> None:
+        """Save all outstanding scan results and stop the scan worker pool."""
+        if self._scan_pool is None:
+            return
+
+        self._collect_scans(wait=True)
+        self._scan_pool.shutdown()
+        self._scan_pool = None
+        self.logger.info("Stopped scan worker processes.")
+
+    def _submit_scan(
+        self,
+        key: str,
+        content: str | bytes,
+        syntax: str | None = None,
+    ) -> None:
+        """Send content to the scan pool, waiting on the oldest scan if at limit."""
+        if self._scan_pool is None:
+            raise RuntimeError("Scan pool has not been started.")
+
+        while len(self._in_flight) >= self._max_in_flight:
+            self._collect_scan(*self._in_flight.popleft())
+
+        try:
+            future = self._scan_pool.submit(_scan_worker, key, content, syntax)
+
+        except BrokenProcessPool:
+            # A worker died, scans in flight fail as collected. Start over.
+            self.logger.error("Scan worker pool broken, restarting it.")
+            self._scan_pool.shutdown(wait=False)
+            self._scan_pool = None
+            self._start_scan_pool()
+            self._submit_scan(key, content, syntax)
+            return
+
+        future.add_done_callback(lambda _: self._scheduler.wake("collect"))
+        self._in_flight.append((key, future))
+
+    def _collect_scans(self, *, wait: bool = False) -> None:
+        """Save results of completed scans in submission order."""
+        while self._in_flight and (wait or self._in_flight[0][1].done()):
+            self._collect_scan(*self._in_flight.popleft())
+
+    def _collect_scan(self, key: str, future: Future[_ScanResult]) -> None:
+        """Save the results of a single scan, waiting if needed."""
+        try:
+            _, size, results, stats = future.result()
+
+        except BaseException as err:
+            if not future.done():
+                # Interrupted while waiting, the scan itself did not fail
+                raise
+            self._fail_scan(key, err)
+            return
+
+        self._patterns.merge_stats(stats)
+        self._save_scan(key, size, results)
+
+        # Matches are only available to copy once saved
+        digest = self._pending_digests.pop(key, None)
+        if digest is not None:
+            self._remember_digest(digest, key)
+        self._remember_fingerprint(self._pending_fingerprints.pop(key, None), key)
+
+        # Once the paste is stored the key is no longer offered to pull
+        paste = self._pending_pastes.pop(key, None)
+        if paste is not None:
+            self._database.insert_paste(paste)
+        self._finish_key(key)
+
+    def _fail_scan(self, key: str, err: BaseException) -> None:
+        """Drop a scan that failed in the pool, the key is retried later."""
+        self.logger.error(
+            "Scan of key %s failed in worker pool: %s",
+            key,
+            type(err).__name__,
+            exc_info=err,
+        )
+        self._pending_pastes.pop(key, None)
+        self._pending_digests.pop(key, None)
+        self._pending_fingerprints.pop(key, None)
+        self._fail_key(key, f"scan failed: {type(err).__name__}")
+
+    def _warm_seen_keys(self) -> None:
+        """Mark the newest keys already in the meta table as seen."""
+        keys = self._database.get_recent_meta_keys(limit=self._seen_key_capacity)
+        self._seen_keys.update(keys)
+        self.logger.info("Warmed seen keys with %d stored keys.", len(keys))
+
     def _hydrate_to_pull(self) -> None:
         """Hydrate list of keys remaining to be pulled and scanned if empty."""
-        self._to_pull = self._database.get_keys_to_pull(limit=PULL_PASTE_LIMIT)
+        now = time.time()
+        metas = self._read(self._load_metas_to_pull, now)
+        if self._patterns.is_syntax_scoped:
+            self._syntaxes = {meta.key: meta.syntax for meta in metas}
+        self._to_pull.reset(metas, now)
         self.logger.info("Hydration created %d keys to pull.", len(self._to_pull))
+
+    def _load_metas_to_pull(self, now: float) -> list[Meta]:
+        """Read and claim the metas to pull, in the order of the database calls."""
+        metas = self._database.get_metas_to_pull(
+            limit=PULL_PASTE_LIMIT,
+            now=int(now),
+            owner=self._lease_owner,
+            horizon=_EXPIRY_HORIZON,
+        )
+        # Due retries compete for the same slots by priority
+        metas.extend(self._retries.due(now, limit=PULL_PASTE_LIMIT))
+        # Keys being fetched, scanned, or written have no paste row yet
+        metas = [meta for meta in metas if meta.key not in self._in_progress]
+        if self._lease_seconds > 0:
+            metas = self._claim_metas(metas, now)
+        return metas
+
+    def _claim_metas(self, metas: list[Meta], now: float) -> list[Meta]:
+        """Lease the keys of metas, returning those claimed by this scanner."""
+        claimed = set(
+            self._database.claim_keys(
+                [meta.key for meta in metas],
+                self._lease_owner,
+                now=now,
+                expires=now + self._lease_seconds,
+            )
+        )
+        # Queued keys not claimed again are dropped by the reset, free them
+        dropped = set(self._to_pull.keys()) - claimed
+        if dropped:
+            self._database.release_leases(self._lease_owner, list(dropped))
+        self._leased.difference_update(dropped)
+        self._leased.update(claimed)
+
+        if len(claimed) < len(metas):
+            self.logger.debug("%d keys leased elsewhere.", len(metas) - len(claimed))
+        return [meta for meta in metas if meta.key in claimed]
+
+    def _renew_leases(self) -> None:
+        """Extend the leases held by this scanner."""
+        if not self._leased:
+            return
+        expires = time.time() + self._lease_seconds
+        renewed = self._database.renew_leases(
+            list(self._leased),
+            self._lease_owner,
+            expires=expires,
+        )
+        self.logger.debug("Renewed %d of %d leases.", renewed, len(self._leased))
+
+    def _finish_key(self, key: str) -> None:
+        """Mark a popped key as done once its writes are queued before this."""
+        self._in_progress.discard(key)
+        self._release_lease(key)
+
+    def _fail_key(self, key: str, error: str) -> None:
+        """Schedule a retry of a popped key that failed."""
+        self._retries.fail(key, error)
+        self._finish_key(key)
+
+    def _release_lease(self, key: str) -> None:
+        """Release the lease of a key once it is done."""
+        if key not in self._leased:
+            return
+        self._leased.discard(key)
+        self._database.release_leases(self._lease_owner, [key])
+
+    def _release_all_leases(self) -> None:
+        """Release every lease held so other scanners can claim the keys."""
+        if self._lease_seconds <= 0:
+            return
+        self._database.release_leases(self._lease_owner)
+        self._leased.clear()
+        self.logger.info("Released leases of %s.", self._lease_owner)
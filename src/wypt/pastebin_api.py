@@ -11,61 +11,151 @@ ResponseError exception.
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import time
+from collections.abc import AsyncGenerator
+from collections.abc import Generator
+from collections.abc import Iterable
 from typing import NoReturn
 
 import httpx
 
 from .exceptions import ResponseError
 from .exceptions import ThrottleError
+from .exceptions import TransientError
 from .model import Meta
 from .model import Paste
+from .rate_limiter import TokenBucket
 
 # Cooldown, in seconds, required between scraping
 SCRAPING_THROTTLE = 60
-# Cooldown, in seconds, required between item scraping
+# Cooldown, in seconds, required between item and item meta scraping
 ITEM_THROTTLE = 1
-# Cooldown, in seconds, required between item meta scraping
-META_THROTTLE = 1
 DEFAULT_LIMIT = 100
 DEFAULT_TIMEOUT = 10
+DEFAULT_CHUNK_SIZE = 65_536
+# Shortest wait, in seconds, between checks for an open throttle slot
+MIN_SLOT_WAIT = 0.01
 
 
-class PastebinAPI:
+class _BasePastebinAPI:
+    """Throttle state and response handling shared by the API clients."""
+
     logger = logging.getLogger(__name__)
     base_url = "https://scrape.pastebin.com"
 
-    def __init__(self, *, last_call: int | None = None) -> None:
-        """
-        Create API client for pastebin.
-
-        Keyword Args:
-            last_call: Unix time of last action. Defaults to 'now'
-        """
-        self._http = httpx.Client(timeout=DEFAULT_TIMEOUT, follow_redirects=False)
-        self._batch = last_call if last_call is not None else int(time.time())
-        self._single = last_call if last_call is not None else int(time.time())
+    def __init__(
+        self,
+        *,
+        last_call: float | None = None,
+        scrape_limiter: TokenBucket | None = None,
+        item_limiter: TokenBucket | None = None,
+    ) -> None:
+        """Create the scrape and item throttles, see subclasses for args."""
+        last_call = last_call if last_call is not None else time.time()
+        self._scrape_limiter = scrape_limiter or TokenBucket.from_last_call(
+            SCRAPING_THROTTLE,
+            last_call=last_call,
+        )
+        self._item_limiter = item_limiter or TokenBucket.from_last_call(
+            ITEM_THROTTLE,
+            last_call=last_call,
+        )
 
     @property
     def can_scrape(self) -> bool:
         """Boolean representing if a scrape request can be performed."""
-        return self._can_act(self._batch, SCRAPING_THROTTLE)
+        return self._scrape_limiter.wait_time() == 0
 
     @property
     def can_scrape_item(self) -> bool:
         """Boolean representing if an item scrape can be performed."""
-        return self._can_act(self._single, ITEM_THROTTLE)
+        return self._item_limiter.wait_time() == 0
 
     @property
     def can_scrape_meta(self) -> bool:
         """Boolean representing if an meta scrape can be performed."""
-        return self._can_act(self._single, META_THROTTLE)
+        return self._item_limiter.wait_time() == 0
+
+    @property
+    def scrape_delay(self) -> float:
+        """Seconds until a scrape request can be performed."""
+        return self._scrape_limiter.wait_time()
+
+    @property
+    def scrape_item_delay(self) -> float:
+        """Seconds until an item scrape can be performed."""
+        return self._item_limiter.wait_time()
+
+    def _can_run_action(self, limiter: TokenBucket, raise_: bool) -> bool:
+        """Take a token from the limiter if available, raise if desired."""
+        if limiter.try_acquire():
+            return True
+
+        if raise_:
+            raise ThrottleError(
+                cooldown=1 / limiter.rate, remaining=limiter.wait_time()
+            )
+        return False
+
+    def _transient_error(self, err: httpx.TransportError, route: str) -> NoReturn:
+        """Handle logging and raising on timeouts and connection errors."""
+        self.logger.warning("%s on %s - '%s'", type(err).__name__, route, err)
+        raise TransientError(str(err) or type(err).__name__, route) from err
+
+    def _response_error(self, text: str, code: int) -> NoReturn:
+        """Handle logging and raising on response error."""
+        self.logger.error("Invalid response on scrape attempt. %d - %s", code, text)
+        raise ResponseError(text, "GET", code)
+
+    def _scrape_params(self, limit: int | None, lang: str | None) -> dict[str, str]:
+        """Build the params of a scrape request."""
+        limit = limit if limit and 0 < limit <= 250 else DEFAULT_LIMIT
+        params = {"limit": str(limit)}
+        if lang:
+            params.update({"lang": lang})
+        return params
+
+    def _to_metas(self, resp: httpx.Response) -> list[Meta]:
+        """Build Meta models from a scrape response."""
+        models = [Meta(**paste) for paste in resp.json()]
+        self.logger.debug("Discovered %d pastes from request.", len(models))
+        return models
+
+    def _to_meta(self, resp: httpx.Response) -> Meta | None:
+        """Build a Meta model from a meta scrape response, None if invalid."""
+        try:
+            return Meta(**resp.json())
+        except (TypeError, json.JSONDecodeError):
+            return None
 
-    def _can_act(self, last_act: int, timeout_seconds: int) -> bool:
-        """Determine if enough time has lapsed to allow action."""
-        return int(time.time()) - last_act >= timeout_seconds
+
+class PastebinAPI(_BasePastebinAPI):
+    def __init__(
+        self,
+        *,
+        last_call: float | None = None,
+        scrape_limiter: TokenBucket | None = None,
+        item_limiter: TokenBucket | None = None,
+    ) -> None:
+        """
+        Create API client for pastebin.
+
+        Keyword Args:
+            last_call: Unix time of last action. Defaults to 'now'
+            scrape_limiter: Throttle of scrapes. Defaults to one per
+                SCRAPING_THROTTLE seconds, last taken at `last_call`.
+            item_limiter: Throttle of item and meta scrapes. Defaults to one
+                per ITEM_THROTTLE seconds, last taken at `last_call`.
+        """
+        super().__init__(
+            last_call=last_call,
+            scrape_limiter=scrape_limiter,
+            item_limiter=item_limiter,
+        )
+        self._http = httpx.Client(timeout=DEFAULT_TIMEOUT, follow_redirects=False)
 
     def scrape(
         self,
@@ -93,20 +183,13 @@ class PastebinAPI:
         Raises:
             ThrottleError: Raised if cooldown between pulls is still active.
             ResponseError: Raised if pastebin returns a failure response.
+            TransientError: Raised on a timeout or connection error.
         """
-        if not self._can_run_action(self._batch, SCRAPING_THROTTLE, raise_on_throttle):
+        if not self._can_run_action(self._scrape_limiter, raise_on_throttle):
             return []
 
-        limit = limit if limit and 0 < limit <= 250 else DEFAULT_LIMIT
-        params = {"limit": str(limit)}
-        if lang:
-            params.update({"lang": lang})
-
-        resp = self._get_request("api_scraping.php", params)
-        self._batch = int(time.time())
-        models = [Meta(**paste) for paste in resp.json()]
-        self.logger.debug("Discovered %d pastes from request.", len(models))
-        return models
+        resp = self._get_request("api_scraping.php", self._scrape_params(limit, lang))
+        return self._to_metas(resp)
 
     def scrape_item(
         self,
@@ -130,14 +213,94 @@ class PastebinAPI:
         Raises:
             ThrottleError: Raised if cooldown between pulls is still active.
             ResponseError: Raised if pastebin returns a failure response.
+            TransientError: Raised on a timeout or connection error.
         """
-        if not self._can_run_action(self._single, ITEM_THROTTLE, raise_on_throttle):
+        resp = self._scrape_item(key, raise_on_throttle)
+        return Paste(key, resp.text) if resp is not None else None
+
+    def scrape_item_content(
+        self,
+        key: str,
+        *,
+        raise_on_throttle: bool = True,
+    ) -> bytes | None:
+        """
+        Scrape the raw content of a specific post by item key.
+
+        Identical to `.scrape_item()` with the body returned as undecoded bytes.
+
+        Args:
+            key: Unique paste key.
+            raise_on_throttle: If False and throttled then None will be returned.
+
+        Returns:
+            Paste content as bytes or None
+
+        Raises:
+            ThrottleError: Raised if cooldown between pulls is still active.
+            ResponseError: Raised if pastebin returns a failure response.
+            TransientError: Raised on a timeout or connection error.
+        """
+        resp = self._scrape_item(key, raise_on_throttle)
+        return resp.content if resp is not None else None
+
+    def scrape_item_stream(
+        self,
+        key: str,
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_bytes: int = 0,
+        raise_on_throttle: bool = True,
+    ) -> PasteStream | None:
+        """
+        Stream the raw content of a specific post by item key.
+
+        The body is read in chunks as the returned stream is iterated, so large
+        pastes are never held in memory whole. A read timeout part way through
+        ends the stream with what was received and marks it truncated.
+
+        Args:
+            key: Unique paste key.
+            chunk_size: Bytes per chunk yielded from the stream.
+            max_bytes: Stop reading after this many bytes. Zero is unlimited.
+            raise_on_throttle: If False and throttled then None will be returned.
+
+        Returns:
+            PasteStream or None
+
+        Raises:
+            ThrottleError: Raised if cooldown between pulls is still active.
+            ResponseError: Raised if pastebin returns a failure response.
+            TransientError: Raised on a timeout or connection error.
+        """
+        if not self._can_run_action(self._item_limiter, raise_on_throttle):
+            return None
+
+        url = f"{self.base_url}/api_scrape_item.php"
+        params = {"i": key}
+        self.logger.debug("GET (stream) - %s - with %s", url, params)
+
+        request = self._http.build_request("GET", url, params=params)
+        try:
+            resp = self._http.send(request, stream=True)
+        except httpx.TransportError as err:
+            self._transient_error(err, "api_scrape_item.php")
+
+        if not resp.is_success:
+            resp.read()
+            resp.close()
+            self._response_error(resp.text, resp.status_code)
+
+        return PasteStream(resp, chunk_size=chunk_size, max_bytes=max_bytes)
+
+    def _scrape_item(self, key: str, raise_on_throttle: bool) -> httpx.Response | None:
+        """Request a specific post by item key, None if throttled."""
+        if not self._can_run_action(self._item_limiter, raise_on_throttle):
             return None
 
         params = {"i": key}
         resp = self._get_request("api_scrape_item.php", params)
-        self._single = int(time.time())
-        return Paste(key, resp.text)
+        return resp
 
     def scrape_meta(
         self,
@@ -161,49 +324,301 @@ class PastebinAPI:
         Raises:
             ThrottleError: Raised if cooldown between pulls is still active.
             ResponseError: Raised if pastebin returns a failure response.
+            TransientError: Raised on a timeout or connection error.
         """
-        if not self._can_run_action(self._single, META_THROTTLE, raise_on_throttle):
+        if not self._can_run_action(self._item_limiter, raise_on_throttle):
             return None
 
         params = {"i": key}
 
         resp = self._get_request("api_scrape_item_meta.php", params)
-        self._single = int(time.time())
+        return self._to_meta(resp)
 
+    def _get_request(
+        self,
+        route: str,
+        params: dict[str, str] | None = None,
+        *,
+        reconnect: bool = False,
+    ) -> httpx.Response:
+        """Handle GET request to pastebin."""
+        url = f"{self.base_url}/{route}"
+        self.logger.debug("GET - %s - with %s", url, params)
         try:
-            return Meta(**resp.json())
-        except (TypeError, json.JSONDecodeError):
+            resp = self._http.get(url, params=params)
+        except httpx.TransportError as err:
+            self._transient_error(err, route)
+
+        if not resp.is_success:
+            self._response_error(resp.text, resp.status_code)
+        return resp
+
+
+class AsyncPastebinAPI(_BasePastebinAPI):
+    def __init__(
+        self,
+        *,
+        last_call: float | None = None,
+        scrape_limiter: TokenBucket | None = None,
+        item_limiter: TokenBucket | None = None,
+    ) -> None:
+        """
+        Create asyncio API client for pastebin.
+
+        Throttle slots are taken when a request starts rather than when it
+        completes, so requests can be in flight together.
+
+        Keyword Args:
+            last_call: Unix time of last action. Defaults to 'now'
+            scrape_limiter: Throttle of scrapes. Defaults to one per
+                SCRAPING_THROTTLE seconds, last taken at `last_call`.
+            item_limiter: Throttle of item and meta scrapes. Defaults to one
+                per ITEM_THROTTLE seconds, last taken at `last_call`.
+        """
+        super().__init__(
+            last_call=last_call,
+            scrape_limiter=scrape_limiter,
+            item_limiter=item_limiter,
+        )
+        self._http = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, follow_redirects=False)
+
+    async def __aenter__(self) -> AsyncPastebinAPI:
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the underlying http client."""
+        await self._http.aclose()
+
+    async def scrape(
+        self,
+        limit: int | None = None,
+        lang: str | None = None,
+        *,
+        raise_on_throttle: bool = True,
+    ) -> list[Meta]:
+        """
+        Scrape recent posts from pastebin.
+
+        See `PastebinAPI.scrape()`.
+
+        Raises:
+            ThrottleError: Raised if cooldown between pulls is still active.
+            ResponseError: Raised if pastebin returns a failure response.
+            TransientError: Raised on a timeout or connection error.
+        """
+        if not self._can_run_action(self._scrape_limiter, raise_on_throttle):
+            return []
+
+        params = self._scrape_params(limit, lang)
+        resp = await self._get_request("api_scraping.php", params)
+        return self._to_metas(resp)
+
+    async def scrape_item(
+        self,
+        key: str,
+        *,
+        raise_on_throttle: bool = True,
+        wait_on_throttle: bool = False,
+    ) -> Paste | None:
+        """
+        Scrape a specific post by item key.
+
+        See `PastebinAPI.scrape_item()`.
+
+        Args:
+            key: Unique paste key.
+            raise_on_throttle: If False and throttled then None will be returned.
+            wait_on_throttle: If True, wait for the next throttle slot instead.
+
+        Raises:
+            ThrottleError: Raised if cooldown between pulls is still active.
+            ResponseError: Raised if pastebin returns a failure response.
+            TransientError: Raised on a timeout or connection error.
+        """
+        if wait_on_throttle:
+            await self._wait_for_item_slot()
+        elif not self._can_run_action(self._item_limiter, raise_on_throttle):
             return None
 
-    def _can_run_action(self, last_act: int, cooldown: int, raise_: bool) -> bool:
-        """Check throttle, raise if desired."""
-        throttled = self._can_act(last_act, cooldown)
-        if not throttled and raise_:
-            raise ThrottleError(self._batch, cooldown)
-        return throttled
+        return await self._fetch_item(key)
 
-    def _response_error(self, text: str, code: int) -> NoReturn:
-        """Handle logging and raising on response error."""
-        self.logger.error("Invalid response on scrape attempt. %d - %s", code, text)
-        raise ResponseError(text, "GET", code)
+    async def scrape_item_content(
+        self,
+        key: str,
+        *,
+        raise_on_throttle: bool = True,
+        wait_on_throttle: bool = False,
+    ) -> bytes | None:
+        """
+        Scrape the raw content of a specific post by item key.
 
-    def _get_request(
+        See `PastebinAPI.scrape_item_content()`.
+
+        Args:
+            key: Unique paste key.
+            raise_on_throttle: If False and throttled then None will be returned.
+            wait_on_throttle: If True, wait for the next throttle slot instead.
+
+        Raises:
+            ThrottleError: Raised if cooldown between pulls is still active.
+            ResponseError: Raised if pastebin returns a failure response.
+            TransientError: Raised on a timeout or connection error.
+        """
+        if wait_on_throttle:
+            await self._wait_for_item_slot()
+        elif not self._can_run_action(self._item_limiter, raise_on_throttle):
+            return None
+
+        resp = await self._get_request("api_scrape_item.php", {"i": key})
+        return resp.content
+
+    async def scrape_items(self, keys: Iterable[str]) -> AsyncGenerator[Paste, None]:
+        """
+        Scrape posts by item key, starting a request at each item throttle slot.
+
+        Requests start on schedule without waiting on earlier responses, so
+        slow responses do not hold back the request rate. Pastes are yielded
+        in the order their responses complete.
+
+        Args:
+            keys: Unique paste keys.
+
+        Raises:
+            ResponseError: Raised if pastebin returns a failure response.
+            TransientError: Raised on a timeout or connection error.
+        """
+        pending: set[asyncio.Task[Paste]] = set()
+        try:
+            for key in keys:
+                # Slot is taken before the task starts so no two tasks share it
+                await self._wait_for_item_slot()
+                pending.add(asyncio.create_task(self._fetch_item(key)))
+
+                done = {task for task in pending if task.done()}
+                pending -= done
+                for task in done:
+                    yield task.result()
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    yield task.result()
+
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def scrape_meta(
+        self,
+        key: str,
+        *,
+        raise_on_throttle: bool = True,
+    ) -> Meta | None:
+        """
+        Scrape meta of a paste by unique paste key.
+
+        See `PastebinAPI.scrape_meta()`.
+
+        Raises:
+            ThrottleError: Raised if cooldown between pulls is still active.
+            ResponseError: Raised if pastebin returns a failure response.
+            TransientError: Raised on a timeout or connection error.
+        """
+        if not self._can_run_action(self._item_limiter, raise_on_throttle):
+            return None
+
+        resp = await self._get_request("api_scrape_item_meta.php", {"i": key})
+        return self._to_meta(resp)
+
+    async def _fetch_item(self, key: str) -> Paste:
+        """Request a specific post by item key, ignoring the throttle."""
+        resp = await self._get_request("api_scrape_item.php", {"i": key})
+        return Paste(key, resp.text)
+
+    async def _wait_for_item_slot(self) -> None:
+        """Take the next item throttle slot, sleeping until it opens."""
+        while not self._item_limiter.try_acquire():
+            await asyncio.sleep(self._until_next_item())
+
+    def _until_next_item(self) -> float:
+        """Seconds until the next item throttle slot opens."""
+        return max(MIN_SLOT_WAIT, self.scrape_item_delay)
+
+    async def _get_request(
         self,
         route: str,
         params: dict[str, str] | None = None,
-        *,
-        reconnect: bool = False,
     ) -> httpx.Response:
         """Handle GET request to pastebin."""
         url = f"{self.base_url}/{route}"
         self.logger.debug("GET - %s - with %s", url, params)
         try:
-            resp = self._http.get(url, params=params)
-        except httpx.ReadTimeout:
-            self.logger.warning("ReadTimeout, file too large or lagged.")
-            # Create an empty response to allow process to continue
-            return httpx.Response(204, content="{}")
+            resp = await self._http.get(url, params=params)
+        except httpx.TransportError as err:
+            self._transient_error(err, route)
 
         if not resp.is_success:
             self._response_error(resp.text, resp.status_code)
         return resp
+
+
+class PasteStream:
+    """Chunks of a paste body, read from the open response as iterated."""
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        response: httpx.Response,
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_bytes: int = 0,
+    ) -> None:
+        """
+        Wrap a streamed response.
+
+        Args:
+            response: Response opened with `stream=True`
+            chunk_size: Bytes per chunk yielded
+            max_bytes: Stop reading after this many bytes. Zero is unlimited.
+        """
+        self._response = response
+        self._chunk_size = chunk_size
+        self._max_bytes = max_bytes
+        self.size = 0
+        self.truncated = False
+
+    def __iter__(self) -> Generator[bytes, None, None]:
+        """Yield chunks of the body, closing the response when done."""
+        try:
+            for chunk in self._response.iter_bytes(self._chunk_size):
+                if self._max_bytes and self.size + len(chunk) > self._max_bytes:
+                    chunk = chunk[: self._max_bytes - self.size]
+                    self.truncated = True
+
+                self.size += len(chunk)
+                if chunk:
+                    yield chunk
+                if self.truncated:
+                    self.logger.info("Stopped reading at cap of %d bytes.", self.size)
+                    break
+
+        except httpx.TransportError as err:
+            # Timed out or dropped mid body, keep what was read
+            self.logger.warning(
+                "%s after %d bytes, truncated.", type(err).__name__, self.size
+            )
+            self.truncated = True
+
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Close the underlying response."""
+        self._response.close()
@@ -2,9 +2,72 @@
 
 from __future__ import annotations
 
+import dataclasses
 import logging
 import re
+import time
+from collections.abc import Callable
 from collections.abc import Generator
+from collections.abc import Iterable
+from collections.abc import Iterator
+from functools import partial
+from types import ModuleType
+from typing import Any
+from typing import Protocol
+
+try:
+    import ahocorasick  # type: ignore
+except ImportError:  # pragma: no cover
+    ahocorasick = None
+
+# Required literals are read from the private `re` parser. Its layout is known
+# for Python 3.11 through 3.13, other versions scan without the prefilter.
+try:
+    from re import _constants as sre_constants  # type: ignore
+    from re import _parser as sre_parse  # type: ignore
+
+    _REPEATS = (
+        sre_constants.MAX_REPEAT,
+        sre_constants.MIN_REPEAT,
+        sre_constants.POSSESSIVE_REPEAT,
+    )
+except (ImportError, AttributeError):  # pragma: no cover
+    sre_parse = None
+
+# Regex engines by config name. Each provides `compile()` and `error`.
+ENGINES: dict[str, ModuleType] = {"re": re}
+
+try:
+    import regex  # type: ignore
+
+    ENGINES["regex"] = regex
+except ImportError:  # pragma: no cover
+    pass
+
+try:
+    import re2  # type: ignore
+
+    ENGINES["re2"] = re2
+except ImportError:  # pragma: no cover
+    pass
+
+DEFAULT_ENGINE = "re"
+
+# Shortest literal considered selective enough to prefilter a pattern with
+MIN_LITERAL_LENGTH = 3
+
+
+class CompiledPattern(Protocol):
+    """Compiled pattern interface shared by all supported regex engines."""
+
+    @property
+    def pattern(self) -> Any: ...
+
+    def search(self, string: Any) -> Any: ...
+
+    def findall(self, string: Any) -> list[Any]: ...
+
+    def finditer(self, string: Any) -> Iterator[Any]: ...
 
 
 class PatternConfig:
@@ -12,21 +75,543 @@ class PatternConfig:
 
     logger = logging.getLogger(__name__)
 
-    def __init__(self, patterns: dict[str, str]) -> None:
-        """Compile patterns from labal: pattern."""
-        self._patterns = self._compile_patterns(patterns)
+    def __init__(
+        self,
+        patterns: dict[str, Any],
+        *,
+        engine: str = DEFAULT_ENGINE,
+        time_budget: float = 0.0,
+        as_bytes: bool = False,
+    ) -> None:
+        """
+        Compile patterns from labal: pattern.
+
+        A pattern may instead be given as a table with the keys `pattern`,
+        `syntax` and `exclude_syntax`. The pattern is then only scanned against
+        pastes of the listed syntaxes and never against the excluded ones.
+
+        Args:
+            patterns: Mapping of label to regex pattern or pattern table
+            engine: Name of regex engine to compile with ("re", "regex", "re2").
+                Falls back to "re" if the engine is not installed.
+            time_budget: Seconds a single pattern may spend on one scan before
+                it is quarantined. Zero disables quarantine.
+            as_bytes: Compile as bytes patterns to scan undecoded content. Note
+                that classes such as `\\w` and `\\b` then only match ASCII.
+        """
+        if engine not in ENGINES:
+            self.logger.warning("Regex engine '%s' unavailable, using 're'", engine)
+            engine = DEFAULT_ENGINE
+
+        self._config = dict(patterns)
+        self._syntax_rules: dict[str, tuple[frozenset[str], frozenset[str]]] = {}
+        self._source = self._parse_patterns(patterns)
+        self._engine = engine
+        self._time_budget = time_budget
+        self._as_bytes = as_bytes
+        self._patterns = self._compile_patterns(self._source)
+        self._literals = self._extract_literals(self._patterns)
+        self._index = _LiteralIndex(self._literals, as_bytes=as_bytes)
+        self._stats = {label: PatternStats(label) for label in self._patterns}
+        self._quarantined: set[str] = set()
+        self._scopes: dict[str | None, frozenset[str]] = {}
+        self._gates: dict[str | None, tuple[CompiledPattern | None, list[str]]] = {}
+
+    def __reduce__(self) -> tuple[Any, tuple[dict[str, Any]]]:
+        """Pickle as source patterns, compiled in the receiving process."""
+        kwargs: dict[str, Any] = {
+            "engine": self._engine,
+            "time_budget": self._time_budget,
+            "as_bytes": self._as_bytes,
+        }
+        return partial(self.__class__, **kwargs), (self._config,)
+
+    def _parse_patterns(self, patterns: dict[str, Any]) -> dict[str, str]:
+        """Split pattern entries into label: pattern and syntax rules."""
+        rlt: dict[str, str] = {}
+        for label, entry in patterns.items():
+            if isinstance(entry, str):
+                rlt[label] = entry
+                continue
 
-    def _compile_patterns(self, filters: dict[str, str]) -> dict[str, re.Pattern[str]]:
+            if not isinstance(entry, dict) or not isinstance(entry.get("pattern"), str):
+                self.logger.warning("Invalid pattern entry: %s - '%s'", label, entry)
+                continue
+
+            rlt[label] = entry["pattern"]
+            include = _to_syntax_set(entry.get("syntax"))
+            exclude = _to_syntax_set(entry.get("exclude_syntax"))
+            if include or exclude:
+                self._syntax_rules[label] = (include, exclude)
+
+        return rlt
+
+    def _compile_patterns(self, filters: dict[str, str]) -> dict[str, CompiledPattern]:
         """Compile patterns found in loaded config."""
-        rlt: dict[str, re.Pattern[str]] = {}
+        rlt: dict[str, CompiledPattern] = {}
         for key, value in filters.items():
-            try:
-                rlt[key] = re.compile(value)
-            except re.error:
+            compiled = self._compile_pattern(value)
+            if compiled is None:
                 self.logger.warning("Invalid pattern: %s - '%s'", key, value)
+            else:
+                rlt[key] = compiled
         self.logger.debug("Compiled %d of %d filters", len(rlt), len(filters))
         return rlt
 
-    def pattern_iter(self) -> Generator[tuple[str, re.Pattern[str]], None, None]:
-        """Iterater of compliled pattern. Returns (Pattern Label, re.Pattern)"""
+    def _compile_pattern(self, value: str) -> CompiledPattern | None:
+        """Compile with the selected engine, falling back to `re` on failure."""
+        engine = ENGINES[self._engine]
+        source = value.encode() if self._as_bytes else value
+        try:
+            return engine.compile(source)
+        except engine.error:
+            if engine is re:
+                return None
+
+        self.logger.warning(
+            "Engine '%s' rejected '%s', using 're'", self._engine, value
+        )
+        try:
+            return re.compile(source)
+        except re.error:
+            return None
+
+    def _extract_literals(
+        self,
+        patterns: dict[str, CompiledPattern],
+    ) -> dict[str, frozenset[str]]:
+        """
+        Find the literals each pattern requires in order to match.
+
+        Returns:
+            Mapping of label to a set of literals, one of which must be present
+            in the content for the pattern to match. Patterns without a usable
+            literal are not included.
+        """
+        rlt: dict[str, frozenset[str]] = {}
+        if sre_parse is None:  # pragma: no cover
+            self.logger.debug("Prefilter unavailable on this Python version")
+            return rlt
+
+        for label in patterns:
+            source = self._source[label]
+            try:
+                # Bytes patterns are parsed as compiled, one code per byte
+                parsed = sre_parse.parse(source.encode() if self._as_bytes else source)
+                if parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE:
+                    continue
+                literals = _required_literals(parsed)
+
+            except re.error:
+                continue
+
+            except (AttributeError, TypeError, ValueError):  # pragma: no cover
+                # The private parser changed shape, scan this pattern unfiltered
+                continue
+
+            if literals:
+                rlt[label] = literals
+        self.logger.debug("Prefilter literals found for %d patterns", len(rlt))
+        return rlt
+
+    def _combine_patterns(
+        self,
+        patterns: dict[str, CompiledPattern],
+    ) -> tuple[CompiledPattern | None, list[str]]:
+        """
+        Build a single alternation of all patterns that can be safely combined.
+
+        Patterns using capture groups (back references shift when combined),
+        inline flags (global flags cannot be nested), or syntax the `re` parser
+        does not understand are left standalone.
+
+        Returns:
+            Tuple of the combined pattern (None if nothing combined) and the
+            labels of patterns that must always be scanned on their own.
+        """
+        combinable: list[str] = []
+        standalone: list[str] = []
+        default_flags = re.compile("").flags
+        engine = ENGINES[self._engine]
+        engine_type = type(engine.compile(""))
+
+        for label, pattern in patterns.items():
+            if not isinstance(pattern, engine_type):
+                # Fell back to `re` when compiled, the engine cannot combine it
+                standalone.append(label)
+                continue
+
+            try:
+                analyzed = re.compile(self._source[label])
+            except re.error:
+                standalone.append(label)
+                continue
+
+            if analyzed.groups or analyzed.flags != default_flags:
+                standalone.append(label)
+            else:
+                combinable.append(label)
+
+        if not combinable:
+            return None, standalone
+
+        joined = "|".join(f"(?:{self._source[label]})" for label in combinable)
+        try:
+            combined: CompiledPattern = engine.compile(
+                joined.encode() if self._as_bytes else joined
+            )
+        except engine.error:
+            self.logger.warning("Unable to combine patterns, scanning individually.")
+            return None, list(patterns)
+
+        self.logger.debug("Combined %d patterns for single pass", len(combinable))
+        return combined, standalone
+
+    def _get_scope(self, syntax: str | None) -> frozenset[str]:
+        """Return the labels of patterns that apply to syntax, cached per syntax."""
+        if syntax not in self._scopes:
+            self._scopes[syntax] = frozenset(
+                label for label in self._patterns if self._in_scope(label, syntax)
+            )
+            self.logger.debug(
+                "Syntax '%s' scoped to %d patterns", syntax, len(self._scopes[syntax])
+            )
+        return self._scopes[syntax]
+
+    def _in_scope(self, label: str, syntax: str | None) -> bool:
+        """Determine if a pattern applies to syntax. Unknown syntax uses all."""
+        if syntax is None or label not in self._syntax_rules:
+            return True
+
+        include, exclude = self._syntax_rules[label]
+        syntax = syntax.lower()
+        return (not include or syntax in include) and syntax not in exclude
+
+    def _get_gate(self, syntax: str | None) -> tuple[CompiledPattern | None, list[str]]:
+        """Return the combined gate for syntax, cached per syntax."""
+        if syntax not in self._gates:
+            self._gates[syntax] = self._build_gate(syntax)
+        return self._gates[syntax]
+
+    def _build_gate(
+        self,
+        syntax: str | None,
+    ) -> tuple[CompiledPattern | None, list[str]]:
+        """Combine the active patterns for syntax that have no prefilter literals."""
+        scope = self._get_scope(syntax)
+        unfiltered = {
+            label: pattern
+            for label, pattern in self._patterns.items()
+            if label in scope
+            and label not in self._literals
+            and label not in self._quarantined
+        }
+        return self._combine_patterns(unfiltered)
+
+    def _quarantine(self, label: str, seconds: float) -> None:
+        """Stop scanning with a pattern that exceeded the time budget."""
+        self.logger.warning(
+            "Pattern '%s' took %.3fs (budget %.3fs), quarantined until reload.",
+            label,
+            seconds,
+            self._time_budget,
+        )
+        self._quarantined.add(label)
+        self._stats[label].quarantined = True
+        if label not in self._literals:
+            self._gates.clear()
+
+    @property
+    def is_syntax_scoped(self) -> bool:
+        """True when any pattern is limited to, or excluded from, a syntax."""
+        return bool(self._syntax_rules)
+
+    @property
+    def scans_bytes(self) -> bool:
+        """True when patterns are compiled to scan bytes content."""
+        return self._as_bytes
+
+    def get_stats(self) -> list[PatternStats]:
+        """Return the cost accounting of each pattern, most expensive first."""
+        return sorted(self._stats.values(), key=lambda s: s.seconds, reverse=True)
+
+    def pop_stats(self) -> list[PatternStats]:
+        """Return the cost accounting of patterns called since the last pop."""
+        popped = [stats for stats in self._stats.values() if stats.calls]
+        for stats in popped:
+            self._stats[stats.label] = PatternStats(
+                stats.label, quarantined=stats.quarantined
+            )
+        return popped
+
+    def merge_stats(self, stats: Iterable[PatternStats]) -> None:
+        """Add cost accounting gathered by another copy, such as a scan worker."""
+        for other in stats:
+            own = self._stats.get(other.label)
+            if own is None:
+                continue
+            own.calls += other.calls
+            own.seconds += other.seconds
+            own.bytes_scanned += other.bytes_scanned
+            own.hits += other.hits
+            own.quarantined = own.quarantined or other.quarantined
+
+    def pattern_iter(self) -> Generator[tuple[str, CompiledPattern], None, None]:
+        """Iterater of compliled pattern. Returns (Pattern Label, CompiledPattern)"""
         yield from ((label, pattern) for label, pattern in self._patterns.items())
+
+    def scan(
+        self,
+        content: str | bytes,
+        *,
+        syntax: str | None = None,
+    ) -> list[tuple[str, str]]:
+        """
+        Scan content against all patterns that apply to its syntax.
+
+        Patterns with required literals only run when one of their literals is
+        found by the prefilter. The remaining patterns are gated by a single
+        combined pattern and only run individually when it finds something.
+
+        Args:
+            content: Text to scan, bytes when patterns are compiled as bytes
+            syntax: Syntax of the paste. When None all patterns are used.
+
+        Returns:
+            List of (Pattern Label, Matched Value) in pattern order. Matched
+            bytes are decoded as UTF-8.
+        """
+        matches: list[tuple[str, str]] = []
+        for label, values in self._run_patterns(content, syntax, _findall):
+            matches.extend((label, _decode(value)) for value in values)
+
+        return matches
+
+    def _run_patterns(
+        self,
+        content: str | bytes,
+        syntax: str | None,
+        search: Callable[[CompiledPattern, str | bytes], list[Any]],
+    ) -> Generator[tuple[str, list[Any]], None, None]:
+        """Search content with each pattern that may match, recording its cost."""
+        scope = self._get_scope(syntax)
+        combined, standalone = self._get_gate(syntax)
+
+        labels = self._index.find_labels(content)
+        labels.update(standalone)
+        if combined is not None and combined.search(content):
+            labels.update(k for k in self._patterns if k not in self._literals)
+        labels.intersection_update(scope)
+        labels.difference_update(self._quarantined)
+
+        for label, pattern in self._patterns.items():
+            if label not in labels:
+                continue
+
+            start = time.perf_counter()
+            values = search(pattern, content)
+            seconds = time.perf_counter() - start
+
+            stats = self._stats[label]
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.bytes_scanned += len(content)
+            stats.hits += len(values)
+
+            if self._time_budget and seconds > self._time_budget:
+                self._quarantine(label, seconds)
+
+            yield label, values
+
+    def scan_chunks(
+        self,
+        chunks: Iterable[str | bytes],
+        overlap: int,
+        *,
+        syntax: str | None = None,
+    ) -> list[tuple[str, str]]:
+        """
+        Scan content delivered in chunks, keeping only one chunk in memory.
+
+        Each chunk is scanned together with the last `overlap` characters (or
+        bytes) of the chunk before it, so matches no longer than the overlap
+        that cross a chunk boundary are still found. Matches starting in the
+        carried overlap are left to the next scan, which sees them whole, and
+        matches starting inside one already reported are dropped. Matches
+        longer than the overlap may still be split. Repeated matches are
+        reported once.
+
+        Args:
+            chunks: Pieces of content in order, all str or all bytes
+            overlap: Length of the preceding chunk carried into the next scan
+            syntax: Syntax of the paste. When None all patterns are used.
+
+        Returns:
+            List of unique (Pattern Label, Matched Value) in order found.
+        """
+        results: dict[tuple[str, str], None] = {}
+        # Per label, the content offset where the last reported match ended
+        reported: dict[str, int] = {}
+        tail: str | bytes | None = None
+        offset = 0
+
+        iterator = iter(chunks)
+        chunk = next(iterator, None)
+        while chunk is not None:
+            following = next(iterator, None)
+            window = chunk if tail is None else tail + chunk  # type: ignore[operator]
+            tail = window[-overlap:] if overlap > 0 else window[:0]
+            # Matches starting in the tail are scanned again with what follows
+            held = len(window) - len(tail) if following is not None else len(window)
+
+            for label, found in self._run_patterns(window, syntax, _finditer):
+                for match in found:
+                    start = offset + match.start()
+                    if match.start() >= held or start < reported.get(label, 0):
+                        continue
+                    reported[label] = offset + match.end()
+                    results[(label, _decode(_match_value(match)))] = None
+
+            offset += len(window) - len(tail)
+            chunk = following
+
+        return list(results)
+
+
+@dataclasses.dataclass
+class PatternStats:
+    """Running cost accounting for a single pattern."""
+
+    label: str
+    calls: int = 0
+    seconds: float = 0.0
+    bytes_scanned: int = 0
+    hits: int = 0
+    quarantined: bool = False
+
+
+class _LiteralIndex:
+    """Find which labels have one of their required literals in content."""
+
+    def __init__(
+        self,
+        literals: dict[str, frozenset[str]],
+        *,
+        as_bytes: bool = False,
+    ) -> None:
+        """
+        Index literals, using an Aho-Corasick automaton when available.
+
+        The automaton only handles str, bytes literals are searched directly.
+        Literals of bytes patterns hold one character per byte.
+        """
+        self._labels: dict[Any, set[str]] = {}
+        for label, values in literals.items():
+            for value in values:
+                literal = value.encode("latin-1") if as_bytes else value
+                self._labels.setdefault(literal, set()).add(label)
+
+        self._automaton: Any = None
+        if ahocorasick is not None and self._labels and not as_bytes:
+            self._automaton = ahocorasick.Automaton()
+            for value in self._labels:
+                self._automaton.add_word(value, value)
+            self._automaton.make_automaton()
+
+    def find_labels(self, content: str | bytes) -> set[str]:
+        """Return the labels with at least one literal present in content."""
+        if self._automaton is not None:
+            found = {value for _, value in self._automaton.iter(content)}
+        else:
+            found = {value for value in self._labels if value in content}
+
+        labels: set[str] = set()
+        for value in found:
+            labels.update(self._labels[value])
+        return labels
+
+
+def _to_syntax_set(value: Any) -> frozenset[str]:
+    """Normalize a syntax name, or list of names, to a lowercase set."""
+    if not value:
+        return frozenset()
+    if isinstance(value, str):
+        value = [value]
+    return frozenset(str(syntax).lower() for syntax in value)
+
+
+def _findall(pattern: CompiledPattern, content: str | bytes) -> list[Any]:
+    """Return the values of all matches, as `findall()` reports them."""
+    return pattern.findall(content)
+
+
+def _finditer(pattern: CompiledPattern, content: str | bytes) -> list[Any]:
+    """Return the match objects of all matches, with their positions."""
+    return list(pattern.finditer(content))
+
+
+def _match_value(match: Any) -> Any:
+    """Return the value of a match object as `findall()` would report it."""
+    empty = match.group(0)[:0]
+    groups = match.groups()
+    if not groups:
+        return match.group(0)
+    if len(groups) == 1:
+        return empty if groups[0] is None else groups[0]
+    return tuple(empty if group is None else group for group in groups)
+
+
+def _decode(value: Any) -> Any:
+    """Decode a bytes match, or each group of a match, as UTF-8."""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    if isinstance(value, tuple):
+        return tuple(_decode(group) for group in value)
+    return value
+
+
+def _required_literals(items: Iterable[tuple[Any, Any]]) -> frozenset[str]:
+    """
+    Walk a parsed pattern for the most selective set of required literals.
+
+    Returns:
+        Set of literals, at least one of which is present in any match. Empty
+        if no literal of MIN_LITERAL_LENGTH is required.
+    """
+    best: frozenset[str] = frozenset()
+    run: list[str] = []
+
+    def _consider(candidate: frozenset[str]) -> None:
+        nonlocal best
+        if not candidate or min(map(len, candidate)) < MIN_LITERAL_LENGTH:
+            return
+        if not best or min(map(len, candidate)) > min(map(len, best)):
+            best = candidate
+
+    for opcode, argument in items:
+        if opcode is sre_constants.LITERAL:
+            run.append(chr(argument))
+            continue
+
+        _consider(frozenset(["".join(run)]))
+        run = []
+
+        if opcode is sre_constants.SUBPATTERN:
+            _, add_flags, _, subpattern = argument
+            if not add_flags & sre_constants.SRE_FLAG_IGNORECASE:
+                _consider(_required_literals(subpattern))
+
+        elif opcode is sre_constants.ATOMIC_GROUP:
+            _consider(_required_literals(argument))
+
+        elif opcode is sre_constants.BRANCH:
+            branches = [_required_literals(branch) for branch in argument[1]]
+            if all(branches):
+                _consider(frozenset().union(*branches))
+
+        elif opcode in _REPEATS and argument[0] >= 1:
+            _consider(_required_literals(argument[2]))
+
+    _consider(frozenset(["".join(run)]))
+
+    return best
@@ -0,0 +1,265 @@
+"""
+Pipeline stages connected by bounded queues.
+
+Each stage handles the items of its queue on its own thread. A full queue
+blocks the producer, so a slow stage slows the stages feeding it instead of
+letting work pile up in memory. An async stage instead handles a bounded
+number of items at once, each a coroutine on the event loop of its thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Coroutine
+from concurrent.futures import Future
+from concurrent.futures import wait
+from typing import Any
+from typing import Generic
+from typing import TypeVar
+
+DEFAULT_QUEUE_SIZE = 16
+
+T = TypeVar("T")
+
+
+@dataclasses.dataclass
+class StageStats:
+    """Queue depth and handling latency of a stage."""
+
+    name: str
+    depth: int = 0
+    max_depth: int = 0
+    items: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        """Average seconds spent handling an item."""
+        return self.seconds / self.items if self.items else 0.0
+
+
+class Stage(Generic[T]):
+    """Thread handling items from a bounded queue."""
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[T], object],
+        *,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        """
+        Create a stopped stage.
+
+        Args:
+            name: Name of the stage, used for the thread and stats
+            handler: Called with each item, on the stage thread
+
+        Keyword Args:
+            maxsize: Items queued before `.put()` blocks
+        """
+        self._handler = handler
+        # None is the signal to stop, queued behind remaining items
+        self._queue: queue.Queue[T | None] = queue.Queue(max(1, maxsize))
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._stats = StageStats(name)
+        self._error: Exception | None = None
+
+    def start(self) -> None:
+        """Start handling items."""
+        self._thread.start()
+        self.logger.debug("Started stage '%s'.", self._stats.name)
+
+    def put(self, item: T) -> None:
+        """Queue an item, blocking while the queue is full."""
+        start = time.perf_counter()
+        self._queue.put(item)
+        self._stats.blocked_seconds += time.perf_counter() - start
+        self._stats.max_depth = max(self._stats.max_depth, self._queue.qsize())
+
+    def close(self) -> None:
+        """
+        Handle all queued items then stop the stage thread.
+
+        Raises:
+            Exception: The first exception raised by the handler, if any. The
+                items after it were still handled.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+            self.logger.debug("Stopped stage '%s'.", self._stats.name)
+
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def get_stats(self) -> StageStats:
+        """Return the queue depth and handling latency of the stage."""
+        return dataclasses.replace(self._stats, depth=self._queue.qsize())
+
+    def _run(self) -> None:
+        """Handle items until the stop signal."""
+        while (item := self._queue.get()) is not None:
+            start = time.perf_counter()
+            try:
+                self._handler(item)
+
+            except Exception as err:
+                self._stats.errors += 1
+                self._error = self._error or err
+                self.logger.exception("Stage '%s' failed on item.", self._stats.name)
+
+            elapsed = time.perf_counter() - start
+            self._stats.items += 1
+            self._stats.seconds += elapsed
+            self._stats.max_seconds = max(self._stats.max_seconds, elapsed)
+
+
+class AsyncStage(Generic[T]):
+    """Event loop thread handling a bounded number of items at once."""
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[T], Coroutine[Any, Any, object]],
+        *,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        cleanup: Callable[[], Coroutine[Any, Any, object]] | None = None,
+    ) -> None:
+        """
+        Create a stopped stage.
+
+        Args:
+            name: Name of the stage, used for the thread and stats
+            handler: Coroutine function awaited with each item, on the stage loop
+
+        Keyword Args:
+            maxsize: Items handled at once before `.put()` blocks
+            cleanup: Coroutine function awaited on the stage loop once closed
+        """
+        self._handler = handler
+        self._cleanup = cleanup
+        self._maxsize = max(1, maxsize)
+        self._slots = threading.BoundedSemaphore(self._maxsize)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name=name,
+            daemon=True,
+        )
+        self._lock = threading.Lock()
+        self._pending: set[Future[None]] = set()
+        self._in_hand = 0
+        self._stats = StageStats(name)
+        self._error: Exception | None = None
+
+    @property
+    def full(self) -> bool:
+        """True while `.put()` would block."""
+        with self._lock:
+            return self._in_hand >= self._maxsize
+
+    def start(self) -> None:
+        """Start handling items."""
+        self._thread.start()
+        self.logger.debug("Started stage '%s'.", self._stats.name)
+
+    def put(self, item: T) -> Future[None]:
+        """
+        Start handling an item, blocking while the limit are being handled.
+
+        Returns:
+            Future done once the item is handled. Its callbacks run after
+            the item's slot is free.
+        """
+        start = time.perf_counter()
+        self._slots.acquire()
+        self._stats.blocked_seconds += time.perf_counter() - start
+        with self._lock:
+            self._in_hand += 1
+            self._stats.max_depth = max(self._stats.max_depth, self._in_hand)
+
+        future = asyncio.run_coroutine_threadsafe(self._handle(item), self._loop)
+        with self._lock:
+            self._pending.add(future)
+        # Runs at once if already done, after it was added to pending
+        future.add_done_callback(self._release)
+        return future
+
+    def close(self) -> None:
+        """
+        Finish handling all items, run the cleanup, then stop the stage thread.
+
+        Raises:
+            Exception: The first exception raised by the handler, if any.
+        """
+        if self._thread.is_alive():
+            with self._lock:
+                pending = list(self._pending)
+            wait(pending)
+
+            if self._cleanup is not None:
+                self._run_on_loop(self._cleanup())
+            self._run_on_loop(self._loop.shutdown_default_executor())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self.logger.debug("Stopped stage '%s'.", self._stats.name)
+
+        if not self._loop.is_closed():
+            self._loop.close()
+
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def get_stats(self) -> StageStats:
+        """Return the items in hand and handling latency of the stage."""
+        with self._lock:
+            return dataclasses.replace(self._stats, depth=self._in_hand)
+
+    def _run_on_loop(self, coroutine: Coroutine[Any, Any, object]) -> None:
+        """Await a coroutine on the stage loop, logging if it fails."""
+        try:
+            asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+        except Exception:
+            self.logger.exception(
+                "Stage '%s' failed to stop cleanly.", self._stats.name
+            )
+
+    def _release(self, future: Future[None]) -> None:
+        """Free the slot of a handled item."""
+        with self._lock:
+            self._pending.discard(future)
+            self._in_hand -= 1
+        self._slots.release()
+
+    async def _handle(self, item: T) -> None:
+        """Await the handler with an item, counting rather than raising errors."""
+        start = time.perf_counter()
+        try:
+            await self._handler(item)
+
+        except Exception as err:
+            self._stats.errors += 1
+            self._error = self._error or err
+            self.logger.exception("Stage '%s' failed on item.", self._stats.name)
+
+        elapsed = time.perf_counter() - start
+        self._stats.items += 1
+        self._stats.seconds += elapsed
+        self._stats.max_seconds = max(self._stats.max_seconds, elapsed)
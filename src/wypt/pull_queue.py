@@ -0,0 +1,132 @@
+"""
+Priority order of paste keys waiting to be pulled.
+
+Pastes are scored from their meta data. Pastes close to expiring, small
+pastes, pastes waiting longest, and syntaxes of interest are pulled first.
+Each feature is scaled to 0.0 - 1.0 and multiplied by its configured weight.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import heapq
+import itertools
+import time
+from collections.abc import Iterable
+from collections.abc import Mapping
+
+from .model import Meta
+
+# Seconds before expiry at which a paste starts gaining urgency
+EXPIRY_HORIZON = 3_600
+# Declared size, in bytes, at which a paste scores half the size weight
+SIZE_SCALE = 10_000
+# Seconds waiting at which a paste scores the full age weight
+AGE_HORIZON = 3_600
+
+
+@dataclasses.dataclass(frozen=True)
+class PullPriority:
+    """Weights of the features scoring a paste for pulling."""
+
+    expiry: float = 1.0
+    size: float = 0.5
+    age: float = 0.25
+    syntax: Mapping[str, float] = dataclasses.field(default_factory=dict)
+
+    def score(self, meta: Meta, now: float) -> float:
+        """Score a paste, higher is pulled sooner."""
+        expire = _to_int(meta.expire)
+        urgency = 0.0
+        if expire > 0:
+            urgency = min(1.0, max(0.0, 1 - (expire - now) / EXPIRY_HORIZON))
+
+        smallness = 1 / (1 + max(0, _to_int(meta.size)) / SIZE_SCALE)
+        age = min(1.0, max(0.0, (now - _to_int(meta.date)) / AGE_HORIZON))
+
+        return (
+            self.expiry * urgency
+            + self.size * smallness
+            + self.age * age
+            + self.syntax.get(meta.syntax, 0.0)
+        )
+
+
+class PullQueue:
+    """Paste keys ordered by priority, skipping pastes that have expired."""
+
+    def __init__(self, priority: PullPriority | None = None) -> None:
+        """
+        Create an empty queue.
+
+        Args:
+            priority: Weights used to score pastes, defaults if not provided
+        """
+        self._priority = priority or PullPriority()
+        # Entries of (-score, order added, key, expire)
+        self._heap: list[tuple[float, int, str, int]] = []
+        self._counter = itertools.count()
+        self._last: tuple[float, int, str, int] | None = None
+
+        self.pulled = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def keys(self) -> list[str]:
+        """Return the queued keys, in no particular order."""
+        return [entry[2] for entry in self._heap]
+
+    def add(self, meta: Meta, now: float | None = None) -> None:
+        """Queue the key of a paste. Equal scores are pulled in order added."""
+        now = now if now is not None else time.time()
+        score = self._priority.score(meta, now)
+        entry = (-score, next(self._counter), meta.key, _to_int(meta.expire))
+        heapq.heappush(self._heap, entry)
+
+    def reset(self, metas: Iterable[Meta], now: float | None = None) -> None:
+        """Replace the queued keys, counting any dropped that have expired."""
+        now = now if now is not None else time.time()
+        self.expired += sum(1 for entry in self._heap if _is_expired(entry[3], now))
+        self._heap = []
+        self._last = None
+        for meta in metas:
+            self.add(meta, now)
+
+    def pop(self, now: float | None = None) -> str | None:
+        """Return the highest scoring key, None if all remaining have expired."""
+        now = now if now is not None else time.time()
+        while self._heap:
+            score, order, key, expire = heapq.heappop(self._heap)
+            if _is_expired(expire, now):
+                self.expired += 1
+                continue
+
+            self.pulled += 1
+            self._last = (score, order, key, expire)
+            return key
+
+        return None
+
+    def requeue_last(self) -> None:
+        """Return the last popped key to the queue, for a pull that did not happen."""
+        if self._last is None:
+            return
+
+        heapq.heappush(self._heap, self._last)
+        self._last = None
+        self.pulled -= 1
+
+
+def _is_expired(expire: int, now: float) -> bool:
+    """True if an expire time is set and has passed."""
+    return 0 < expire <= now
+
+
+def _to_int(value: str) -> int:
+    """Convert a meta data field to int, zero if invalid."""
+    try:
+        return int(value)
+    except ValueError:
+        return 0
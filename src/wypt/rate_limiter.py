@@ -0,0 +1,230 @@
+"""
+Token bucket rate limiting on monotonic time.
+
+A bucket holds up to `burst` tokens and refills at `rate` tokens per second.
+Each action takes a token. Monotonic time is unaffected by wall clock jumps,
+and fractional tokens let cooldowns open at sub-second precision.
+
+A shared bucket keeps its tokens in a sqlite3 table instead, so every process
+on a host draws from the same budget and the state survives restarts.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import closing
+from contextlib import contextmanager
+
+
+class TokenBucket:
+    """Thread-safe token bucket."""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        *,
+        tokens: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Create a token bucket.
+
+        Args:
+            rate: Tokens added per second
+            burst: Most tokens held, the actions allowed back to back
+
+        Keyword Args:
+            tokens: Starting tokens, defaults to full. May be negative to hold
+                the bucket closed for longer than a single refill.
+            clock: Source of monotonic time in seconds
+
+        Raises:
+            ValueError: Raised if rate or burst are not above zero.
+        """
+        if rate <= 0 or burst <= 0:
+            raise ValueError(f"Invalid rate {rate} or burst {burst}")
+
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = min(float(burst), burst if tokens is None else tokens)
+        self._updated = clock()
+
+    @classmethod
+    def from_last_call(
+        cls,
+        cooldown: float,
+        burst: int = 1,
+        *,
+        last_call: float,
+    ) -> TokenBucket:
+        """
+        Create a bucket refilled as if it was last emptied at `last_call`.
+
+        Args:
+            cooldown: Seconds to refill a single token
+            burst: Most tokens held
+
+        Keyword Args:
+            last_call: Unix time of the last action. A time in the future holds
+                the bucket closed until then.
+        """
+        elapsed = time.time() - last_call
+        return cls(1 / cooldown, burst, tokens=elapsed / cooldown)
+
+    @property
+    def tokens(self) -> float:
+        """Tokens currently available."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens if available. Returns False, taking nothing, if not."""
+        with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until the tokens are available, zero if they are now."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = self._clock()
+        earned = (now - self._updated) * self.rate
+        self._tokens = min(float(self.burst), self._tokens + earned)
+        self._updated = now
+
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket stored in sqlite3, shared by every process using the file."""
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        name: str,
+        rate: float,
+        burst: int = 1,
+        *,
+        tokens: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Create a shared token bucket, or join the stored bucket of the same name.
+
+        Args:
+            connection: Connection to the sqlite3 file holding bucket state
+            name: Name of the bucket, shared by all processes limiting an action
+            rate: Tokens added per second
+            burst: Most tokens held, the actions allowed back to back
+
+        Keyword Args:
+            tokens: Starting tokens if the bucket is not yet stored, defaults
+                to full
+            clock: Source of unix time in seconds. Time is shared between
+                processes so must be wall clock time.
+
+        Raises:
+            ValueError: Raised if rate or burst are not above zero.
+        """
+        super().__init__(rate, burst, tokens=tokens, clock=clock)
+        self.name = name
+        self._dbconn = connection
+
+        with closing(self._dbconn.cursor()) as cursor:
+            cursor.execute("""\
+                CREATE TABLE IF NOT EXISTS token_bucket (
+                    name text PRIMARY KEY,
+                    tokens real NOT NULL,
+                    updated real NOT NULL
+                );
+                """)
+            cursor.execute(
+                "INSERT OR IGNORE INTO token_bucket VALUES (?, ?, ?);",
+                (name, self._tokens, self._updated),
+            )
+            self._dbconn.commit()
+
+    @property
+    def tokens(self) -> float:
+        """Tokens currently available."""
+        with self._lock:
+            self._peek()
+            return self._tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens if available. Returns False, taking nothing, if not."""
+        with self._lock, self._stored():
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until the tokens are available, zero if they are now."""
+        with self._lock:
+            self._peek()
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = self._clock()
+        # Wall clock may step backwards, never take tokens away for it
+        earned = max(0.0, now - self._updated) * self.rate
+        self._tokens = min(float(self.burst), self._tokens + earned)
+        self._updated = now
+
+    def _load(self, cursor: sqlite3.Cursor) -> bool:
+        """Read the stored bucket and refill it. True if the clock stepped back."""
+        cursor.execute(
+            "SELECT tokens, updated FROM token_bucket WHERE name = ?;",
+            (self.name,),
+        )
+        row = cursor.fetchone()
+        if row is not None:
+            self._tokens, self._updated = row
+        updated = self._updated
+        self._refill()
+        return self._updated < updated
+
+    def _peek(self) -> None:
+        """Load and refill the bucket with a read only, holding no write lock."""
+        with closing(self._dbconn.cursor()) as cursor:
+            stepped_back = self._load(cursor)
+
+        if stepped_back:
+            # Refills count from the stored time, store the earlier one
+            with self._stored():
+                pass
+
+    @contextmanager
+    def _stored(self) -> Iterator[None]:
+        """Load, refill, and store the bucket within a single write transaction."""
+        with closing(self._dbconn.cursor()) as cursor:
+            self._dbconn.commit()
+            cursor.execute("BEGIN IMMEDIATE;")
+            try:
+                self._load(cursor)
+                yield
+                cursor.execute(
+                    "INSERT OR REPLACE INTO token_bucket VALUES (?, ?, ?);",
+                    (self.name, self._tokens, self._updated),
+                )
+
+            except BaseException:
+                self._dbconn.rollback()
+                raise
+
+            self._dbconn.commit()
@@ -0,0 +1,97 @@
+"""
+Durable retries of failed item scrapes.
+
+A failed key is stored in the retry table with its attempt count and the
+time of its next attempt. Each attempt waits twice as long as the one
+before. Once out of attempts the key is dead-lettered and not pulled again.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+
+from .database import Database as _Database
+from .model import Meta
+from .model import Retry
+
+DEFAULT_BASE_DELAY = 30.0
+DEFAULT_MAX_DELAY = 3_600.0
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+class RetryQueue:
+    """Schedule failed keys for retry with exponential backoff."""
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        database: _Database,
+        *,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> None:
+        """
+        Create a retry queue stored in the database.
+
+        Args:
+            database: Database provider with added tables
+
+        Keyword Args:
+            base_delay: Seconds before the first retry
+            max_delay: Longest seconds between retries
+            max_attempts: Failed attempts, the first included, before a key
+                is dead-lettered
+        """
+        self._database = database
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._max_attempts = max(1, max_attempts)
+        # Keys handed out for retry, so success only touches the table for them
+        self._retrying: set[str] = set()
+
+        self.failed = 0
+        self.recovered = 0
+        self.dead = 0
+
+    def due(self, now: float | None = None, limit: int = 25) -> list[Meta]:
+        """Return Meta rows of keys due for retry."""
+        now = now if now is not None else time.time()
+        metas = self._database.get_retry_metas(now, limit)
+        self._retrying.update(meta.key for meta in metas)
+        return metas
+
+    def fail(self, key: str, error: str, now: float | None = None) -> Retry:
+        """Record a failed attempt, scheduling a retry or dead-lettering the key."""
+        now = now if now is not None else time.time()
+        previous = self._database.get_retry(key)
+        attempts = previous.attempts + 1 if previous is not None else 1
+
+        delay = min(self._max_delay, self._base_delay * 2 ** (attempts - 1))
+        dead = attempts >= self._max_attempts
+        retry = Retry(key, attempts, now + delay, error, dead)
+        self._database.save_retry(retry)
+        self._retrying.discard(key)
+        self.failed += 1
+
+        if dead:
+            self.dead += 1
+            self.logger.warning(
+                "Key %s dead-lettered after %d: %s", key, attempts, error
+            )
+        else:
+            self.logger.info("Key %s failed, retry in %.0fs: %s", key, delay, error)
+
+        return retry
+
+    def succeed(self, key: str) -> None:
+        """Clear the retry of a key pulled successfully."""
+        if key not in self._retrying:
+            return
+
+        self._retrying.discard(key)
+        self._database.delete_retry(key)
+        self.recovered += 1
+        self.logger.info("Key %s recovered on retry.", key)
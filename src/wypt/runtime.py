@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 import logging
+import time
 from dataclasses import dataclass
+from dataclasses import field
 from pathlib import Path
 from sqlite3 import Connection
 from typing import Any
@@ -11,8 +13,18 @@ from typing import Any
 import tomli
 
 from .database import Database
+from .database_profile import DEFAULT_PROFILE
+from .database_profile import DatabaseProfile
+from .database_profile import get_profile
+from .pastebin_api import AsyncPastebinAPI
 from .pastebin_api import PastebinAPI
 from .pattern_config import PatternConfig
+from .pull_queue import PullPriority
+from .rate_limiter import SharedTokenBucket
+from .rate_limiter import TokenBucket
+
+# Seconds to wait on another process holding the rate limit file
+RATE_LIMIT_TIMEOUT = 5.0
 
 
 @dataclass(frozen=True)
@@ -22,6 +34,38 @@ class _Config:
     database_file: str = "wypt_database.sqlite3"
     pattern_file: str = "wypt.toml"
     retain_posts_for_days: int = 1
+    scan_workers: int = 0
+    scan_max_in_flight: int = 8
+    regex_engine: str = "re"
+    pattern_time_budget: float = 0.0
+    scan_bytes: bool = False
+    stream_chunk_size: int = 0
+    stream_overlap: int = 1024
+    max_paste_bytes: int = 0
+    max_saved_bytes: int = 1_048_576
+    dedup_cache_size: int = 0
+    near_duplicate_threshold: float = 0.0
+    near_duplicate_capacity: int = 1000
+    near_duplicate_mode: str = "diff"
+    scrape_cooldown: float = 60.0
+    scrape_burst: int = 1
+    item_cooldown: float = 1.0
+    item_burst: int = 1
+    pipeline_queue_size: int = 0
+    async_fetch: bool = False
+    priority_expiry_weight: float = 1.0
+    priority_size_weight: float = 0.5
+    priority_age_weight: float = 0.25
+    priority_syntax_weights: dict[str, float] = field(default_factory=dict)
+    scrape_target_overlap: float = 0.2
+    retry_base_delay: float = 30.0
+    retry_max_delay: float = 3600.0
+    retry_max_attempts: int = 5
+    seen_key_capacity: int = 10000
+    lease_seconds: float = 0.0
+    rate_limit_file: str = ""
+    commit_rows: int = 0
+    commit_interval: float = 0.0
 
 
 class Runtime:
@@ -32,10 +76,14 @@ class Runtime:
     def __init__(self) -> None:
         """Provide runtime setup utility."""
         self._config: _Config | None = None
+        self._config_file = "wypt.toml"
+        self._database_profile: DatabaseProfile | None = None
         self._database_file = ":memory:"
         self._database: Database | None = None
         self._patterns: PatternConfig | None = None
         self._pastebinapi: PastebinAPI | None = None
+        self._async_pastebinapi: AsyncPastebinAPI | None = None
+        self._limiters: dict[str, TokenBucket] = {}
 
     def get_config(self) -> _Config:
         """Return loaded config, will load default if not already loaded."""
@@ -49,6 +97,12 @@ class Runtime:
             self._database = self._connect_database()
         return self._database
 
+    def get_database_profile(self) -> DatabaseProfile:
+        """Return the database tuning profile, will load from config if needed."""
+        if self._database_profile is None:
+            self._database_profile = self.load_database_profile(self._config_file)
+        return self._database_profile
+
     def get_patterns(self) -> PatternConfig:
         """Return loaded pattern config, will load default location in not loaded."""
         if self._patterns is None:
@@ -58,9 +112,67 @@ class Runtime:
     def get_api(self) -> PastebinAPI:
         """Return Pastebin API providerd."""
         if self._pastebinapi is None:
-            self._pastebinapi = PastebinAPI()
+            scrape_limiter, item_limiter = self._get_api_limiters()
+            self._pastebinapi = PastebinAPI(
+                scrape_limiter=scrape_limiter,
+                item_limiter=item_limiter,
+            )
         return self._pastebinapi
 
+    def get_async_api(self) -> AsyncPastebinAPI:
+        """Return asyncio Pastebin API provider, sharing the limits of `.get_api()`."""
+        if self._async_pastebinapi is None:
+            scrape_limiter, item_limiter = self._get_api_limiters()
+            self._async_pastebinapi = AsyncPastebinAPI(
+                scrape_limiter=scrape_limiter,
+                item_limiter=item_limiter,
+            )
+        return self._async_pastebinapi
+
+    def _get_api_limiters(self) -> tuple[TokenBucket, TokenBucket]:
+        """Return the scrape and item limiters of the API providers."""
+        config = self.get_config()
+        return (
+            self._get_limiter("scrape", config.scrape_cooldown, config.scrape_burst),
+            self._get_limiter("scrape_item", config.item_cooldown, config.item_burst),
+        )
+
+    def _get_limiter(self, name: str, cooldown: float, burst: int) -> TokenBucket:
+        """Return a limiter, shared through the rate limit file if configured."""
+        if name in self._limiters:
+            return self._limiters[name]
+
+        rate_limit_file = self.get_config().rate_limit_file
+        if not rate_limit_file:
+            # Without stored state assume the budget was spent just now
+            limiter = TokenBucket.from_last_call(cooldown, burst, last_call=time.time())
+
+        else:
+            # A connection each, limiters are used from different threads
+            dbconn = Connection(
+                rate_limit_file,
+                timeout=RATE_LIMIT_TIMEOUT,
+                check_same_thread=False,
+            )
+            self.logger.info(
+                "Sharing rate limit '%s' through '%s'.", name, rate_limit_file
+            )
+            # A bucket not yet stored starts empty, as the budget may have been spent
+            limiter = SharedTokenBucket(dbconn, name, 1 / cooldown, burst, tokens=0.0)
+
+        self._limiters[name] = limiter
+        return limiter
+
+    def get_pull_priority(self) -> PullPriority:
+        """Return the weights ordering pastes to pull, from loaded config."""
+        config = self.get_config()
+        return PullPriority(
+            expiry=config.priority_expiry_weight,
+            size=config.priority_size_weight,
+            age=config.priority_age_weight,
+            syntax=config.priority_syntax_weights,
+        )
+
     def set_database(self, database_file: str = ":memory:") -> None:
         """Set the file target for the sqlite3 database."""
         self._database_file = database_file
@@ -83,7 +195,13 @@ class Runtime:
         # Connect to and build database
         database_file = database_file if database_file else self._database_file
         dbconn = Connection(database_file, check_same_thread=check_same_thread)
-        self._database = Database(dbconn)
+        applied = self.get_database_profile().apply(dbconn)
+        self.logger.info("Database settings applied: %s", applied or "defaults")
+        self._database = Database(
+            dbconn,
+            commit_rows=self.get_config().commit_rows,
+            commit_interval=self.get_config().commit_interval,
+        )
         self._database.init_tables()
         return self._database
 
@@ -91,21 +209,47 @@ class Runtime:
         """Load and return config file. Uses defaults if not found."""
         config = self._load_toml_section(config_file, "CONFIG")
         self._config = _Config(**config) if config else _Config()
+        self._config_file = config_file
         return self._config
 
+    def load_database_profile(self, config_file: str = "wypt.toml") -> DatabaseProfile:
+        """Load and return the database profile. Uses defaults if not found."""
+        section = self._load_toml_section(config_file, "DATABASE", required=False)
+        name = section.get("profile", DEFAULT_PROFILE)
+        try:
+            self._database_profile = get_profile(name, section.get("profiles"))
+
+        except ValueError as err:
+            self.logger.error("Using default database profile - '%s'", err)
+            self._database_profile = get_profile(DEFAULT_PROFILE)
+
+        return self._database_profile
+
     def load_patterns(self, pattern_file: str = "wypt.toml") -> PatternConfig:
         """Load and return pattern config."""
         patterns = self._load_toml_section(pattern_file, "PATTERNS")
-        self._patterns = PatternConfig(patterns)
+        self._patterns = PatternConfig(
+            patterns,
+            engine=self.get_config().regex_engine,
+            time_budget=self.get_config().pattern_time_budget,
+            as_bytes=self.get_config().scan_bytes,
+        )
         return self._patterns
 
-    def _load_toml_section(self, file_name: str, section: str) -> dict[str, Any]:
+    def _load_toml_section(
+        self,
+        file_name: str,
+        section: str,
+        *,
+        required: bool = True,
+    ) -> dict[str, Any]:
         """Load toml, handle errors, return specific section or empty dict."""
         try:
             return tomli.load(Path(file_name).open("rb"))[section]
 
         except KeyError:
-            self.logger.error("[%s] section missing from %s", section, file_name)
+            if required:
+                self.logger.error("[%s] section missing from %s", section, file_name)
 
         except FileNotFoundError:
             self.logger.error("Config file not found: '%s'", file_name)
@@ -0,0 +1,172 @@
+"""
+Deadline scheduler for recurring jobs.
+
+Jobs are kept in a heap ordered by when they are next due. The scheduler
+sleeps until the earliest deadline, or until a job is woken from any thread,
+instead of polling. Each job returns the delay until its next run.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import heapq
+import logging
+import math
+import threading
+import time
+from collections.abc import Callable
+
+# A job runs and returns seconds until it is next due. math.inf parks the job
+# until it is woken, None removes it.
+Job = Callable[[], "float | None"]
+
+
+@dataclasses.dataclass
+class JobStats:
+    """Run count and timing drift of a scheduled job."""
+
+    name: str
+    runs: int = 0
+    drift: float = 0.0
+    max_drift: float = 0.0
+
+    @property
+    def mean_drift(self) -> float:
+        """Average seconds between when the job was due and when it ran."""
+        return self.drift / self.runs if self.runs else 0.0
+
+
+class Scheduler:
+    """Run recurring jobs at their deadlines."""
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, *, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Create an empty scheduler.
+
+        Keyword Args:
+            clock: Source of monotonic time in seconds
+        """
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._heap: list[tuple[float, int, str]] = []
+        self._jobs: dict[str, Job] = {}
+        self._due: dict[str, float] = {}
+        self._stats: dict[str, JobStats] = {}
+        self._sequence = 0
+        self._stopped = False
+
+    def add_job(self, name: str, job: Job, *, delay: float = 0.0) -> None:
+        """
+        Add, or replace, a named job.
+
+        Args:
+            name: Unique name of the job
+            job: Callable returning seconds until it next runs
+            delay: Seconds until the first run. math.inf waits to be woken.
+        """
+        with self._condition:
+            self._jobs[name] = job
+            self._stats.setdefault(name, JobStats(name))
+            self._schedule(name, delay)
+
+    def wake(self, name: str) -> None:
+        """Make a job due now. Safe to call from any thread."""
+        with self._condition:
+            if name not in self._jobs:
+                return
+            # A job running has no deadline until it returns
+            due = self._due.get(name)
+            if due is None or due > self._clock():
+                self._schedule(name, 0.0)
+
+    def stop(self) -> None:
+        """Stop `.run()` after the job running, if any, returns."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def run(self) -> None:
+        """Run jobs as they come due until stopped or no jobs remain."""
+        with self._condition:
+            self._stopped = False
+
+        while True:
+            self.run_pending()
+            with self._condition:
+                if self._stopped or not self._jobs:
+                    return
+                # Checked under the lock so a wake from another thread is not missed
+                timeout = self._next_due() - self._clock()
+                if timeout > 0:
+                    self._condition.wait(None if math.isinf(timeout) else timeout)
+
+    def run_pending(self) -> float:
+        """Run every job that is due, return seconds until the next is due."""
+        while True:
+            with self._condition:
+                name = self._pop_due()
+                if name is None:
+                    return self._next_due() - self._clock()
+
+            # Jobs run without the lock so other threads can wake jobs meanwhile
+            delay = self._jobs[name]()
+
+            with self._condition:
+                if delay is None:
+                    self._remove(name)
+                elif self._due.get(name) is None:
+                    self._schedule(name, delay)
+                else:
+                    # Woken while running, keep the earlier of both deadlines
+                    due = self._clock() + max(0.0, delay)
+                    self._schedule(name, min(due, self._due[name]) - self._clock())
+
+    def get_stats(self) -> list[JobStats]:
+        """Return the run count and drift of each job."""
+        return list(self._stats.values())
+
+    def _pop_due(self) -> str | None:
+        """Take the job that is due now off the heap, recording its drift."""
+        while self._heap:
+            due, _, name = self._heap[0]
+            if self._due.get(name) != due:
+                # Superseded by a later schedule or wake
+                heapq.heappop(self._heap)
+                continue
+
+            now = self._clock()
+            if due > now or self._stopped:
+                return None
+
+            heapq.heappop(self._heap)
+            del self._due[name]
+            self._record(name, now - due)
+            return name
+
+        return None
+
+    def _next_due(self) -> float:
+        """Clock time the next job is due, math.inf if none."""
+        return min(self._due.values(), default=math.inf)
+
+    def _schedule(self, name: str, delay: float) -> None:
+        """Push the next deadline of a job and wake the run loop."""
+        due = self._clock() + max(0.0, delay)
+        self._due[name] = due
+        self._sequence += 1
+        heapq.heappush(self._heap, (due, self._sequence, name))
+        self._condition.notify_all()
+
+    def _remove(self, name: str) -> None:
+        """Drop a job. Its stats are kept."""
+        self._jobs.pop(name, None)
+        self._due.pop(name, None)
+
+    def _record(self, name: str, drift: float) -> None:
+        """Record a run of a job started `drift` seconds after it was due."""
+        stats = self._stats[name]
+        stats.runs += 1
+        stats.drift += drift
+        stats.max_drift = max(stats.max_drift, drift)
@@ -0,0 +1,54 @@
+"""
+Bounded set of recently seen paste keys.
+
+Keys are kept in the order last seen and the oldest are dropped beyond
+capacity. Unlike a Bloom filter there are no false positives, so a new key
+is never mistaken for one already stored. A dropped key only costs a
+redundant insert.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Iterable
+
+DEFAULT_CAPACITY = 10_000
+
+
+class SeenKeys:
+    """Bounded set of recently seen keys, oldest dropped first."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """
+        Create an empty set.
+
+        Args:
+            capacity: Most keys held. Zero or less holds none.
+        """
+        self._capacity = capacity
+        self._keys: OrderedDict[str, None] = OrderedDict()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def update(self, keys: Iterable[str]) -> None:
+        """Mark keys as seen, most recent last."""
+        if self._capacity <= 0:
+            return
+
+        for key in keys:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+
+        while len(self._keys) > self._capacity:
+            self._keys.popitem(last=False)
+
+    def filter_new(self, keys: Iterable[str]) -> set[str]:
+        """Return the keys not seen, marking all keys as seen."""
+        keys = list(keys)
+        new = {key for key in keys if key not in self._keys}
+        self.update(keys)
+        return new
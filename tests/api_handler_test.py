@@ -4,8 +4,10 @@ from unittest.mock import patch
 
 import pytest
 
+from tests.conftest import MATCH_ROWS
 from wypt.api_handler import APIHandler
 from wypt.database import Database
+from wypt.model import Match
 
 
 @pytest.fixture
@@ -59,3 +61,50 @@ def test_get_matchview_content_returns_content(handler: APIHandler) -> None:
 
     assert 2 == result.total_rows
     assert result.matchviews
+
+
+def test_get_matchview_context_pages_by_cursor(handler: APIHandler) -> None:
+    handler._database.insert_matches([Match(MATCH_ROWS[0].key, "Other", "value")])
+    rows = handler._database.get_match_views()
+
+    first = handler.get_matchview_context(1)
+    second = handler.get_matchview_context(1, cursor=first.next_cursor)
+    third = handler.get_matchview_context(1, cursor=second.next_cursor)
+    back = handler.get_matchview_context(1, cursor=third.previous_cursor)
+
+    assert [first.matchviews, second.matchviews, third.matchviews] == [
+        rows[:1],
+        rows[1:2],
+        rows[2:],
+    ]
+    assert [second.current_page, third.current_page, back.current_page] == [2, 3, 2]
+    assert not first.previous_cursor
+    assert not third.next_cursor
+    assert back.matchviews == second.matchviews
+    assert back.next_cursor
+
+
+def test_get_matchview_context_previous_reaching_first_page(
+    handler: APIHandler,
+) -> None:
+    second = handler.get_matchview_context(1, 1)
+    handler._database.delete_match_view(MATCH_ROWS[0].key)
+
+    result = handler.get_matchview_context(1, cursor=second.previous_cursor)
+
+    assert result.offset == 0
+    assert result.cursor == ""
+    assert not result.previous_cursor
+    assert [row.key for row in result.matchviews] == [MATCH_ROWS[1].key]
+
+
+@pytest.mark.parametrize("cursor", ("not a cursor", "e30", "W10"))
+def test_get_matchview_context_ignores_invalid_cursor(
+    handler: APIHandler,
+    cursor: str,
+) -> None:
+    result = handler.get_matchview_context(1, 1, cursor)
+
+    assert result.offset == 1
+    assert result.cursor == ""
+    assert len(result.matchviews) == 1
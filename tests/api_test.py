@@ -48,6 +48,14 @@ def test_route_matchview_table() -> None:
     assert result.media_type == "text/html"
 
 
+def test_route_matchview_table_pushes_cursor_url() -> None:
+    cursor = api_module.api_handler.get_matchview_context(1).next_cursor
+
+    result = api_module.matchview_table(MagicMock(), 1, 0, cursor)
+
+    assert result.headers["HX-Push-Url"] == f"/matchview?limit=1&cursor={cursor}"
+
+
 def test_route_matchview_delete_returns_success() -> None:
     key = META_ROWS[0].key
 
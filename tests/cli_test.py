@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from typing import Any
 from unittest.mock import patch
 
 from wypt import cli
@@ -13,3 +14,25 @@ def test_scan() -> None:
             cli.scan()
 
     assert mock_run.call_count == 1
+
+
+def test_rebuild_counters(caplog: Any) -> None:
+    safe_config = _Config(database_file=":memory:")
+    with patch.object(cli.runtime, "get_config", return_value=safe_config):
+        with caplog.at_level("INFO"):
+            result = cli.rebuild_counters()
+
+    assert result == 0
+    assert "Counter 'match' rebuilt, off by 0" in caplog.text
+
+
+def test_rebuild_counters_warns_of_drift(caplog: Any) -> None:
+    safe_config = _Config(database_file=":memory:")
+    database = cli.runtime.get_database()
+    with patch.object(cli.runtime, "get_config", return_value=safe_config):
+        with patch.object(database, "rebuild_counters", return_value={"match": 2}):
+            with caplog.at_level("WARNING"):
+                result = cli.rebuild_counters()
+
+    assert result == 0
+    assert "Counter 'match' rebuilt, off by 2" in caplog.text
@@ -19,12 +19,12 @@ META_ROWS = [Meta(**d) for d in json.loads(METAS)]
 PASTE_ROWS = [Paste(**d) for d in json.loads(PASTES)]
 MATCH_ROWS = [Match(**d) for d in json.loads(MATCHES)]
 
-TABLES = ["meta", "paste", "match"]
+TABLES = ["meta", "paste", "match", "retry", "lease"]
 
 
 @pytest.fixture
 def db() -> Database:
-    dbconn = Connection(":memory:")
+    dbconn = Connection(":memory:", check_same_thread=False)
 
     database = Database(dbconn)
     database.init_tables()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Any
+
+import pytest
+
+from wypt.database_profile import PROFILES
+from wypt.database_profile import DatabaseProfile
+from wypt.database_profile import get_profile
+
+
+def test_apply_reports_settings(tmp_path: Path) -> None:
+    dbconn = Connection(str(tmp_path / "db.sqlite3"))
+
+    applied = PROFILES["concurrent"].apply(dbconn)
+
+    assert applied["journal_mode"] == "wal"
+    assert applied["synchronous"] == 1  # NORMAL
+    assert applied["busy_timeout"] == 5_000
+    assert applied["cache_size"] == -65_536
+
+
+def test_apply_skips_unset_settings() -> None:
+    dbconn = Connection(":memory:")
+
+    assert PROFILES["default"].apply(dbconn) == {}
+    assert DatabaseProfile(temp_store="memory").apply(dbconn) == {"temp_store": 2}
+
+
+def test_get_profile_applies_overrides() -> None:
+    overrides: dict[str, dict[str, Any]] = {
+        "concurrent": {"mmap_size": 0},
+        "custom": {"synchronous": "FULL"},
+    }
+
+    concurrent = get_profile("concurrent", overrides)
+    custom = get_profile("custom", overrides)
+
+    assert concurrent.mmap_size == 0
+    assert concurrent.journal_mode == "WAL"
+    assert custom == DatabaseProfile(synchronous="FULL")
+
+
+@pytest.mark.parametrize(
+    ("name", "overrides"),
+    (
+        ("missing", None),
+        ("default", {"default": {"journal_mode": "WAL; DROP TABLE meta"}}),
+        ("default", {"default": {"cache_size": "1"}}),
+        ("default", {"default": {"page_size": 1}}),
+    ),
+)
+def test_get_profile_invalid(
+    name: str, overrides: dict[str, dict[str, object]]
+) -> None:
+    with pytest.raises(ValueError):
+        get_profile(name, overrides)
@@ -1,5 +1,11 @@
 from __future__ import annotations
 
+import dataclasses
+from pathlib import Path
+from sqlite3 import Connection
+from sqlite3 import OperationalError
+from unittest.mock import patch
+
 import pytest
 
 from tests.conftest import MATCH_ROWS
@@ -7,7 +13,9 @@ from tests.conftest import META_ROWS
 from tests.conftest import PASTE_ROWS
 from tests.conftest import TABLES
 from wypt.database import Database
+from wypt.model import Match
 from wypt.model import Paste
+from wypt.model import Retry
 
 
 @pytest.mark.parametrize("table", TABLES)
@@ -49,6 +57,16 @@ def test_insert_one_paste_row_ignores_constraint_errors(db: Database) -> None:
     assert row_count == 1
 
 
+def test_get_recent_meta_keys(db: Database) -> None:
+    db.insert_metas(META_ROWS)
+    newest = sorted(META_ROWS, key=lambda meta: int(meta.date))[-3:]
+
+    results = db.get_recent_meta_keys(limit=3)
+
+    assert set(results) == {meta.key for meta in newest}
+    assert results[-1] == newest[-1].key
+
+
 def test_get_keys_to_pul(db: Database) -> None:
     # Setup two databases with mock data. Results should expect
     # all keys of meta fixture to be returns sans 0th index key.
@@ -62,6 +80,91 @@ def test_get_keys_to_pul(db: Database) -> None:
     assert len(results) == len(META_ROWS) - 1
 
 
+def test_get_metas_to_pull(db: Database) -> None:
+    expired = dataclasses.replace(META_ROWS[1], expire="100")
+    expiring = dataclasses.replace(META_ROWS[2], expire="300")
+    db.insert_metas([META_ROWS[0], expired, expiring, *META_ROWS[3:]])
+    db.insert_paste(Paste(META_ROWS[0].key, ""))
+
+    results = db.get_metas_to_pull(limit=100, now=200)
+    dates = [int(meta.date) for meta in results]
+
+    assert {meta.key for meta in results} == {m.key for m in META_ROWS[2:]}
+    assert dates == sorted(dates, reverse=True)
+    assert len(db.get_metas_to_pull(limit=100)) == len(META_ROWS) - 1
+
+
+def test_get_metas_to_pull_near_expiry_first(db: Database) -> None:
+    # Oldest rows, past the limit by date, expire within the horizon
+    later = dataclasses.replace(META_ROWS[-1], expire="1500")
+    sooner = dataclasses.replace(META_ROWS[-2], expire="1200")
+    db.insert_metas([*META_ROWS[:-2], sooner, later])
+
+    results = db.get_metas_to_pull(limit=3, now=1_000, horizon=600)
+    by_date = db.get_metas_to_pull(limit=3, now=1_000)
+
+    assert [meta.key for meta in results[:2]] == [sooner.key, later.key]
+    assert sooner.key not in {meta.key for meta in by_date}
+
+
+def test_save_get_delete_retry(db: Database) -> None:
+    retry = Retry("mock", 2, 10.5, "Timed out", True)
+
+    db.save_retry(retry)
+    saved = db.get_retry("mock")
+    db.delete_retry("mock")
+
+    assert saved == retry
+    assert db.get_retry("mock") is None
+
+
+def test_retry_keys_are_not_pulled_until_due(db: Database) -> None:
+    db.insert_metas(META_ROWS)
+    db.save_retry(Retry(META_ROWS[0].key, 1, 100, "mock"))
+
+    pull_keys = [meta.key for meta in db.get_metas_to_pull(limit=100)]
+
+    assert META_ROWS[0].key not in pull_keys
+    assert db.get_retry_metas(now=99) == []
+    assert db.get_retry_metas(now=100) == [META_ROWS[0]]
+
+
+def test_claim_keys_skips_unexpired_leases_of_others(db: Database) -> None:
+    keys = [meta.key for meta in META_ROWS]
+    db.insert_metas(META_ROWS)
+
+    first = db.claim_keys(keys[:2], "first", now=0, expires=100)
+    second = db.claim_keys(keys, "second", now=50, expires=150)
+    pull_keys = {meta.key for meta in db.get_metas_to_pull(limit=100, now=50)}
+
+    assert first == keys[:2]
+    assert second == keys[2:]
+    assert pull_keys.isdisjoint(keys)
+
+
+def test_claim_keys_reclaims_expired_leases(db: Database) -> None:
+    db.claim_keys(["mock"], "first", now=0, expires=100)
+
+    assert db.claim_keys(["mock"], "second", now=100, expires=200) == ["mock"]
+    assert db.claim_keys(["mock"], "first", now=150, expires=250) == []
+
+
+def test_renew_and_release_leases(db: Database) -> None:
+    db.claim_keys(["mock1", "mock2"], "first", now=0, expires=100)
+
+    renewed = db.renew_leases(["mock1"], "first", expires=300)
+    not_owned = db.renew_leases(["mock2"], "second", expires=300)
+    db.release_leases("first", ["mock2"])
+
+    assert renewed == 1
+    assert not_owned == 0
+    assert db.claim_keys(["mock1"], "second", now=200, expires=400) == []
+    assert db.claim_keys(["mock2"], "second", now=0, expires=400) == ["mock2"]
+
+    db.release_leases("first")
+    assert db.claim_keys(["mock1"], "second", now=0, expires=400) == ["mock1"]
+
+
 def test_get_match_views(mock_database: Database) -> None:
     rows = mock_database.get_match_views()
 
@@ -81,6 +184,62 @@ def test_get_match_views_returns_empty_over_offset(mock_database: Database) -> N
     assert not rows
 
 
+def test_get_match_views_seeks_after_and_before(mock_database: Database) -> None:
+    mock_database.insert_matches([Match(MATCH_ROWS[0].key, "Other", "value")])
+    rows = mock_database.get_match_views()
+
+    after = mock_database.get_match_views(2, after=rows[0])
+    before = mock_database.get_match_views(2, 5, before=rows[-1])
+
+    assert len(rows) == 3
+    assert after == rows[1:]
+    assert before == rows[:2]
+    assert mock_database.get_match_views(after=rows[-1]) == []
+
+
+def test_get_match_views_uses_date_index(db: Database) -> None:
+    sql = "EXPLAIN QUERY PLAN SELECT * FROM meta WHERE date > ? ORDER BY date, key"
+    plan = str(db._dbconn.execute(sql, ("0",)).fetchall())
+
+    assert "meta_date" in plan
+
+
+def test_init_creates_counters(db: Database) -> None:
+    assert db.get_counters() == {"meta": 0, "paste": 0, "match": 0}
+
+
+def test_counters_follow_inserts_and_deletes(mock_database: Database) -> None:
+    mock_database.insert_metas(META_ROWS)  # Ignored rows are not counted
+    mock_database.copy_matches(MATCH_ROWS[0].key, "copy")
+    mock_database.delete_match_view(META_ROWS[0].key)
+    counted = mock_database.get_counters()
+
+    drift = mock_database.rebuild_counters()
+
+    assert counted == mock_database.get_counters()
+    assert drift == {"meta": 0, "paste": 0, "match": 0}
+
+
+def test_init_tables_counts_existing_rows() -> None:
+    dbconn = Connection(":memory:")
+    dbconn.executescript(Match.as_sql())
+    dbconn.execute("INSERT INTO match VALUES ('mock', 'mock', 'mock');")
+    database = Database(dbconn)
+
+    database.init_tables()
+
+    assert database.match_count() == 1
+
+
+def test_rebuild_counters_corrects_drift(mock_database: Database) -> None:
+    mock_database._dbconn.execute("UPDATE counter SET count = 10 WHERE name = 'match'")
+
+    drift = mock_database.rebuild_counters()
+
+    assert drift["match"] == 10 - len(MATCH_ROWS)
+    assert mock_database.match_count() == len(MATCH_ROWS)
+
+
 def test_get_total_matches(mock_database: Database) -> None:
     count = mock_database.match_count()
 
@@ -96,3 +255,150 @@ def test_delete_match_view(mock_database: Database) -> None:
     result = mock_database.delete_match_view(key)
 
     assert not result
+
+
+def test_get_matches(mock_database: Database) -> None:
+    key = MATCH_ROWS[0].key
+
+    result = mock_database.get_matches(key)
+
+    assert result == [row for row in MATCH_ROWS if row.key == key]
+    assert mock_database.get_matches("missing") == []
+
+
+def test_delete_match_view_moves_content_to_reference(
+    mock_database: Database,
+) -> None:
+    mock_database.insert_paste(Paste("mock1", "same", digest="digest"))
+    mock_database.insert_paste(Paste("mock2", "", digest="digest"))
+    mock_database.insert_paste(Paste("mock3", "", digest="digest"))
+
+    mock_database.delete_match_view("mock1")
+
+    assert mock_database.get_paste("mock1") is None
+    assert mock_database.get_paste("mock2") == Paste("mock2", "same", digest="digest")
+    assert mock_database.get_paste("mock3") == Paste("mock3", "same", digest="digest")
+    rows = mock_database._dbconn.execute(
+        "SELECT key FROM paste WHERE content != '' AND digest = 'digest'"
+    ).fetchall()
+    assert len(rows) == 1
+
+
+def test_group_commit_flushes_every_n_rows(tmp_path: Path) -> None:
+    file = str(tmp_path / "db.sqlite3")
+    database = Database(Connection(file), commit_rows=3)
+    database.init_tables()
+    reader = Connection(file)
+
+    database.insert_paste(PASTE_ROWS[0])
+    database.insert_paste(PASTE_ROWS[1])
+    before = reader.execute("SELECT count(*) FROM paste").fetchone()[0]
+    database.insert_matches(MATCH_ROWS[:1])
+    after = reader.execute("SELECT count(*) FROM paste").fetchone()[0]
+
+    assert database.get_paste(PASTE_ROWS[1].key) is not None
+    assert before == 0
+    assert after == 2
+    assert database.pending_rows == 0
+
+
+def test_group_commit_flushes_after_interval(tmp_path: Path) -> None:
+    file = str(tmp_path / "db.sqlite3")
+    database = Database(Connection(file), commit_interval=10.0)
+    database.init_tables()
+    reader = Connection(file)
+
+    with patch("time.monotonic", return_value=100.0):
+        database.insert_paste(PASTE_ROWS[0])
+    with patch("time.monotonic", return_value=105.0):
+        database.insert_paste(PASTE_ROWS[1])
+    pending = database.pending_rows
+    with patch("time.monotonic", return_value=110.0):
+        database.insert_paste(Paste("mock", ""))
+
+    assert pending == 2
+    assert reader.execute("SELECT count(*) FROM paste").fetchone()[0] == 3
+
+
+def test_flush_commits_grouped_writes(tmp_path: Path) -> None:
+    file = str(tmp_path / "db.sqlite3")
+    database = Database(Connection(file), commit_rows=100)
+    database.init_tables()
+    database.insert_metas(META_ROWS)
+
+    database.flush()
+
+    assert Connection(file).execute("SELECT count(*) FROM meta").fetchone()[0] > 0
+    assert database.pending_rows == 0
+
+
+def test_grouped_writes_hold_no_write_lock(tmp_path: Path) -> None:
+    file = str(tmp_path / "db.sqlite3")
+    database = Database(Connection(file), commit_rows=100)
+    database.init_tables()
+    other = Connection(file, timeout=0)
+
+    database.insert_paste(PASTE_ROWS[0])
+    other.execute("BEGIN IMMEDIATE;")  # Raises "database is locked" if held
+    other.execute("INSERT INTO paste (key, content) VALUES ('other', '');")
+    other.commit()
+
+    assert database.pending_rows == 1
+    assert database.get_paste(PASTE_ROWS[0].key) is not None  # Reads flush first
+    assert database.pending_rows == 0
+    assert database.get_paste("other") is not None
+
+
+def test_failed_flush_keeps_grouped_writes(tmp_path: Path) -> None:
+    file = str(tmp_path / "db.sqlite3")
+    database = Database(Connection(file, timeout=0), commit_rows=100)
+    database.init_tables()
+    other = Connection(file, timeout=0)
+
+    database.insert_paste(PASTE_ROWS[0])
+    other.execute("BEGIN IMMEDIATE;")
+    with pytest.raises(OperationalError):
+        database.flush()
+    other.rollback()
+    pending = database.pending_rows
+    database.flush()
+
+    assert pending == 1
+    assert database.pending_rows == 0
+    assert database.get_paste(PASTE_ROWS[0].key) is not None
+
+
+def test_insert_paste_stores_truncated(db: Database) -> None:
+    db.insert_paste(Paste("mock", "content", truncated=True))
+
+    row = db._dbconn.execute("SELECT truncated FROM paste").fetchone()
+
+    assert row[0] == 1
+
+
+def test_get_meta(mock_database: Database) -> None:
+    result = mock_database.get_meta(META_ROWS[0].key)
+
+    assert result == META_ROWS[0]
+    assert mock_database.get_meta("missing") is None
+
+
+def test_copy_matches(mock_database: Database) -> None:
+    source = MATCH_ROWS[0].key
+    expected = sum(1 for match in MATCH_ROWS if match.key == source)
+
+    copied = mock_database.copy_matches(source, "mock")
+    copied_again = mock_database.copy_matches(source, "mock")
+
+    assert copied == expected
+    assert copied_again == 0
+
+
+def test_get_paste_resolves_content_by_digest(db: Database) -> None:
+    db.insert_paste(Paste("original", "content", digest="abc"))
+    db.insert_paste(Paste("reference", "", digest="abc"))
+    db.insert_paste(Paste("empty", ""))
+
+    assert db.get_paste("reference") == Paste("reference", "content", digest="abc")
+    assert db.get_paste("empty") == Paste("empty", "")
+    assert db.get_paste("missing") is None
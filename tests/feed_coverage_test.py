@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pytest
+
+from wypt.feed_coverage import DEFAULT_LIMIT
+from wypt.feed_coverage import FeedCoverage
+
+
+def _keys(prefix: str, count: int) -> list[str]:
+    return [f"{prefix}{n}" for n in range(count)]
+
+
+def test_first_update_has_no_overlap() -> None:
+    feed = FeedCoverage(0.2)
+
+    overlap = feed.update(_keys("a", 100))
+
+    assert overlap == 0.0
+    assert feed.possible_gaps == 0
+    assert feed.limit == DEFAULT_LIMIT
+
+
+@pytest.mark.parametrize(
+    ("new_count", "expected"),
+    ((40, 50), (1, 10), (99, 124), (200, 250)),
+)
+def test_limit_follows_new_keys(new_count: int, expected: int) -> None:
+    feed = FeedCoverage(0.2)
+    feed.update(_keys("a", 250))
+
+    feed.update(_keys("b", new_count) + _keys("a", 10))
+
+    assert feed.limit == expected
+
+
+def test_no_overlap_counts_gap_and_raises_limit() -> None:
+    feed = FeedCoverage(0.2)
+    feed.update(_keys("a", 100))
+
+    overlap = feed.update(_keys("b", 100))
+
+    assert overlap == 0.0
+    assert feed.possible_gaps == 1
+    assert feed.limit == 250
+
+
+def test_zero_target_keeps_limit_and_counts_gaps() -> None:
+    feed = FeedCoverage()
+    feed.update(_keys("a", 100))
+    feed.update(_keys("b", 100))
+    overlap = feed.update(_keys("c", 50) + _keys("b", 50))
+
+    assert overlap == 0.5
+    assert feed.possible_gaps == 1
+    assert feed.scrapes == 3
+    assert feed.limit == DEFAULT_LIMIT
+
+
+def test_empty_scrape_is_ignored() -> None:
+    feed = FeedCoverage(0.2)
+    feed.update(_keys("a", 100))
+
+    assert feed.update([]) == 0.0
+    assert feed.update(_keys("a", 100)) == 1.0
+    assert feed.possible_gaps == 0
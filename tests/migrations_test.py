@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+from pathlib import Path
+from sqlite3 import Connection
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from tests.conftest import META_ROWS
+from wypt import migrations
+from wypt.database import Database
+from wypt.model import Meta
+from wypt.model import Paste
+
+# The meta table as created before version 1
+LEGACY_META = """\
+    CREATE TABLE meta (
+        key text NOT NULL,
+        scrape_url text NOT NULL,
+        full_url text NOT NULL,
+        date text NOT NULL,
+        size text NOT NULL,
+        expire text NOT NULL,
+        title text NOT NULL,
+        syntax text NOT NULL,
+        user text NOT NULL,
+        hits text NOT NULL
+    );
+    CREATE UNIQUE INDEX meta_key ON meta(key);
+    CREATE INDEX syntax_flag ON meta(syntax);
+"""
+
+
+@pytest.fixture
+def legacy() -> Connection:
+    return _create_legacy(Connection(":memory:"))
+
+
+def _create_legacy(dbconn: Connection) -> Connection:
+    dbconn.executescript(LEGACY_META)
+    values = [list(meta.to_dict().values()) for meta in META_ROWS]
+    dbconn.executemany(f"INSERT INTO meta VALUES ({', '.join('?' * 10)})", values)
+    dbconn.execute(
+        "INSERT INTO meta VALUES ('blank', '', '', '1', '', '', '', '', '', '')"
+    )
+    dbconn.commit()
+    return dbconn
+
+
+def test_new_database_is_latest_version(db: Database) -> None:
+    assert migrations.get_version(db._dbconn) == len(migrations.MIGRATIONS)
+    assert migrations.migrate(db._dbconn) == 0
+
+
+def test_init_tables_migrates_meta_to_integers(legacy: Connection) -> None:
+    database = Database(legacy)
+
+    with patch.object(migrations, "BATCH_SIZE", 2):  # Copy in several batches
+        database.init_tables()
+
+    types = legacy.execute(
+        "SELECT DISTINCT typeof(date), typeof(size), typeof(expire), typeof(hits) "
+        "FROM meta"
+    ).fetchall()
+    indexes = {
+        row[0]
+        for row in legacy.execute(
+            "SELECT name FROM sqlite_master WHERE tbl_name = 'meta' AND type = 'index'"
+        )
+    }
+
+    assert migrations.get_version(legacy) == len(migrations.MIGRATIONS)
+    assert types == [("integer", "integer", "integer", "integer")]
+    assert indexes == {"meta_key", "syntax_flag", "meta_date"}
+    assert database.get_meta(META_ROWS[0].key) == META_ROWS[0]
+    assert database.get_meta("blank") == Meta(
+        "blank", "", "", "1", "0", "0", "", "", "", "0"
+    )
+    assert database.get_counters()["meta"] == len(META_ROWS) + 1
+
+
+def test_init_tables_adds_paste_columns(legacy: Connection) -> None:
+    legacy.execute("CREATE TABLE paste (key text NOT NULL, content text NOT NULL)")
+    legacy.execute("INSERT INTO paste VALUES ('mock', 'content')")
+
+    Database(legacy).init_tables()
+    row = legacy.execute("SELECT * FROM paste").fetchone()
+
+    assert migrations.get_version(legacy) == len(migrations.MIGRATIONS)
+    assert row == ("mock", "content", 0, "")
+
+
+def test_paste_columns_migration_keeps_existing_columns(db: Database) -> None:
+    db.insert_paste(Paste("mock", "content", truncated=True, digest="abc"))
+    migrations.set_version(db._dbconn, 1)
+
+    count = migrations.migrate(db._dbconn)
+
+    assert count == 1
+    assert db.get_paste("mock") == Paste("mock", "content", True, "abc")
+
+
+def test_migration_keeps_triggers(legacy: Connection) -> None:
+    Database(legacy).init_tables()
+    legacy.execute("PRAGMA user_version = 0")
+    database = Database(legacy)
+
+    database.init_tables()
+    database.insert_metas([dataclasses.replace(META_ROWS[0], key="new")])
+
+    assert database.get_counters()["meta"] == len(META_ROWS) + 2
+    assert database.rebuild_counters()["meta"] == 0
+
+
+def test_migration_drops_interrupted_copy(legacy: Connection) -> None:
+    legacy.execute("CREATE TABLE meta_migrate (key text)")
+
+    Database(legacy).init_tables()
+    tables = legacy.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+
+    assert "meta_migrate" not in {row[0] for row in tables}
+
+
+def test_migrate_runs_only_pending() -> None:
+    dbconn = Connection(":memory:")
+    first, second = MagicMock(), MagicMock()
+    migrations.set_version(dbconn, 1)
+
+    count = migrations.migrate(dbconn, [first, second])
+
+    assert count == 1
+    assert first.call_count == 0
+    assert second.call_count == 1
+    assert migrations.get_version(dbconn) == 2
+
+
+def test_migrate_runs_once_across_connections(tmp_path: Path) -> None:
+    file = str(tmp_path / "db.sqlite3")
+    _create_legacy(Connection(file))
+    started = threading.Event()
+    calls: list[str] = []
+
+    def slow_migration(dbconn: Connection) -> None:
+        calls.append(threading.current_thread().name)
+        started.set()
+        time.sleep(0.2)  # Hold the claim while the other connection looks
+        migrations.MIGRATIONS[0](dbconn)
+
+    counts: dict[str, int] = {}
+
+    def run(name: str) -> None:
+        dbconn = Connection(file, timeout=5)
+        counts[name] = migrations.migrate(dbconn, [slow_migration])
+
+    first = threading.Thread(target=run, args=("first",), name="first")
+    second = threading.Thread(target=run, args=("second",), name="second")
+    with patch.object(migrations, "CLAIM_POLL_SECONDS", 0.01):
+        first.start()
+        started.wait()
+        second.start()
+        first.join()
+        second.join()
+
+    dbconn = Connection(file)
+    assert calls == ["first"]
+    assert counts == {"first": 1, "second": 0}
+    assert migrations.get_version(dbconn) == 1
+    assert dbconn.execute("SELECT count(*) FROM meta").fetchone()[0] == (
+        len(META_ROWS) + 1
+    )
+    assert dbconn.execute("SELECT count(*) FROM migration_claim").fetchone()[0] == 0
+
+
+def test_migration_stops_when_claim_taken_over(tmp_path: Path) -> None:
+    file = str(tmp_path / "db.sqlite3")
+    dbconn = _create_legacy(Connection(file))
+    other = Connection(file)
+
+    def take_over(*args: object) -> None:
+        other.execute("UPDATE migration_claim SET owner = 'other';")
+        other.commit()
+
+    with patch.object(migrations, "BATCH_SIZE", 2):
+        with patch.object(migrations.logger, "debug", side_effect=take_over):
+            with pytest.raises(RuntimeError):
+                migrations.migrate(dbconn)
+
+    types = dbconn.execute("SELECT DISTINCT typeof(date) FROM meta").fetchall()
+    assert migrations.get_version(dbconn) == 0
+    assert types == [("text",)]
+
+
+def test_migrate_takes_over_stale_claim(legacy: Connection) -> None:
+    migrations.migrate(legacy, [])
+    legacy.execute("INSERT INTO migration_claim VALUES ('stopped', 1, 0)")
+    legacy.commit()
+
+    count = migrations.migrate(legacy)
+
+    assert count == len(migrations.MIGRATIONS)
+    assert migrations.get_version(legacy) == len(migrations.MIGRATIONS)
+
+
+def test_failed_migration_releases_claim(legacy: Connection) -> None:
+    with pytest.raises(ValueError):
+        migrations.migrate(legacy, [MagicMock(side_effect=ValueError)])
+
+    assert legacy.execute("SELECT count(*) FROM migration_claim").fetchone()[0] == 0
+    assert migrations.get_version(legacy) == 0
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import pytest
+
+from wypt.near_duplicate import NearDuplicateIndex
+
+TEMPLATE = "\n".join(f"Buy cheap things now, offer line number {n}" for n in range(40))
+SIMILAR = TEMPLATE + "\nposted at 2024-01-01 12:00:00 https://track.example/abc"
+DIFFERENT = "\n".join(f"def function_{n}(): return {n * 7}" for n in range(40))
+
+
+def test_fingerprint_is_stable() -> None:
+    first = NearDuplicateIndex.fingerprint(TEMPLATE)
+    second = NearDuplicateIndex.fingerprint(TEMPLATE.encode())
+
+    assert first == second
+
+
+@pytest.mark.parametrize(
+    ("content", "expected"),
+    ((TEMPLATE, "mock"), (SIMILAR, "mock"), (DIFFERENT, None)),
+)
+def test_find(content: str, expected: str | None) -> None:
+    index = NearDuplicateIndex(threshold=0.9)
+    index.add("mock", index.fingerprint(TEMPLATE))
+
+    result = index.find(index.fingerprint(content))
+
+    assert (result[0] if result else None) == expected
+
+
+def test_add_drops_oldest_over_capacity() -> None:
+    index = NearDuplicateIndex(threshold=0.9, capacity=1)
+    index.add("first", index.fingerprint(TEMPLATE))
+    index.add("second", index.fingerprint(DIFFERENT))
+
+    assert index.find(index.fingerprint(TEMPLATE)) is None
+    assert list(index._entries) == ["second"]
+    assert all(index._buckets.values())
+
+
+def test_add_replaces_existing_key() -> None:
+    index = NearDuplicateIndex(threshold=0.9)
+    index.add("mock", index.fingerprint(TEMPLATE))
+    index.add("mock", index.fingerprint(DIFFERENT))
+
+    assert index.find(index.fingerprint(TEMPLATE)) is None
+    assert len(index._entries) == 1
+
+
+@pytest.mark.parametrize("as_bytes", (True, False))
+def test_diff_returns_differing_lines(as_bytes: bool) -> None:
+    index = NearDuplicateIndex(threshold=0.9)
+    reference = index.fingerprint(TEMPLATE)
+    content = SIMILAR.encode() if as_bytes else SIMILAR
+    expected = "posted at 2024-01-01 12:00:00 https://track.example/abc"
+
+    result = index.diff(content, reference)
+
+    assert result == (expected.encode() if as_bytes else expected)
+    assert index.hits == 1
+    assert index.skipped_bytes == len(content) - len(result)
+
+
+def test_skip_returns_empty() -> None:
+    index = NearDuplicateIndex(threshold=0.9)
+
+    result = index.skip(SIMILAR)
+
+    assert result == ""
+    assert index.skipped_bytes == len(SIMILAR)
+
+
+@pytest.mark.parametrize(("threshold", "bands"), ((1.0, 1), (0.95, 4), (0.9, 7)))
+def test_band_count_follows_threshold(threshold: float, bands: int) -> None:
+    index = NearDuplicateIndex(threshold=threshold)
+
+    assert len(index._bands) == bands
+    assert sum(mask.bit_length() for _, mask in index._bands) == 64
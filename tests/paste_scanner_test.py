@@ -1,15 +1,35 @@
 from __future__ import annotations
 
-import re
+import asyncio
+import math
+import threading
+import time
+from collections.abc import Generator
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import PropertyMock
 from unittest.mock import patch
 
 import pytest
+from httpx import ReadError
+from httpx import Response
 
 from wypt.database import Database
+from wypt.exceptions import ResponseError
+from wypt.exceptions import TransientError
+from wypt.model import Match
+from wypt.model import Meta
 from wypt.model import Paste
 from wypt.paste_scanner import PasteScanner
+from wypt.paste_scanner import _content_digest
+from wypt.paste_scanner import _ScanResult
+from wypt.pastebin_api import AsyncPastebinAPI
 from wypt.pastebin_api import PastebinAPI
+from wypt.pastebin_api import PasteStream
 from wypt.pattern_config import PatternConfig
+from wypt.rate_limiter import TokenBucket
 
 
 @pytest.fixture
@@ -17,6 +37,12 @@ def ps(db: Database) -> PasteScanner:
     return PasteScanner(db, PatternConfig({}), PastebinAPI())
 
 
+def _queue(ps: PasteScanner, *keys: str) -> None:
+    """Queue keys to pull, popped in the order given."""
+    for key in keys:
+        ps._to_pull.add(Meta(key, "", "", "0", "0", "0", "", "", "", "0"), now=0)
+
+
 def test_run(ps: PasteScanner) -> None:
     with patch.object(ps, "_run") as mock:
         ps.run()
@@ -24,8 +50,120 @@ def test_run(ps: PasteScanner) -> None:
     assert mock.call_count == 1
 
 
+def test_run_flushes_grouped_writes_on_exit(db: Database) -> None:
+    db._commit_rows = 100
+    ps = PasteScanner(db, PatternConfig({}), PastebinAPI())
+    db.insert_paste(Paste("mock", ""))
+
+    with patch.object(ps, "_run", side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            ps.run()
+
+    assert db.pending_rows == 0
+
+
+def test_run_flush_job_commits_pending_rows(db: Database) -> None:
+    db._commit_interval = 5.0
+    ps = PasteScanner(db, PatternConfig({}), PastebinAPI())
+    db.insert_paste(Paste("mock", ""))
+
+    delay = ps._run_flush_job()
+
+    assert delay == 5.0
+    assert db.pending_rows == 0
+
+
+def test_run_scrape_job_wakes_item_job(ps: PasteScanner) -> None:
+    ps._pastebin_api = PastebinAPI(last_call=0)
+
+    with patch.object(ps, "_run_scrape") as mock_scrape:
+        with patch.object(ps, "_to_pull", ["mock"]):
+            with patch.object(ps._scheduler, "wake") as mock_wake:
+                delay = ps._run_scrape_job()
+
+    assert mock_scrape.call_count == 1
+    mock_wake.assert_called_once_with("scrape_item")
+    assert delay == 0.0
+
+
+def test_run_scrape_item_job_parks_when_empty(ps: PasteScanner) -> None:
+    ps._pastebin_api = PastebinAPI(last_call=0)
+
+    with patch.object(ps, "_run_scrape_item") as mock_item:
+        delay = ps._run_scrape_item_job()
+
+    assert mock_item.call_count == 0
+    assert delay == math.inf
+
+
+def test_run_scrape_item_job_waits_for_throttle(ps: PasteScanner) -> None:
+    ps._pastebin_api = PastebinAPI(item_limiter=TokenBucket(1.0, tokens=0.0))
+    _queue(ps, "mock")
+
+    with patch.object(ps, "_run_scrape_item") as mock_item:
+        delay = ps._run_scrape_item_job()
+
+    assert mock_item.call_count == 0
+    assert 0 < delay <= 1
+
+
+@pytest.mark.parametrize("stream_chunk_size", (0, 4))
+def test_run_scrape_item_job_requeues_when_token_taken(
+    db: Database,
+    stream_chunk_size: int,
+) -> None:
+    # The item limiter is empty, as if another process took the token
+    ps = PasteScanner(
+        db,
+        PatternConfig({}),
+        PastebinAPI(item_limiter=TokenBucket(1.0, tokens=0.0)),
+        stream_chunk_size=stream_chunk_size,
+    )
+    _queue(ps, "mock")
+
+    with patch.object(
+        PastebinAPI, "can_scrape_item", new_callable=PropertyMock, return_value=True
+    ):
+        delay = ps._run_scrape_item_job()
+
+    assert ps._to_pull.keys() == ["mock"]
+    assert 0 < delay <= 1
+
+
+def test_run_scrape_job_waits_when_token_taken(ps: PasteScanner) -> None:
+    ps._pastebin_api = PastebinAPI(scrape_limiter=TokenBucket(1.0, tokens=0.0))
+
+    with patch.object(
+        PastebinAPI, "can_scrape", new_callable=PropertyMock, return_value=True
+    ):
+        with patch.object(ps, "_hydrate_to_pull") as mock_hydrate:
+            delay = ps._run_scrape_job()
+
+    assert mock_hydrate.call_count == 0
+    assert delay > 0
+
+
+@pytest.mark.parametrize(
+    "error",
+    (TransientError("Timed out", "mock"), ResponseError("mock", "GET", 500)),
+)
+def test_run_scrape_job_survives_failed_scrape(
+    ps: PasteScanner,
+    error: Exception,
+    caplog: Any,
+) -> None:
+    ps._pastebin_api = PastebinAPI(last_call=0)
+
+    with patch.object(ps, "_run_scrape", side_effect=error):
+        delay = ps._run_scrape_job()
+
+    assert delay == ps._pastebin_api.scrape_delay
+    assert "Scrape failed" in caplog.text
+
+
 def test_run_scape(ps: PasteScanner) -> None:
-    with patch.object(ps._pastebin_api, "scrape", side_effect=[[], [1]]) as mock_pull:
+    metas = [Meta("mock", "", "", "0", "0", "0", "", "", "", "0")]
+    with patch.object(ps._pastebin_api, "scrape", side_effect=[[], metas]) as mock_pull:
         with patch.object(ps._database, "insert_metas") as mock_db:
             # First call does not trigger insert to database
             ps._run_scrape()
@@ -37,34 +175,717 @@ def test_run_scape(ps: PasteScanner) -> None:
 
 
 def test_run_scrape_item_with_match(ps: PasteScanner) -> None:
-    ps._to_pull = ["mock"]
+    _queue(ps, "mock")
     paste = Paste("mock", "Hello there!")
-    ptn = re.compile(".+")  # Match everything
+    ps._patterns = PatternConfig({"mock": ".+"})  # Match everything
     with patch.object(ps._pastebin_api, "scrape_item", return_value=paste):
-        with patch.object(ps._patterns, "pattern_iter", return_value=[("mock", ptn)]):
-            with patch.object(ps._database, "insert_paste") as mock_paste_db:
-                with patch.object(ps._database, "insert_matches") as mock_match_db:
-                    ps._run_scrape_item()
+        with patch.object(ps._database, "insert_paste") as mock_paste_db:
+            with patch.object(ps._database, "insert_matches") as mock_match_db:
+                ps._run_scrape_item()
 
     assert mock_paste_db.call_count == 1
     assert mock_match_db.call_count == 1
 
 
 def test_run_scrape_item_without_match(ps: PasteScanner) -> None:
-    ps._to_pull = ["mock"]
+    _queue(ps, "mock")
     paste = Paste("mock", "Hello there!")
-    ptn = re.compile("^$")  # Match nothing
+    ps._patterns = PatternConfig({"mock": "^$"})  # Match nothing
     with patch.object(ps._pastebin_api, "scrape_item", return_value=paste):
-        with patch.object(ps._patterns, "pattern_iter", return_value=[("mock", ptn)]):
-            with patch.object(ps._database, "insert_paste") as mock_paste_db:
-                with patch.object(ps._database, "insert_matches") as mock_match_db:
-                    ps._run_scrape_item()
+        with patch.object(ps._database, "insert_paste") as mock_paste_db:
+            with patch.object(ps._database, "insert_matches") as mock_match_db:
+                ps._run_scrape_item()
 
     assert mock_paste_db.call_count == 1
     assert mock_match_db.call_count == 0
 
 
 def test_run_scrape_early_return(ps: PasteScanner) -> None:
-    ps._to_pull = ["mock"]
+    _queue(ps, "mock")
     with patch.object(ps._pastebin_api, "scrape_item", return_value=None):
         ps._run_scrape_item()
+
+
+def test_run_starts_and_stops_scan_pool(db: Database) -> None:
+    ps = PasteScanner(db, PatternConfig({}), PastebinAPI(), scan_workers=1)
+
+    with patch.object(ps, "_run"):
+        ps.run()
+
+    assert ps._scan_pool is None
+
+
+def test_run_scrape_item_with_scan_pool(db: Database) -> None:
+    patterns = PatternConfig({"mock": "there"})
+    ps = PasteScanner(db, patterns, PastebinAPI(), scan_workers=1, max_in_flight=1)
+    _queue(ps, "mock1", "mock2")
+    pastes = [Paste("mock1", "Hello there!"), Paste("mock2", "General Kenobi")]
+    ps._start_scan_pool()
+
+    try:
+        with patch.object(ps._pastebin_api, "scrape_item", side_effect=pastes):
+            with patch.object(ps._database, "insert_matches") as mock_match_db:
+                ps._run_scrape_item()
+                ps._run_scrape_item()  # In-flight limit forces first scan to save
+                ps._collect_scans(wait=True)
+    finally:
+        ps._stop_scan_pool()
+
+    assert not ps._in_flight
+    assert mock_match_db.call_count == 1
+    assert mock_match_db.call_args[0][0] == [Match("mock1", "mock", "there")]
+    # Stats gathered in the worker are merged into the scanner's patterns
+    assert patterns.get_stats()[0].hits == 1
+
+
+def test_collect_scans_keeps_collecting_after_failed_scan(db: Database) -> None:
+    ps = PasteScanner(db, PatternConfig({}), PastebinAPI())
+    failed: Future[_ScanResult] = Future()
+    failed.set_exception(BrokenProcessPool("mock"))
+    passed: Future[_ScanResult] = Future()
+    passed.set_result(("mock2", 0, [], []))
+    ps._pending_pastes = {"mock1": Paste("mock1", ""), "mock2": Paste("mock2", "")}
+    ps._in_flight.extend([("mock1", failed), ("mock2", passed)])
+
+    ps._collect_scans(wait=True)
+
+    retry = db.get_retry("mock1")
+    assert retry is not None and retry.last_error == "scan failed: BrokenProcessPool"
+    assert db.get_paste("mock1") is None
+    assert db.get_paste("mock2") == Paste("mock2", "")
+    assert not ps._pending_pastes
+
+
+def test_run_scrape_item_with_scan_pool_writes_paste_when_collected(
+    db: Database,
+) -> None:
+    ps = PasteScanner(db, PatternConfig({"mock": "there"}), PastebinAPI())
+    _queue(ps, "mock")
+    future: Future[_ScanResult] = Future()
+    ps._scan_pool = MagicMock(submit=MagicMock(return_value=future))
+
+    with patch.object(ps._pastebin_api, "scrape_item", return_value=Paste("mock", "")):
+        ps._run_scrape_item()
+
+    assert db.get_paste("mock") is None
+
+    future.set_result(("mock", 0, [], []))
+    ps._collect_scans()
+    ps._scan_pool = None
+
+    assert db.get_paste("mock") is not None
+
+
+def test_submit_scan_requires_started_pool(ps: PasteScanner) -> None:
+    with pytest.raises(RuntimeError):
+        ps._submit_scan("mock", "")
+
+
+def test_run_logs_pattern_stats(db: Database, caplog: Any) -> None:
+    caplog.set_level("INFO")
+    patterns = PatternConfig({"mock": "there"})
+    patterns.scan("Hello there!")
+    ps = PasteScanner(db, patterns, PastebinAPI())
+
+    with patch.object(ps, "_run"):
+        ps.run()
+
+    assert "Pattern 'mock' - 1 calls" in caplog.text
+
+
+@pytest.mark.parametrize("save_paste_content", (True, False))
+def test_run_scrape_item_scans_bytes(db: Database, save_paste_content: bool) -> None:
+    # Two characters wide to match the two UTF-8 bytes of the accented e
+    patterns = PatternConfig({"mock": "th..re"}, as_bytes=True)
+    ps = PasteScanner(
+        db, patterns, PastebinAPI(), save_paste_content=save_paste_content
+    )
+    _queue(ps, "mock")
+    content = "Hello thére!".encode()
+    expected = "Hello thére!" if save_paste_content else ""
+
+    with patch.object(ps._pastebin_api, "scrape_item_content", return_value=content):
+        with patch.object(ps._database, "insert_paste") as mock_paste_db:
+            with patch.object(ps._database, "insert_matches") as mock_match_db:
+                ps._run_scrape_item()
+
+    assert mock_paste_db.call_args[0][0] == Paste(
+        "mock", expected, digest=_content_digest(content)
+    )
+    assert mock_match_db.call_args[0][0] == [Match("mock", "mock", "thére")]
+
+
+@pytest.mark.parametrize("as_bytes", (True, False))
+def test_run_scrape_item_streams(db: Database, as_bytes: bool) -> None:
+    patterns = PatternConfig({"mock": "thére"}, as_bytes=as_bytes)
+    ps = PasteScanner(
+        db,
+        patterns,
+        PastebinAPI(),
+        save_paste_content=True,
+        stream_chunk_size=5,
+        stream_overlap=8,
+        max_paste_bytes=10,
+    )
+    _queue(ps, "mock")
+    content = "Hello thére!".encode()
+    resp = Response(200, content=[content[:4], content[4:9], content[9:]])
+    stream = PasteStream(resp, chunk_size=5, max_bytes=10)
+
+    with patch.object(ps._pastebin_api, "scrape_item_stream", return_value=stream):
+        with patch.object(ps._database, "insert_paste") as mock_paste_db:
+            with patch.object(ps._database, "insert_matches") as mock_match_db:
+                ps._run_scrape_item()
+
+    # Multi-byte character split across chunks, cap ends read after 10 bytes
+    assert mock_paste_db.call_args[0][0] == Paste("mock", "Hello thé", True)
+    assert mock_match_db.call_count == 0
+
+
+def test_run_scrape_item_streams_caps_saved_content(db: Database) -> None:
+    patterns = PatternConfig({"mock": "there"})
+    ps = PasteScanner(
+        db,
+        patterns,
+        PastebinAPI(),
+        save_paste_content=True,
+        stream_chunk_size=4,
+        max_saved_bytes=6,
+    )
+    _queue(ps, "mock")
+    resp = Response(200, content=[b"Hell", b"o th", b"ere!"])
+    stream = PasteStream(resp, chunk_size=4)
+
+    with patch.object(ps._pastebin_api, "scrape_item_stream", return_value=stream):
+        with patch.object(ps._database, "insert_paste") as mock_paste_db:
+            with patch.object(ps._database, "insert_matches") as mock_match_db:
+                ps._run_scrape_item()
+
+    # Scanned whole, only the first bytes are held to save
+    assert mock_paste_db.call_args[0][0] == Paste("mock", "Hello ", True)
+    assert mock_match_db.call_args[0][0] == [Match("mock", "mock", "there")]
+
+
+def test_run_scrape_item_streams_matches(db: Database) -> None:
+    patterns = PatternConfig({"mock": "thére"})
+    ps = PasteScanner(db, patterns, PastebinAPI(), stream_chunk_size=4)
+    _queue(ps, "mock")
+    content = "Hello thére!".encode()
+    resp = Response(200, content=[content[:4], content[4:8], content[8:]])
+    stream = PasteStream(resp, chunk_size=4)
+
+    with patch.object(ps._pastebin_api, "scrape_item_stream", return_value=stream):
+        with patch.object(ps._database, "insert_paste") as mock_paste_db:
+            with patch.object(ps._database, "insert_matches") as mock_match_db:
+                ps._run_scrape_item()
+
+    assert mock_paste_db.call_args[0][0] == Paste(
+        "mock", "", digest=_content_digest(content)
+    )
+    assert mock_match_db.call_args[0][0] == [Match("mock", "mock", "thére")]
+
+
+def test_run_scrape_item_streams_dropped_connection(db: Database) -> None:
+    patterns = PatternConfig({"mock": "there"})
+    ps = PasteScanner(
+        db, patterns, PastebinAPI(), save_paste_content=True, stream_chunk_size=4
+    )
+    _queue(ps, "mock")
+
+    def chunks() -> Generator[bytes, None, None]:
+        yield from (b"Hell", b"o th")
+        raise ReadError("Connection reset")
+
+    stream = PasteStream(Response(200, content=chunks()), chunk_size=4)
+
+    with patch.object(ps._pastebin_api, "scrape_item_stream", return_value=stream):
+        with patch.object(ps._database, "insert_paste") as mock_paste_db:
+            ps._run_scrape_item()
+
+    assert mock_paste_db.call_args[0][0] == Paste("mock", "Hello th", True)
+    assert ps._to_pull.keys() == []
+
+
+def test_run_scrape_item_stream_early_return(db: Database) -> None:
+    ps = PasteScanner(db, PatternConfig({}), PastebinAPI(), stream_chunk_size=4)
+    _queue(ps, "mock")
+
+    with patch.object(ps._pastebin_api, "scrape_item_stream", return_value=None):
+        with patch.object(ps._database, "insert_paste") as mock_paste_db:
+            ps._run_scrape_item()
+
+    assert mock_paste_db.call_count == 0
+
+
+@pytest.mark.parametrize(("syntax", "expected"), (("text", 0), ("json", 1)))
+def test_run_scrape_item_scoped_by_syntax(
+    db: Database,
+    syntax: str,
+    expected: int,
+) -> None:
+    patterns = PatternConfig({"mock": {"pattern": "there", "syntax": ["json"]}})
+    ps = PasteScanner(db, patterns, PastebinAPI())
+    _queue(ps, "mock")
+    meta = Meta("mock", "", "", "0", "0", "0", "", syntax, "", "0")
+    db.insert_metas([meta])
+
+    with patch.object(
+        ps._pastebin_api, "scrape_item", return_value=Paste("mock", "there")
+    ):
+        with patch.object(ps._database, "insert_matches") as mock_match_db:
+            ps._run_scrape_item()
+
+    assert mock_match_db.call_count == expected
+
+
+def test_run_scrape_item_copies_matches_of_duplicate(mock_database: Database) -> None:
+    patterns = PatternConfig({"mock": "there"})
+    ps = PasteScanner(
+        mock_database,
+        patterns,
+        PastebinAPI(),
+        save_paste_content=True,
+        dedup_cache_size=1,
+    )
+    _queue(ps, "mock1", "mock2", "mock3")
+    pastes = [Paste("mock1", "there"), Paste("mock2", "there"), Paste("mock3", "here")]
+
+    with patch.object(ps._pastebin_api, "scrape_item", side_effect=pastes):
+        with patch.object(ps._patterns, "scan", wraps=ps._patterns.scan) as mock_scan:
+            ps._run_scrape_item()
+            ps._run_scrape_item()
+            ps._run_scrape_item()
+
+    duplicate = mock_database.get_paste("mock2")
+    matches = mock_database._dbconn.execute(
+        "SELECT key FROM match WHERE match_name = 'mock' ORDER BY key"
+    ).fetchall()
+
+    assert mock_scan.call_count == 2
+    assert matches == [("mock1",), ("mock2",)]
+    assert duplicate == Paste("mock2", "there", digest=_content_digest("there"))
+    assert list(ps._digests.values()) == ["mock3"]  # Cache is bounded
+
+
+def test_scan_item_duplicate_of_other_syntax_is_scanned(db: Database) -> None:
+    patterns = PatternConfig({"mock": {"pattern": "there", "syntax": "python"}})
+    ps = PasteScanner(db, patterns, PastebinAPI(), dedup_cache_size=2)
+
+    ps._scan_item(("mock1", "there", "python"))
+    ps._scan_item(("mock2", "there", "cpp"))
+    ps._scan_item(("mock3", "there", "python"))
+    matches = db._dbconn.execute("SELECT key FROM match ORDER BY key").fetchall()
+
+    assert matches == [("mock1",), ("mock3",)]
+    assert list(ps._digests.values()) == ["mock2", "mock1"]
+
+
+def test_run_scrape_item_streams_duplicate_by_reference(db: Database) -> None:
+    patterns = PatternConfig({})
+    ps = PasteScanner(
+        db,
+        patterns,
+        PastebinAPI(),
+        save_paste_content=True,
+        stream_chunk_size=4,
+        dedup_cache_size=2,
+    )
+    _queue(ps, "mock1", "mock2")
+    streams = [
+        PasteStream(Response(200, content=b"same"), chunk_size=4),
+        PasteStream(Response(200, content=b"same"), chunk_size=4),
+    ]
+
+    with patch.object(ps._pastebin_api, "scrape_item_stream", side_effect=streams):
+        ps._run_scrape_item()
+        ps._run_scrape_item()
+
+    rows = db._dbconn.execute("SELECT key, content FROM paste ORDER BY key").fetchall()
+
+    assert rows == [("mock1", "same"), ("mock2", "")]
+    assert db.get_paste("mock2") == Paste(
+        "mock2", "same", digest=_content_digest("same")
+    )
+
+
+def test_collect_scan_remembers_digest_once_saved(db: Database) -> None:
+    ps = PasteScanner(db, PatternConfig({}), PastebinAPI(), dedup_cache_size=1)
+    ps._pending_digests["mock"] = ("digest", None)
+    future: Future[_ScanResult] = Future()
+    future.set_result(("mock", 0, [], []))
+
+    ps._collect_scan("mock", future)
+
+    assert ps._digests == {("digest", None): "mock"}
+    assert not ps._pending_digests
+
+
+@pytest.mark.parametrize(("mode", "scanned"), (("diff", "new line 123"), ("skip", "")))
+def test_run_scrape_item_near_duplicate(
+    mock_database: Database,
+    mode: str,
+    scanned: str,
+) -> None:
+    template = "\n".join(f"spam line {n} abc" for n in range(60))
+    patterns = PatternConfig({"mock": "abc", "digits": "[0-9]{3}"})
+    ps = PasteScanner(
+        mock_database,
+        patterns,
+        PastebinAPI(),
+        near_duplicate_threshold=0.9,
+        near_duplicate_mode=mode,
+    )
+    _queue(ps, "mock1", "mock2")
+    pastes = [Paste("mock1", template), Paste("mock2", template + "\nnew line 123")]
+
+    with patch.object(ps._pastebin_api, "scrape_item", side_effect=pastes):
+        with patch.object(ps._patterns, "scan", wraps=ps._patterns.scan) as mock_scan:
+            ps._run_scrape_item()
+            ps._run_scrape_item()
+
+    copied = mock_database._dbconn.execute(
+        "SELECT match_name FROM match WHERE key = 'mock2' ORDER BY match_name"
+    ).fetchall()
+
+    assert mock_scan.call_args[0][0] == scanned
+    assert copied == ([("digits",), ("mock",)] if scanned else [("mock",)])
+    assert ps._near_duplicates is not None
+    assert ps._near_duplicates.hits == 1
+
+
+def test_run_scrape_item_near_duplicate_copies_only_present_matches(
+    mock_database: Database,
+) -> None:
+    template = "\n".join(f"spam line {n}" for n in range(60))
+    patterns = PatternConfig({"aws": "AKIA[0-9]{4}"})
+    ps = PasteScanner(
+        mock_database,
+        patterns,
+        PastebinAPI(),
+        near_duplicate_threshold=0.9,
+        near_duplicate_mode="skip",
+    )
+    _queue(ps, "mock1", "mock2")
+    pastes = [
+        Paste("mock1", template + "\nAKIA1111 AKIA2222"),
+        Paste("mock2", template + "\nAKIA2222 AKIA3333"),
+    ]
+
+    with patch.object(ps._pastebin_api, "scrape_item", side_effect=pastes):
+        ps._run_scrape_item()
+        ps._run_scrape_item()
+
+    assert ps._near_duplicates is not None
+    assert ps._near_duplicates.hits == 1
+    assert mock_database.get_matches("mock2") == [Match("mock2", "aws", "AKIA2222")]
+
+
+def test_invalid_near_duplicate_mode(db: Database) -> None:
+    with pytest.raises(ValueError):
+        PasteScanner(db, PatternConfig({}), PastebinAPI(), near_duplicate_mode="mock")
+
+
+def test_collect_scan_remembers_fingerprint_once_saved(db: Database) -> None:
+    ps = PasteScanner(
+        db, PatternConfig({}), PastebinAPI(), near_duplicate_threshold=0.9
+    )
+    assert ps._near_duplicates is not None
+    fingerprint = ps._near_duplicates.fingerprint("content")
+    ps._pending_fingerprints["mock"] = fingerprint
+    future: Future[_ScanResult] = Future()
+    future.set_result(("mock", 0, [], []))
+
+    ps._collect_scan("mock", future)
+
+    assert ps._near_duplicates.find(fingerprint) == ("mock", fingerprint)
+    assert not ps._pending_fingerprints
+
+
+def test_run_scrape_item_through_pipeline(mock_database: Database) -> None:
+    patterns = PatternConfig({"mock": "abc"})
+    ps = PasteScanner(
+        mock_database,
+        patterns,
+        PastebinAPI(),
+        dedup_cache_size=10,
+        pipeline_queue_size=1,
+    )
+    _queue(ps, "mock1", "mock2")
+    pastes = [Paste("mock1", "abc"), Paste("mock2", "abc")]
+
+    ps._start_pipeline()
+    with patch.object(ps._pastebin_api, "scrape_item", side_effect=pastes):
+        ps._run_scrape_item()
+        ps._run_scrape_item()
+    ps._stop_pipeline()
+
+    matches = mock_database._dbconn.execute(
+        "SELECT key FROM match WHERE match_name = 'mock' ORDER BY key"
+    ).fetchall()
+    scan_stats, write_stats = ps.get_stage_stats()
+
+    assert matches == [("mock1",), ("mock2",)]
+    assert mock_database.get_paste("mock2") is not None
+    assert scan_stats.items == 2
+    # Retry success, matches, paste, and finish of each, the second a duplicate copy
+    assert write_stats.items == 8
+    assert ps._scan_stage is None
+
+
+def test_pipeline_runs_database_calls_on_writer(mock_database: Database) -> None:
+    ps = PasteScanner(
+        mock_database,
+        PatternConfig({"mock": {"pattern": "abc", "syntax": ["text"]}}),
+        PastebinAPI(),
+        pipeline_queue_size=1,
+        lease_seconds=60,
+    )
+    threads: set[str] = set()
+
+    ps._start_pipeline()
+    mock_database._dbconn.set_trace_callback(
+        lambda _: threads.add(threading.current_thread().name)
+    )
+    ps._hydrate_to_pull()
+    ps._syntaxes.clear()  # Syntax is read back from the database
+    with patch.object(ps._pastebin_api, "scrape_item", return_value=Paste("", "")):
+        ps._run_scrape_item()
+    ps._run_lease_job()
+    ps._stop_pipeline()
+    mock_database._dbconn.set_trace_callback(None)
+
+    assert threads == {"wypt-writer"}
+
+
+def test_hydrate_to_pull_skips_keys_in_progress(mock_database: Database) -> None:
+    ps = PasteScanner(mock_database, PatternConfig({}), PastebinAPI())
+    ps._hydrate_to_pull()
+    key = ps._to_pull.pop()
+    assert key is not None
+    ps._in_progress.add(key)
+
+    ps._hydrate_to_pull()
+
+    assert key not in ps._to_pull.keys()
+    ps._finish_key(key)
+    assert not ps._in_progress
+
+
+def test_stop_pipeline_raises_failed_write(ps: PasteScanner) -> None:
+    ps._pipeline_queue_size = 1
+    ps._start_pipeline()
+    ps._write(MagicMock(side_effect=ValueError("mock")))
+
+    with pytest.raises(ValueError):
+        ps._stop_pipeline()
+
+    assert ps._write_stage is None
+    assert ps.get_stage_stats()[1].errors == 1
+
+
+def test_run_scrape_item_job_fetches_async(mock_database: Database) -> None:
+    async_api = AsyncPastebinAPI(item_limiter=TokenBucket(rate=1_000, burst=2))
+    ps = PasteScanner(
+        mock_database,
+        PatternConfig({"mock": "abc"}),
+        PastebinAPI(),
+        pipeline_queue_size=2,
+        async_api=async_api,
+    )
+    _queue(ps, "mock1", "mock2", "mock3")
+    responses = {"mock1": Response(200, content=b"abc"), "mock2": Response(500)}
+    release = threading.Event()
+
+    async def get(url: str, params: dict[str, str]) -> Response:
+        await asyncio.to_thread(release.wait)
+        return responses[params["i"]]
+
+    ps._start_pipeline()
+    with patch.object(async_api._http, "get", side_effect=get):
+        delay = ps._run_scrape_item_job()  # Both slots of the fetch stage taken
+        release.set()
+        ps._stop_pipeline()
+
+    fetch_stats, scan_stats, _ = ps.get_stage_stats()
+    matches = mock_database._dbconn.execute(
+        "SELECT key FROM match WHERE match_name = 'mock'"
+    ).fetchall()
+    retry = mock_database.get_retry("mock2")
+
+    assert delay == math.inf
+    assert ps._to_pull.keys() == ["mock3"]
+    assert fetch_stats.name == "wypt-fetcher"
+    assert fetch_stats.items == 2
+    assert scan_stats.items == 1
+    assert matches == [("mock1",)]
+    assert mock_database.get_paste("mock1") is not None
+    assert retry is not None and retry.attempts == 1
+    assert not ps._in_progress
+
+
+def test_async_fetch_requires_pipeline(db: Database) -> None:
+    with pytest.raises(ValueError):
+        PasteScanner(db, PatternConfig({}), PastebinAPI(), async_api=AsyncPastebinAPI())
+
+
+@pytest.mark.parametrize("kwargs", ({"scan_workers": 1}, {"stream_chunk_size": 1}))
+def test_pipeline_is_exclusive(db: Database, kwargs: dict[str, Any]) -> None:
+    with pytest.raises(ValueError):
+        PasteScanner(
+            db,
+            PatternConfig({}),
+            PastebinAPI(),
+            pipeline_queue_size=1,
+            **kwargs,
+        )
+
+
+def test_hydrate_to_pull_orders_by_priority(db: Database) -> None:
+    ps = PasteScanner(db, PatternConfig({}), PastebinAPI())
+    now = int(time.time())
+    db.insert_metas(
+        [
+            Meta("large", "", "", str(now), "1000000", "0", "", "", "", "0"),
+            Meta("expiring", "", "", str(now), "1000", str(now + 60), "", "", "", "0"),
+            Meta("expired", "", "", str(now), "1000", str(now - 60), "", "", "", "0"),
+        ]
+    )
+
+    ps._hydrate_to_pull()
+
+    assert [ps._to_pull.pop(), ps._to_pull.pop(), ps._to_pull.pop()] == [
+        "expiring",
+        "large",
+        None,
+    ]
+
+
+def test_run_scrape_item_skips_when_all_expired(ps: PasteScanner) -> None:
+    ps._to_pull.add(Meta("mock", "", "", "0", "0", "1", "", "", "", "0"), now=0)
+
+    with patch.object(ps._pastebin_api, "scrape_item") as mock_scrape:
+        ps._run_scrape_item()
+
+    assert mock_scrape.call_count == 0
+    assert ps._to_pull.expired == 1
+
+
+def test_run_scrape_adjusts_limit_to_overlap(ps: PasteScanner) -> None:
+    first = [Meta(f"a{n}", "", "", "0", "0", "0", "", "", "", "0") for n in range(100)]
+    second = [Meta(f"b{n}", "", "", "0", "0", "0", "", "", "", "0") for n in range(40)]
+
+    side_effect = [first, second + first]
+    with patch.object(ps._pastebin_api, "scrape", side_effect=side_effect) as mock:
+        with patch.object(ps, "_hydrate_to_pull"):
+            ps._run_scrape()
+            ps._run_scrape()
+            limits = [c[1]["limit"] for c in mock.call_args_list]
+
+    assert limits == [100, 100]
+    assert ps._feed.limit == 50  # 40 new keys with 20% overlap
+
+
+@pytest.mark.parametrize(
+    "error",
+    (TransientError("Timed out", "mock"), ResponseError("mock", "GET", 500)),
+)
+def test_run_scrape_item_failure_is_retried(db: Database, error: Exception) -> None:
+    ps = PasteScanner(db, PatternConfig({}), PastebinAPI(), retry_base_delay=0)
+    db.insert_metas([Meta("mock", "", "", "0", "0", "0", "", "", "", "0")])
+    _queue(ps, "mock")
+
+    with patch.object(ps._pastebin_api, "scrape_item", side_effect=error):
+        ps._run_scrape_item()
+
+    retry = db.get_retry("mock")
+    assert retry is not None
+    assert retry.attempts == 1
+    assert db.get_paste("mock") is None
+
+    ps._hydrate_to_pull()
+    with patch.object(ps._pastebin_api, "scrape_item", return_value=Paste("mock", "")):
+        ps._run_scrape_item()
+
+    assert db.get_retry("mock") is None
+    assert db.get_paste("mock") is not None
+    assert ps._retries.recovered == 1
+
+
+def test_hydrate_to_pull_claims_keys_not_leased_elsewhere(db: Database) -> None:
+    ps = PasteScanner(db, PatternConfig({}), PastebinAPI(), lease_seconds=60)
+    db.insert_metas([Meta(key, "", "", "0", "0", "0", "", "", "", "0") for key in "ab"])
+    db.claim_keys(["a"], "other", now=time.time(), expires=time.time() + 60)
+
+    ps._hydrate_to_pull()
+
+    assert ps._to_pull.keys() == ["b"]
+    assert db.claim_keys(["b"], "other", now=time.time(), expires=0) == []
+
+
+def test_run_scrape_item_releases_lease_when_stored(db: Database) -> None:
+    ps = PasteScanner(db, PatternConfig({}), PastebinAPI(), lease_seconds=60)
+    db.insert_metas([Meta("mock", "", "", "0", "0", "0", "", "", "", "0")])
+    ps._hydrate_to_pull()
+
+    with patch.object(ps._pastebin_api, "scrape_item", return_value=Paste("mock", "")):
+        ps._run_scrape_item()
+
+    assert not ps._leased
+    assert db.claim_keys(["mock"], "other", now=time.time(), expires=0) == ["mock"]
+
+
+@pytest.mark.parametrize("stream_chunk_size", (0, 4))
+def test_run_scrape_item_requeues_throttled_key(
+    db: Database,
+    stream_chunk_size: int,
+) -> None:
+    ps = PasteScanner(
+        db,
+        PatternConfig({}),
+        PastebinAPI(),
+        stream_chunk_size=stream_chunk_size,
+        lease_seconds=60,
+    )
+    db.insert_metas([Meta("mock", "", "", "0", "0", "0", "", "", "", "0")])
+    ps._hydrate_to_pull()
+
+    with patch.object(ps._pastebin_api, "scrape_item", return_value=None):
+        with patch.object(ps._pastebin_api, "scrape_item_stream", return_value=None):
+            ps._run_scrape_item()
+
+    assert ps._to_pull.keys() == ["mock"]
+    assert ps._leased == {"mock"}
+    assert not ps._in_progress
+    assert db.get_retry("mock") is None
+    assert db.claim_keys(["mock"], "other", now=time.time(), expires=0) == []
+
+
+def test_renew_and_release_all_leases(db: Database) -> None:
+    ps = PasteScanner(db, PatternConfig({}), PastebinAPI(), lease_seconds=60)
+    db.insert_metas([Meta("mock", "", "", "0", "0", "0", "", "", "", "0")])
+    ps._hydrate_to_pull()
+
+    with patch.object(db, "renew_leases", wraps=db.renew_leases) as mock_renew:
+        delay = ps._run_lease_job()
+    ps._release_all_leases()
+
+    assert delay == 20
+    assert mock_renew.call_args.args == (["mock"], ps._lease_owner)
+    assert db.claim_keys(["mock"], "other", now=time.time(), expires=0) == ["mock"]
+
+
+def test_run_scrape_only_stores_new_metas(ps: PasteScanner) -> None:
+    old = Meta("old", "", "", "0", "0", "0", "", "", "", "0")
+    new = Meta("new", "", "", "0", "0", "0", "", "", "", "0")
+    ps._database.insert_metas([old])
+    ps._warm_seen_keys()
+    _queue(ps, "queued")
+
+    with patch.object(ps._pastebin_api, "scrape", side_effect=[[old], [old, new]]):
+        with patch.object(ps._database, "insert_metas") as mock_insert:
+            with patch.object(ps, "_hydrate_to_pull") as mock_hydrate:
+                ps._run_scrape()
+                ps._run_scrape()
+
+    mock_insert.assert_called_once_with([new])
+    assert mock_hydrate.call_count == 1
@@ -1,19 +1,29 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import time
+from collections.abc import Generator
 from pathlib import Path
+from typing import Any
 from unittest.mock import patch
 
 import pytest
+from httpx import ConnectError
+from httpx import ReadError
 from httpx import ReadTimeout
+from httpx import RemoteProtocolError
 from httpx import Response
 
 from wypt.exceptions import ResponseError
 from wypt.exceptions import ThrottleError
+from wypt.exceptions import TransientError
 from wypt.model import Meta
+from wypt.model import Paste
 from wypt.pastebin_api import DEFAULT_LIMIT
+from wypt.pastebin_api import AsyncPastebinAPI
 from wypt.pastebin_api import PastebinAPI
+from wypt.rate_limiter import TokenBucket
 
 SCRAPE_RESP = Path("tests/fixture/scrape_resp.json").read_text()
 
@@ -40,11 +50,39 @@ def test_can_act_on_init_with_offsets_of_last_call(offset: int, expected: bool)
     assert client.can_scrape_meta is expected
 
 
+def test_default_last_call_is_not_truncated() -> None:
+    with patch("time.time", return_value=100.75):
+        client = PastebinAPI()
+
+    # Emptied at this moment, not at the start of the second
+    assert client._item_limiter._tokens == 0.0
+    assert client._scrape_limiter._tokens == 0.0
+
+
 def test_scrape_raises_throttle_error(throttled_client: PastebinAPI) -> None:
     with pytest.raises(ThrottleError):
         throttled_client.scrape()
 
 
+def test_throttle_error_reports_remaining_cooldown() -> None:
+    limiter = TokenBucket(rate=0.5, tokens=0.0, clock=lambda: 100.0)
+    client = PastebinAPI(item_limiter=limiter)
+
+    with pytest.raises(ThrottleError) as err:
+        client.scrape_item("mock")
+
+    assert err.value.cooldown == 2.0
+    assert err.value.remaining == 2.0
+
+
+def test_scrape_item_and_meta_share_a_limiter(client: PastebinAPI) -> None:
+    with patch.object(client._http, "get", return_value=Response(200)):
+        client.scrape_item("mock")
+
+    assert client.can_scrape
+    assert not client.can_scrape_meta
+
+
 def test_scrape_returns_emtpy_on_raise_disabled(throttled_client: PastebinAPI) -> None:
     result = throttled_client.scrape(raise_on_throttle=False)
 
@@ -174,9 +212,242 @@ def test_scrape_meta_returns_none_on_invalid_success(client: PastebinAPI) -> Non
         assert result is None
 
 
-def test_get_request_timeout_returns_empty(client: PastebinAPI) -> None:
+def test_get_request_timeout_raises_transient_error(client: PastebinAPI) -> None:
     with patch.object(client._http, "get", side_effect=ReadTimeout("Timed out")):
-        result = client._get_request("/mock")
+        with pytest.raises(TransientError):
+            client._get_request("mock")
+
+
+def test_get_request_connect_error_logs_error_type(
+    client: PastebinAPI,
+    caplog: Any,
+) -> None:
+    with patch.object(client._http, "get", side_effect=ConnectError("Refused")):
+        with pytest.raises(TransientError):
+            client._get_request("mock")
+
+    assert "ConnectError on mock - 'Refused'" in caplog.text
+    assert "too large" not in caplog.text
+
+
+def test_scrape_item_content_returns_bytes(client: PastebinAPI) -> None:
+    resp = Response(200, content=SCRAPE_RESP.encode())
+
+    with patch.object(client._http, "get", return_value=resp) as mock_http:
+        result = client.scrape_item_content("mock")
+
+        assert mock_http.call_count == 1
+        assert result == SCRAPE_RESP.encode()
+
+
+def test_scrape_item_content_returns_none_on_raise_disabled(
+    throttled_client: PastebinAPI,
+) -> None:
+    result = throttled_client.scrape_item_content("mock", raise_on_throttle=False)
+
+    assert result is None
+
+
+def _chunks(
+    *chunks: bytes,
+    error: Exception | None = None,
+) -> Generator[bytes, None, None]:
+    yield from chunks
+    if error is not None:
+        raise error
+
+
+@pytest.mark.parametrize(
+    ("max_bytes", "error", "expected", "truncated"),
+    (
+        (0, None, [b"abc", b"def"], False),
+        (6, None, [b"abc", b"def"], False),
+        (4, None, [b"abc", b"d"], True),
+        (3, None, [b"abc"], True),
+        (0, ReadTimeout("Timed out"), [b"abc", b"def"], True),
+        (0, ReadError("Reset"), [b"abc", b"def"], True),
+        (0, RemoteProtocolError("Closed"), [b"abc", b"def"], True),
+    ),
+)
+def test_scrape_item_stream(
+    client: PastebinAPI,
+    max_bytes: int,
+    error: Exception | None,
+    expected: list[bytes],
+    truncated: bool,
+) -> None:
+    resp = Response(200, content=_chunks(b"abc", b"def", error=error))
+
+    with patch.object(client._http, "send", return_value=resp) as mock_http:
+        stream = client.scrape_item_stream("mock", chunk_size=3, max_bytes=max_bytes)
+        assert stream
+
+        result = list(stream)
+
+    assert mock_http.call_args[1]["stream"] is True
+    assert result == expected
+    assert stream.size == len(b"".join(expected))
+    assert stream.truncated is truncated
+    assert resp.is_closed
+
+
+def test_scrape_item_stream_raises_response_error_on_failure(
+    client: PastebinAPI,
+) -> None:
+    resp = Response(404)
+
+    with patch.object(client._http, "send", return_value=resp):
+        with pytest.raises(ResponseError):
+            client.scrape_item_stream("mock")
+
+
+def test_scrape_item_stream_timeout_raises_transient_error(
+    client: PastebinAPI,
+) -> None:
+    with patch.object(client._http, "send", side_effect=ReadTimeout("Timed out")):
+        with pytest.raises(TransientError):
+            client.scrape_item_stream("mock")
+
+
+def test_scrape_item_stream_returns_none_on_raise_disabled(
+    throttled_client: PastebinAPI,
+) -> None:
+    result = throttled_client.scrape_item_stream("mock", raise_on_throttle=False)
+
+    assert result is None
+
+
+def _async_client(offset: int) -> AsyncPastebinAPI:
+    return AsyncPastebinAPI(last_call=int(time.time()) + offset)
+
+
+def test_async_scrape_returns_on_success() -> None:
+    client = _async_client(-1_000)
+    resp = Response(200, content=SCRAPE_RESP)
+
+    with patch.object(client._http, "get", return_value=resp) as mock_http:
+        result = asyncio.run(client.scrape(limit=251, lang="json"))
+        kwargs = mock_http.call_args[1]
+
+    assert len(result) == len(json.loads(SCRAPE_RESP))
+    assert kwargs["params"] == {"limit": str(DEFAULT_LIMIT), "lang": "json"}
+    assert not client.can_scrape
+
+
+def test_async_scrape_item_returns_on_success() -> None:
+    client = _async_client(-1_000)
+    resp = Response(200, content=SCRAPE_RESP)
+
+    with patch.object(client._http, "get", return_value=resp):
+        result = asyncio.run(client.scrape_item("mock"))
+
+    assert result == Paste("mock", SCRAPE_RESP)
+
+
+def test_async_scrape_item_content_returns_bytes() -> None:
+    client = _async_client(-1_000)
+    resp = Response(200, content=b"\xffmock")
+
+    with patch.object(client._http, "get", return_value=resp):
+        result = asyncio.run(client.scrape_item_content("mock"))
+
+    assert result == b"\xffmock"
+    assert (
+        asyncio.run(client.scrape_item_content("mock", raise_on_throttle=False)) is None
+    )
+
+
+@pytest.mark.parametrize("method", ("scrape_item", "scrape_item_content"))
+def test_async_scrape_item_waits_on_throttle(method: str) -> None:
+    client = _async_client(-1_000)
+
+    with patch.object(client._item_limiter, "try_acquire", side_effect=[False, True]):
+        with patch.object(client, "_until_next_item", return_value=0.0) as mock_wait:
+            with patch.object(client._http, "get", return_value=Response(200)):
+                result = asyncio.run(
+                    getattr(client, method)("mock", wait_on_throttle=True)
+                )
+
+    assert result is not None
+    assert mock_wait.call_count == 1
+
+
+def test_async_scrape_meta_returns_on_success() -> None:
+    client = _async_client(-1_000)
+    resps = json.loads(SCRAPE_RESP)
+    resp = Response(200, content=json.dumps(resps[0]))
+
+    with patch.object(client._http, "get", return_value=resp):
+        result = asyncio.run(client.scrape_meta("mock"))
+
+    assert result
+    assert result.to_dict() == resps[0]
+
+
+def test_async_scrape_raises_response_error_on_failure() -> None:
+    client = _async_client(-1_000)
+
+    with patch.object(client._http, "get", return_value=Response(404)):
+        with pytest.raises(ResponseError):
+            asyncio.run(client.scrape_item("mock"))
+
+
+def test_async_throttle_taken_at_request_start() -> None:
+    client = _async_client(-1_000)
+
+    async def scrape_twice() -> None:
+        first = asyncio.create_task(client.scrape_item("mock"))
+        await asyncio.sleep(0)
+        with pytest.raises(ThrottleError):
+            await client.scrape_item("mock")
+        assert await client.scrape_meta("mock", raise_on_throttle=False) is None
+        await first
+
+    async def slow_get(*args: object, **kwargs: object) -> Response:
+        await asyncio.sleep(0.01)
+        return Response(200, content="mock")
+
+    with patch.object(client._http, "get", side_effect=slow_get):
+        asyncio.run(scrape_twice())
+
+
+def test_async_scrape_items_does_not_wait_on_responses() -> None:
+    client = AsyncPastebinAPI(item_limiter=TokenBucket(rate=1_000))
+    delays = {"slow": 0.05, "fast1": 0.0, "fast2": 0.0}
+
+    async def get(url: str, params: dict[str, str]) -> Response:
+        await asyncio.sleep(delays[params["i"]])
+        return Response(200, content=params["i"])
+
+    async def collect() -> list[str]:
+        return [paste.key async for paste in client.scrape_items(delays)]
+
+    with patch.object(client._http, "get", side_effect=get) as mock_http:
+        result = asyncio.run(collect())
+
+    assert mock_http.call_count == 3
+    assert sorted(result[:2]) == ["fast1", "fast2"]
+    assert result[2] == "slow"
+
+
+def test_async_scrape_items_waits_for_throttle_slot() -> None:
+    client = _async_client(-1_000)
+
+    async def collect() -> list[str]:
+        return [paste.key async for paste in client.scrape_items(["mock"])]
+
+    with patch.object(client._item_limiter, "try_acquire", side_effect=[False, True]):
+        with patch.object(client, "_until_next_item", return_value=0.0) as mock_wait:
+            with patch.object(client._http, "get", return_value=Response(200)):
+                result = asyncio.run(collect())
+
+    assert result == ["mock"]
+    assert mock_wait.call_count == 1
+
+
+def test_async_get_request_error_raises_transient_error() -> None:
+    client = _async_client(-1_000)
 
-    assert result.status_code == 204
-    assert result.json() == {}
+    with patch.object(client._http, "get", side_effect=ConnectError("Refused")):
+        with pytest.raises(TransientError):
+            asyncio.run(client.scrape_meta("mock"))
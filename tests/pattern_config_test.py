@@ -1,7 +1,16 @@
 from __future__ import annotations
 
+import pickle
 import re
+import sys
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
 
+import pytest
+
+from wypt import pattern_config
+from wypt.pattern_config import ENGINES
 from wypt.pattern_config import PatternConfig
 
 PATTERNS = {
@@ -45,3 +54,363 @@ def test_compile_patterns() -> None:
         assert isinstance(match, re.Pattern)
 
     assert MISSING not in patterns
+
+
+def test_combine_patterns_leaves_grouped_and_flagged_standalone() -> None:
+    patterns = {"plain": "[a-c]+", "grouped": "([a-c])+", "flagged": "(?i)[a-c]+"}
+    scanner = PatternConfig(patterns)
+    combined, standalone = scanner._get_gate(None)
+
+    assert combined is not None
+    assert standalone == ["grouped", "flagged"]
+
+
+def test_scan_returns_label_value_pairs() -> None:
+    scanner = PatternConfig(PATTERNS)
+    content = "mock@example.com and discord.com/api/webhooks/123/abc"
+
+    results = scanner.scan(content)
+
+    assert ("Basic Email", "mock@example.com") in results
+    assert ("Discord Webhook", "discord.com/api/webhooks/123/abc") in results
+
+
+def test_scan_matches_per_pattern_findall() -> None:
+    # Overlapping patterns must each report their own matches
+    patterns = {"short": "abc", "long": "abcdef", "grouped": "(b)cd"}
+    scanner = PatternConfig(patterns)
+    content = "xx abcdef yy abc"
+
+    expected = [
+        (label, value)
+        for label, pattern in scanner.pattern_iter()
+        for value in pattern.findall(content)
+    ]
+
+    assert scanner.scan(content) == expected
+
+
+def test_scan_returns_empty_without_match() -> None:
+    scanner = PatternConfig(PATTERNS)
+
+    assert scanner.scan("nothing to see here") == []
+
+
+@pytest.mark.parametrize(
+    ("pattern", "expected"),
+    (
+        ("AKIA[0-9A-Z]{16}", {"AKIA"}),
+        ("ghp_[0-9a-zA-Z]{36}", {"ghp_"}),
+        ("-----BEGIN [A-Z ]+-----", {"-----BEGIN "}),
+        ("(?:xoxb|xoxp)-[0-9]+", {"xox"}),
+        ("(?:ghp_|gho_|xoxb)[0-9]+", {"ghp_", "gho_", "xoxb"}),
+        ("[a-z]+(?:token)+", {"token"}),
+        ("discord\\.com/api/webhooks/\\d*/.+\\b", {"discord.com/api/webhooks/"}),
+        ("[\\w-]{24}\\.[\\w-]{6}", set()),
+        ("(?:abc)?def", {"def"}),
+        ("(?:abc|[0-9])", set()),
+        ("(?i)AKIA[0-9A-Z]{16}", set()),
+        ("ab", set()),
+    ),
+)
+def test_extract_literals(pattern: str, expected: set[str]) -> None:
+    scanner = PatternConfig({"mock": pattern})
+
+    assert scanner._literals.get("mock", set()) == expected
+
+
+@pytest.mark.skipif(
+    not (3, 11) <= sys.version_info[:2] <= (3, 13),
+    reason="private re parser layout only known for 3.11 - 3.13",
+)
+def test_prefilter_parser_available_on_supported_versions() -> None:
+    assert pattern_config.sre_parse is not None
+
+
+def test_scan_without_prefilter_parser() -> None:
+    with patch.object(pattern_config, "sre_parse", None):
+        scanner = PatternConfig({"aws": "AKIA[0-9A-Z]{4}"})
+
+    assert scanner._literals == {}
+    assert scanner.scan("key AKIAABCD") == [("aws", "AKIAABCD")]
+
+
+@pytest.mark.parametrize("use_automaton", (True, False))
+def test_scan_skips_patterns_without_literal(use_automaton: bool) -> None:
+    scanner = PatternConfig({"aws": "AKIA[0-9A-Z]{4}", "any": "[0-9]{3}"})
+    if use_automaton:
+        pytest.importorskip("ahocorasick")
+    else:
+        scanner._index._automaton = None
+
+    mock_pattern = MagicMock(wraps=scanner._patterns["aws"])
+    scanner._patterns["aws"] = mock_pattern
+
+    result = scanner.scan("nothing but 123")
+
+    assert mock_pattern.findall.call_count == 0
+    assert result == [("any", "123")]
+
+
+@pytest.mark.parametrize("use_automaton", (True, False))
+def test_scan_runs_patterns_with_literal_present(use_automaton: bool) -> None:
+    scanner = PatternConfig({"aws": "AKIA[0-9A-Z]{4}", "any": "[0-9]{3}"})
+    if use_automaton:
+        pytest.importorskip("ahocorasick")
+    else:
+        scanner._index._automaton = None
+
+    result = scanner.scan("key AKIA1234 here")
+
+    assert result == [("aws", "AKIA1234"), ("any", "123")]
+
+
+def test_pickle_recompiles_patterns() -> None:
+    scanner = PatternConfig(PATTERNS)
+
+    result = pickle.loads(pickle.dumps(scanner))
+
+    assert result._patterns.keys() == scanner._patterns.keys()
+    assert result._literals == scanner._literals
+
+
+def test_unknown_engine_falls_back_to_re(caplog: Any) -> None:
+    scanner = PatternConfig(PATTERNS, engine="mock")
+
+    assert scanner._engine == "re"
+    assert "Regex engine 'mock' unavailable" in caplog.text
+
+
+@pytest.mark.parametrize("engine", ("regex", "re2"))
+def test_compile_with_engine(engine: str) -> None:
+    if engine not in ENGINES:
+        pytest.skip(f"{engine} is not installed")
+    scanner = PatternConfig(
+        {"mock": "AKIA[0-9A-Z]{4}", "any": "[0-9]{3}"}, engine=engine
+    )
+
+    result = scanner.scan("key AKIA1234 here")
+
+    assert not isinstance(scanner._patterns["mock"], re.Pattern)
+    assert result == [("mock", "AKIA1234"), ("any", "123")]
+
+
+def test_compile_falls_back_per_pattern(caplog: Any) -> None:
+    # Back references are rejected by the mock engine, forcing `re`
+    mock_engine = MagicMock(error=re.error)
+    mock_engine.compile.side_effect = lambda value: re.compile(
+        value.replace("\\1", "(")
+    )
+    patterns = {"mock": "(a)\\1", "any": "[0-9]{3}"}
+
+    with patch.dict(ENGINES, {"mock": mock_engine}):
+        scanner = PatternConfig(patterns, engine="mock")
+        result = scanner.scan("aa 123")
+        _, standalone = scanner._get_gate(None)
+
+    assert "Engine 'mock' rejected" in caplog.text
+    assert scanner._patterns["mock"].pattern == "(a)\\1"
+    assert standalone == ["mock"]
+    assert result == [("mock", "a"), ("any", "123")]
+
+
+def test_pickle_keeps_engine() -> None:
+    scanner = PatternConfig(PATTERNS, engine="regex")
+
+    result = pickle.loads(pickle.dumps(scanner))
+
+    assert result._engine == scanner._engine
+
+
+def test_scan_records_stats() -> None:
+    scanner = PatternConfig({"aws": "AKIA[0-9A-Z]{4}", "any": "[0-9]{3}"})
+    content = "key AKIA1234 here 567"
+
+    scanner.scan(content)
+    scanner.scan("no digits")
+    stats = {stat.label: stat for stat in scanner.get_stats()}
+
+    assert stats["aws"].calls == 1
+    assert stats["aws"].hits == 1
+    assert stats["aws"].bytes_scanned == len(content)
+    assert stats["any"].calls == 1  # Gated out of the second scan
+    assert stats["any"].hits == 2
+    assert stats["any"].seconds > 0
+
+
+def test_pop_stats_resets_and_merge_stats_adds() -> None:
+    worker = PatternConfig({"aws": "AKIA[0-9A-Z]{4}", "any": "[0-9]{3}"})
+    scanner = PatternConfig({"aws": "AKIA[0-9A-Z]{4}", "any": "[0-9]{3}"})
+    worker.scan("key AKIA1234")
+    worker._stats["aws"].quarantined = True
+
+    popped = worker.pop_stats()
+    scanner.merge_stats(popped)
+    scanner.merge_stats(popped)
+    stats = {stat.label: stat for stat in scanner.get_stats()}
+
+    assert [stat.label for stat in popped] == ["aws", "any"]
+    assert stats["aws"].calls == 2
+    assert stats["aws"].hits == 2
+    assert stats["aws"].quarantined
+    assert worker.pop_stats() == []
+    assert worker._stats["aws"].quarantined
+
+
+def test_scan_quarantines_pattern_over_budget(caplog: Any) -> None:
+    scanner = PatternConfig(
+        {"aws": "AKIA[0-9A-Z]{4}", "any": "[0-9]{3}"}, time_budget=1
+    )
+    content = "key AKIA1234 here"
+
+    with patch("time.perf_counter", side_effect=[0, 0.1, 0, 2]):
+        first = scanner.scan(content)
+    second = scanner.scan(content)
+    stats = {stat.label: stat for stat in scanner.get_stats()}
+
+    assert first == [("aws", "AKIA1234"), ("any", "123")]
+    assert second == [("aws", "AKIA1234")]
+    assert stats["any"].quarantined
+    assert scanner._get_gate(None) == (None, [])
+    assert "Pattern 'any' took 2.000s" in caplog.text
+
+
+def test_pickle_keeps_time_budget() -> None:
+    scanner = PatternConfig(PATTERNS, time_budget=0.5)
+
+    result = pickle.loads(pickle.dumps(scanner))
+
+    assert result._time_budget == 0.5
+
+
+@pytest.mark.parametrize("engine", ("re", "regex", "re2"))
+def test_scan_bytes(engine: str) -> None:
+    if engine not in ENGINES:
+        pytest.skip(f"{engine} is not installed")
+    patterns = {"aws": "AKIA[0-9A-Z]{4}", "any": "[0-9]{3}", "grouped": "k(é)y"}
+    scanner = PatternConfig(patterns, engine=engine, as_bytes=True)
+
+    result = scanner.scan("kéy AKIA1234 here".encode())
+
+    assert scanner.scans_bytes
+    assert result == [("aws", "AKIA1234"), ("any", "123"), ("grouped", "é")]
+
+
+@pytest.mark.parametrize(
+    ("pattern", "content"),
+    ((r"caf\xe9\d+", b"caf\xe9123"), ("café\\d+", "café123".encode())),
+)
+def test_scan_bytes_prefilters_non_ascii_literal(pattern: str, content: bytes) -> None:
+    scanner = PatternConfig({"mock": pattern}, as_bytes=True)
+
+    result = scanner.scan(content)
+
+    assert [label for label, _ in result] == ["mock"]
+
+
+def test_scan_bytes_skips_patterns_without_literal() -> None:
+    scanner = PatternConfig({"aws": "AKIA[0-9A-Z]{4}"}, as_bytes=True)
+
+    assert scanner._index._automaton is None
+    assert scanner.scan(b"nothing here") == []
+
+
+@pytest.mark.parametrize(
+    ("overlap", "expected"),
+    (
+        (0, [("aws", "AKIA1234")]),
+        (8, [("aws", "AKIA1234"), ("aws", "AKIA5678")]),
+    ),
+)
+def test_scan_chunks_overlap(overlap: int, expected: list[tuple[str, str]]) -> None:
+    scanner = PatternConfig({"aws": "AKIA[0-9]{4}"})
+    chunks = ["xx AKIA1234 xx AKIA", "5678 yy AKIA1234"]
+
+    assert scanner.scan_chunks(chunks, overlap) == expected
+
+
+@pytest.mark.parametrize(
+    ("chunks", "overlap", "expected"),
+    (
+        # Match reaching the end of a chunk is left to the next scan
+        (["abc 12345", "678 xyz"], 10, [("num", "12345678")]),
+        # Rest of a reported match carried in the overlap is not reported
+        (["xx 12345 yy", "zz 9"], 4, [("num", "12345"), ("num", "9")]),
+    ),
+)
+def test_scan_chunks_variable_length_at_boundary(
+    chunks: list[str],
+    overlap: int,
+    expected: list[tuple[str, str]],
+) -> None:
+    scanner = PatternConfig({"num": "[0-9]+"})
+
+    assert scanner.scan_chunks(chunks, overlap) == expected
+
+
+def test_scan_chunks_reports_group_values() -> None:
+    scanner = PatternConfig({"kv": "(key)=([0-9]+)?", "one": "id:([a-z]+)"})
+
+    result = scanner.scan_chunks(["key= id:ab", "c"], 6)
+
+    assert result == [("kv", ("key", "")), ("one", "abc")]
+
+
+def test_scan_chunks_bytes() -> None:
+    scanner = PatternConfig({"aws": "AKIA[0-9]{4}"}, as_bytes=True)
+
+    result = scanner.scan_chunks([b"xx AKIA12", b"34 yy"], 6)
+
+    assert result == [("aws", "AKIA1234")]
+
+
+SCOPED_PATTERNS = {
+    "jwt": {"pattern": "eyJ[\\w-]+", "exclude_syntax": ["cpp", "C"]},
+    "conn": {"pattern": "[a-z]+://[^ ]+", "syntax": "JSON"},
+    "any": "[0-9]{3}",
+    "invalid": {"syntax": ["json"]},
+}
+
+
+@pytest.mark.parametrize(
+    ("syntax", "expected"),
+    (
+        (None, {"jwt", "conn", "any"}),
+        ("text", {"jwt", "any"}),
+        ("json", {"jwt", "conn", "any"}),
+        ("cpp", {"any"}),
+        ("c", {"any"}),
+    ),
+)
+def test_scan_scoped_by_syntax(syntax: str | None, expected: set[str]) -> None:
+    scanner = PatternConfig(SCOPED_PATTERNS)
+    content = "eyJhbGciOi postgres://user:pw@host 123"
+
+    result = scanner.scan(content, syntax=syntax)
+
+    assert scanner.is_syntax_scoped
+    assert {label for label, _ in result} == expected
+    assert scanner._get_scope(syntax) is scanner._get_scope(syntax)
+
+
+def test_invalid_pattern_entry_skipped(caplog: Any) -> None:
+    scanner = PatternConfig(SCOPED_PATTERNS)
+
+    assert "invalid" not in scanner._patterns
+    assert "Invalid pattern entry: invalid" in caplog.text
+
+
+def test_pickle_keeps_syntax_rules() -> None:
+    scanner = PatternConfig(SCOPED_PATTERNS)
+
+    result = pickle.loads(pickle.dumps(scanner))
+
+    assert result._syntax_rules == scanner._syntax_rules
+
+
+def test_scan_chunks_scoped_by_syntax() -> None:
+    scanner = PatternConfig(SCOPED_PATTERNS)
+
+    result = scanner.scan_chunks(["eyJhbGciOi 12", "3"], 2, syntax="cpp")
+
+    assert result == [("any", "123")]
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from wypt.pipeline import AsyncStage
+from wypt.pipeline import Stage
+
+
+def test_stage_handles_items_in_order() -> None:
+    handled: list[int] = []
+    stage = Stage("mock", handled.append)
+    stage.start()
+
+    for item in range(5):
+        stage.put(item)
+    stage.close()
+    stats = stage.get_stats()
+
+    assert handled == [0, 1, 2, 3, 4]
+    assert stats.items == 5
+    assert stats.depth == 0
+    assert stats.max_seconds >= stats.mean_seconds
+
+
+def test_stage_blocks_producer_when_full() -> None:
+    release = threading.Event()
+    stage: Stage[int] = Stage("mock", lambda _: release.wait(), maxsize=1)
+    stage.start()
+    stage.put(1)  # Taken by the stage thread, which then waits
+    stage.put(2)  # Fills the queue
+
+    producer = threading.Thread(target=stage.put, args=(3,))
+    producer.start()
+    producer.join(timeout=0.05)
+    blocked = producer.is_alive()
+
+    release.set()
+    producer.join()
+    stage.close()
+
+    assert blocked
+    assert stage.get_stats().max_depth == 1
+    assert stage.get_stats().blocked_seconds > 0
+
+
+def test_stage_continues_after_handler_error() -> None:
+    handled: list[int] = []
+
+    def handler(item: int) -> None:
+        if item == 1:
+            raise ValueError("mock")
+        handled.append(item)
+
+    stage = Stage("mock", handler)
+    stage.start()
+    for item in range(3):
+        stage.put(item)
+    with pytest.raises(ValueError):
+        stage.close()
+
+    assert handled == [0, 2]
+    assert stage.get_stats().errors == 1
+    stage.close()  # Raised once
+
+
+def test_close_unstarted_stage_does_nothing() -> None:
+    stage: Stage[int] = Stage("mock", print)
+
+    stage.close()
+
+    assert stage.get_stats().items == 0
+
+
+def test_async_stage_handles_items_at_once() -> None:
+    started: list[int] = []
+    release = asyncio.Event()
+
+    async def handler(item: int) -> None:
+        started.append(item)
+        if len(started) == 3:
+            release.set()
+        await release.wait()  # Only done once all three are in hand
+
+    closed: list[bool] = []
+
+    async def cleanup() -> None:
+        closed.append(True)
+
+    stage = AsyncStage("mock", handler, maxsize=3, cleanup=cleanup)
+    stage.start()
+    futures = [stage.put(item) for item in range(3)]
+    for future in futures:
+        future.result(timeout=1)
+    stage.close()
+    stats = stage.get_stats()
+
+    assert sorted(started) == [0, 1, 2]
+    assert closed == [True]
+    assert stats.items == 3
+    assert stats.max_depth == 3
+    assert stats.depth == 0
+
+
+def test_async_stage_blocks_producer_when_full() -> None:
+    release = threading.Event()
+
+    async def handler(item: int) -> None:
+        await asyncio.to_thread(release.wait)
+
+    stage = AsyncStage("mock", handler, maxsize=1)
+    stage.start()
+    stage.put(1)
+    full = stage.full
+
+    producer = threading.Thread(target=stage.put, args=(2,))
+    producer.start()
+    producer.join(timeout=0.05)
+    blocked = producer.is_alive()
+
+    release.set()
+    producer.join()
+    stage.close()
+
+    assert full
+    assert blocked
+    assert stage.get_stats().items == 2
+    assert stage.get_stats().blocked_seconds > 0
+
+
+def test_async_stage_raises_handler_error_on_close() -> None:
+    async def handler(item: int) -> None:
+        if item == 1:
+            raise ValueError("mock")
+
+    stage = AsyncStage("mock", handler)
+    stage.start()
+    for item in range(3):
+        stage.put(item)
+    with pytest.raises(ValueError):
+        stage.close()
+
+    assert stage.get_stats().items == 3
+    assert stage.get_stats().errors == 1
+    stage.close()  # Raised once
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import pytest
+
+from wypt.model import Meta
+from wypt.pull_queue import PullPriority
+from wypt.pull_queue import PullQueue
+
+NOW = 1_700_000_000
+
+
+def _meta(
+    key: str,
+    *,
+    date: int = NOW,
+    size: int = 0,
+    expire: int = 0,
+    syntax: str = "text",
+) -> Meta:
+    return Meta(key, "", "", str(date), str(size), str(expire), "", syntax, "", "0")
+
+
+def _pop_all(queue: PullQueue) -> list[str | None]:
+    return [queue.pop(NOW) for _ in range(len(queue))]
+
+
+@pytest.mark.parametrize(
+    ("first", "second"),
+    (
+        (_meta("expiring", expire=NOW + 60), _meta("forever")),
+        (_meta("soon", expire=NOW + 60), _meta("later", expire=NOW + 3_000)),
+        (_meta("small", size=100), _meta("large", size=1_000_000)),
+        (_meta("old", date=NOW - 3_000), _meta("new")),
+    ),
+)
+def test_pop_in_priority_order(first: Meta, second: Meta) -> None:
+    queue = PullQueue()
+    queue.add(second, NOW)
+    queue.add(first, NOW)
+
+    assert _pop_all(queue) == [first.key, second.key]
+
+
+def test_syntax_weights() -> None:
+    queue = PullQueue(PullPriority(syntax={"python": 1.0, "text": -1.0}))
+    queue.add(_meta("text"), NOW)
+    queue.add(_meta("python", syntax="python"), NOW)
+    queue.add(_meta("other", syntax="other"), NOW)
+
+    assert _pop_all(queue) == ["python", "other", "text"]
+
+
+def test_equal_scores_pop_in_order_added() -> None:
+    queue = PullQueue()
+    for key in ("a", "b", "c"):
+        queue.add(_meta(key), NOW)
+
+    assert _pop_all(queue) == ["a", "b", "c"]
+
+
+def test_pop_skips_and_counts_expired() -> None:
+    queue = PullQueue()
+    queue.add(_meta("expired", expire=NOW - 1), NOW - 60)
+    queue.add(_meta("alive"), NOW)
+
+    assert queue.pop(NOW) == "alive"
+    assert queue.pop(NOW) is None
+    assert queue.pulled == 1
+    assert queue.expired == 1
+
+
+def test_reset_counts_dropped_expired() -> None:
+    queue = PullQueue()
+    queue.add(_meta("expired", expire=NOW - 1), NOW - 60)
+    queue.add(_meta("alive"), NOW)
+
+    queue.reset([_meta("new")], NOW)
+
+    assert queue.expired == 1
+    assert _pop_all(queue) == ["new"]
+
+
+def test_requeue_last_returns_popped_key_with_its_priority() -> None:
+    queue = PullQueue()
+    queue.add(_meta("expiring", expire=NOW + 60), NOW)
+    queue.add(_meta("forever"), NOW)
+
+    assert queue.pop(NOW) == "expiring"
+    queue.requeue_last()
+    queue.requeue_last()  # Only once
+
+    assert _pop_all(queue) == ["expiring", "forever"]
+    assert queue.pulled == 2
+
+
+def test_invalid_meta_fields_score_as_zero() -> None:
+    meta = Meta("mock", "", "", "", "n/a", "", "", "", "", "")
+
+    assert PullPriority(expiry=1, size=1, age=0).score(meta, NOW) == 1.0
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+from wypt.rate_limiter import SharedTokenBucket
+from wypt.rate_limiter import TokenBucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def test_try_acquire_up_to_burst(clock: FakeClock) -> None:
+    bucket = TokenBucket(rate=1.0, burst=3, clock=clock)
+
+    results = [bucket.try_acquire() for _ in range(4)]
+
+    assert results == [True, True, True, False]
+
+
+def test_wait_time_is_sub_second(clock: FakeClock) -> None:
+    bucket = TokenBucket(rate=1.0, tokens=0.0, clock=clock)
+
+    clock.now += 0.25
+
+    assert bucket.wait_time() == pytest.approx(0.75)
+    assert not bucket.try_acquire()
+
+    clock.now += 0.75
+
+    assert bucket.wait_time() == 0.0
+    assert bucket.try_acquire()
+
+
+def test_refill_is_capped_at_burst(clock: FakeClock) -> None:
+    bucket = TokenBucket(rate=1.0, burst=2, tokens=0.0, clock=clock)
+
+    clock.now += 1_000
+
+    assert bucket.tokens == 2.0
+
+
+def test_negative_tokens_hold_bucket_closed(clock: FakeClock) -> None:
+    bucket = TokenBucket(rate=0.5, tokens=-1.0, clock=clock)
+
+    assert bucket.wait_time() == 4.0
+
+
+@pytest.mark.parametrize(("rate", "burst"), ((0.0, 1), (-1.0, 1), (1.0, 0)))
+def test_invalid_rate_or_burst(rate: float, burst: int) -> None:
+    with pytest.raises(ValueError):
+        TokenBucket(rate, burst)
+
+
+@pytest.mark.parametrize(("offset", "expected"), ((-1_000, 0.0), (0, 60.0), (30, 90.0)))
+def test_from_last_call(offset: int, expected: float) -> None:
+    bucket = TokenBucket.from_last_call(60.0, last_call=time.time() + offset)
+
+    assert bucket.wait_time() == pytest.approx(expected, abs=0.5)
+
+
+def test_shared_bucket_is_shared_between_connections(
+    tmp_path: Path,
+    clock: FakeClock,
+) -> None:
+    file = str(tmp_path / "limits.sqlite3")
+    first = SharedTokenBucket(sqlite3.connect(file), "mock", 1.0, 2, clock=clock)
+    second = SharedTokenBucket(sqlite3.connect(file), "mock", 1.0, 2, clock=clock)
+
+    results = [first.try_acquire(), second.try_acquire(), first.try_acquire()]
+
+    assert results == [True, True, False]
+    assert second.wait_time() == 1.0
+
+
+def test_shared_bucket_reads_hold_no_write_lock(tmp_path: Path) -> None:
+    file = str(tmp_path / "limits.sqlite3")
+    bucket = SharedTokenBucket(sqlite3.connect(file, timeout=0), "mock", 1.0)
+    other = sqlite3.connect(file, timeout=0)
+
+    other.execute("BEGIN IMMEDIATE;")  # Reads raise "database is locked" if writing
+    tokens = bucket.tokens
+    wait = bucket.wait_time()
+    other.rollback()
+
+    assert tokens == 1.0
+    assert wait == 0.0
+
+
+def test_shared_bucket_survives_restart(tmp_path: Path, clock: FakeClock) -> None:
+    file = str(tmp_path / "limits.sqlite3")
+    bucket = SharedTokenBucket(sqlite3.connect(file), "mock", 0.1, clock=clock)
+    bucket.try_acquire()
+    clock.now += 5
+
+    restarted = SharedTokenBucket(sqlite3.connect(file), "mock", 0.1, clock=clock)
+
+    assert restarted.wait_time() == pytest.approx(5.0)
+
+
+def test_shared_bucket_ignores_clock_stepping_back(clock: FakeClock) -> None:
+    bucket = SharedTokenBucket(sqlite3.connect(":memory:"), "mock", 1.0, clock=clock)
+    bucket.try_acquire()
+
+    clock.now -= 1_000
+
+    assert bucket.tokens == 0.0
+    clock.now += 1
+    assert bucket.try_acquire()
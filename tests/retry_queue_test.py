@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import pytest
+
+from tests.conftest import META_ROWS
+from wypt.database import Database
+from wypt.retry_queue import RetryQueue
+
+KEY = META_ROWS[0].key
+
+
+@pytest.fixture
+def retries(db: Database) -> RetryQueue:
+    db.insert_metas(META_ROWS)
+    return RetryQueue(db, base_delay=10, max_delay=25, max_attempts=4)
+
+
+def test_fail_backs_off_exponentially(retries: RetryQueue) -> None:
+    delays = [retries.fail(KEY, "mock", now=0).next_attempt for _ in range(3)]
+
+    assert delays == [10, 20, 25]
+    assert retries.failed == 3
+    assert retries.dead == 0
+
+
+def test_fail_dead_letters_after_max_attempts(
+    retries: RetryQueue, db: Database
+) -> None:
+    for _ in range(4):
+        retry = retries.fail(KEY, "mock", now=0)
+
+    assert retry.dead
+    assert retries.dead == 1
+    assert retries.due(now=1_000) == []
+    assert KEY not in [meta.key for meta in db.get_metas_to_pull(limit=100)]
+
+
+def test_due_returns_metas_once_backoff_passed(retries: RetryQueue) -> None:
+    retries.fail(KEY, "mock", now=0)
+
+    assert retries.due(now=5) == []
+    assert [meta.key for meta in retries.due(now=10)] == [KEY]
+
+
+def test_succeed_clears_retry(retries: RetryQueue, db: Database) -> None:
+    retries.fail(KEY, "mock", now=0)
+    retries.due(now=10)
+
+    retries.succeed(KEY)
+
+    assert db.get_retry(KEY) is None
+    assert retries.recovered == 1
+
+
+def test_succeed_ignores_keys_not_retried(retries: RetryQueue, db: Database) -> None:
+    retries.fail(KEY, "mock", now=0)
+
+    retries.succeed(KEY)
+
+    assert db.get_retry(KEY) is not None
+    assert retries.recovered == 0
@@ -1,16 +1,26 @@
 from __future__ import annotations
 
+from pathlib import Path
 from typing import Any
+from unittest.mock import patch
 
 import pytest
 
 from wypt.database import Database
+from wypt.database_profile import DatabaseProfile
 from wypt.pattern_config import PatternConfig
+from wypt.rate_limiter import SharedTokenBucket
 from wypt.runtime import Runtime
 from wypt.runtime import _Config
 
 TEST_CONFIG = "tests/fixture/wypt.toml"
-TEST_PATTERNS = {"Basic Email", "Broken Pattern", "Discord Webhook", "JWT Token"}
+TEST_PATTERNS = {
+    "Basic Email",
+    "Broken Pattern",
+    "Connection String",
+    "Discord Webhook",
+    "JWT Token",
+}
 
 
 def test_load_config() -> None:
@@ -107,6 +117,40 @@ def test_load_toml_section(
     assert logtext in caplog.text
 
 
+def test_load_database_profile() -> None:
+    runtime = Runtime()
+
+    profile = runtime.load_database_profile(TEST_CONFIG)
+
+    assert profile == DatabaseProfile(
+        synchronous="normal", cache_size=-1024, temp_store="memory"
+    )
+
+
+def test_load_database_profile_falls_back_to_default(caplog: Any) -> None:
+    runtime = Runtime()
+
+    profile = runtime.load_database_profile("pyproject.toml")
+    with patch.object(runtime, "_load_toml_section", return_value={"profile": "x"}):
+        unknown = runtime.load_database_profile()
+
+    assert profile == unknown == DatabaseProfile()
+    assert "section missing" not in caplog.text
+    assert "Unknown database profile" in caplog.text
+
+
+def test_connect_database_applies_profile(caplog: Any) -> None:
+    runtime = Runtime()
+    runtime._database_profile = DatabaseProfile(cache_size=-1024)
+
+    with caplog.at_level("INFO"):
+        database = runtime._connect_database()
+    cache_size = database._dbconn.execute("PRAGMA cache_size;").fetchone()[0]
+
+    assert cache_size == -1024
+    assert "Database settings applied: {'cache_size': -1024}" in caplog.text
+
+
 def test_get_api_returns_cached_copy() -> None:
     runtime = Runtime()
 
@@ -116,6 +160,66 @@ def test_get_api_returns_cached_copy() -> None:
     assert api is api_too
 
 
+def test_get_api_uses_configured_limits() -> None:
+    runtime = Runtime()
+    runtime._config = _Config(scrape_cooldown=30.0, item_burst=3)
+
+    api = runtime.get_api()
+
+    assert api._scrape_limiter.rate == 1 / 30
+    assert api._item_limiter.burst == 3
+    assert not api.can_scrape_item
+
+
+def test_get_api_shares_limits_through_file(tmp_path: Path) -> None:
+    file = str(tmp_path / "limits.sqlite3")
+    runtime = Runtime()
+    runtime._config = _Config(rate_limit_file=file)
+    other = Runtime()
+    other._config = _Config(rate_limit_file=file)
+
+    api = runtime.get_api()
+    other_api = other.get_api()
+
+    assert isinstance(api._scrape_limiter, SharedTokenBucket)
+    assert not api.can_scrape
+    assert other_api.scrape_delay == pytest.approx(api.scrape_delay, abs=0.5)
+
+
+def test_get_async_api_shares_limiters_of_api() -> None:
+    runtime = Runtime()
+
+    api = runtime.get_api()
+    async_api = runtime.get_async_api()
+
+    assert async_api is runtime.get_async_api()
+    assert async_api._scrape_limiter is api._scrape_limiter
+    assert async_api._item_limiter is api._item_limiter
+
+
+def test_shared_limiters_use_own_connections(tmp_path: Path) -> None:
+    runtime = Runtime()
+    runtime._config = _Config(rate_limit_file=str(tmp_path / "limits.sqlite3"))
+
+    api = runtime.get_api()
+
+    assert isinstance(api._scrape_limiter, SharedTokenBucket)
+    assert isinstance(api._item_limiter, SharedTokenBucket)
+    assert api._scrape_limiter._dbconn is not api._item_limiter._dbconn
+
+
+def test_get_pull_priority_uses_config() -> None:
+    runtime = Runtime()
+    runtime._config = _Config(
+        priority_size_weight=2.0, priority_syntax_weights={"c": 1}
+    )
+
+    priority = runtime.get_pull_priority()
+
+    assert priority.size == 2.0
+    assert priority.syntax == {"c": 1}
+
+
 def test_set_database() -> None:
     runtime = Runtime()
 
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import math
+import threading
+
+import pytest
+
+from wypt.scheduler import Scheduler
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def scheduler(clock: FakeClock) -> Scheduler:
+    return Scheduler(clock=clock)
+
+
+def test_run_pending_runs_due_jobs_in_deadline_order(
+    scheduler: Scheduler,
+    clock: FakeClock,
+) -> None:
+    ran: list[str] = []
+
+    def slow() -> float:
+        ran.append("slow")
+        return 60.0
+
+    def fast() -> float:
+        ran.append("fast")
+        return 1.0
+
+    scheduler.add_job("slow", slow, delay=2.0)
+    scheduler.add_job("fast", fast, delay=1.0)
+
+    assert scheduler.run_pending() == 1.0
+    assert ran == []
+
+    clock.now += 2.0
+    next_due = scheduler.run_pending()
+
+    assert ran == ["fast", "slow"]
+    assert next_due == 1.0
+
+
+def test_run_pending_records_drift(scheduler: Scheduler, clock: FakeClock) -> None:
+    scheduler.add_job("mock", lambda: 1.0, delay=1.0)
+
+    clock.now += 1.5
+    scheduler.run_pending()
+    clock.now += 1.0
+    scheduler.run_pending()
+
+    (stats,) = scheduler.get_stats()
+    assert stats.runs == 2
+    assert stats.max_drift == 0.5
+    assert stats.mean_drift == 0.25
+
+
+def test_job_returning_none_is_removed(scheduler: Scheduler) -> None:
+    calls: list[int] = []
+    scheduler.add_job("mock", lambda: calls.append(1))
+
+    assert scheduler.run_pending() == math.inf
+    assert scheduler.run_pending() == math.inf
+    assert calls == [1]
+
+
+def test_wake_runs_parked_job(scheduler: Scheduler) -> None:
+    calls: list[int] = []
+
+    def job() -> float:
+        calls.append(1)
+        return math.inf
+
+    scheduler.add_job("mock", job, delay=math.inf)
+
+    scheduler.run_pending()
+    scheduler.wake("mock")
+    scheduler.run_pending()
+
+    assert calls == [1]
+    assert scheduler.get_stats()[0].max_drift == 0.0
+
+
+def test_wake_during_run_is_kept(scheduler: Scheduler) -> None:
+    calls: list[int] = []
+
+    def job() -> float:
+        calls.append(1)
+        if len(calls) == 1:
+            scheduler.wake("mock")
+        return math.inf
+
+    scheduler.add_job("mock", job)
+    scheduler.run_pending()
+
+    assert calls == [1, 1]
+
+
+def test_wake_unknown_job_is_ignored(scheduler: Scheduler) -> None:
+    scheduler.wake("mock")
+
+    assert scheduler.run_pending() == math.inf
+
+
+def test_run_waits_for_wake_from_thread() -> None:
+    scheduler = Scheduler()
+    calls: list[int] = []
+
+    def job() -> float:
+        calls.append(1)
+        if len(calls) == 2:
+            scheduler.stop()
+        return math.inf
+
+    scheduler.add_job("mock", job)
+    timer = threading.Timer(0.01, scheduler.wake, args=("mock",))
+    timer.start()
+
+    scheduler.run()
+    timer.join()
+
+    assert calls == [1, 1]
+
+
+def test_run_returns_without_jobs() -> None:
+    scheduler = Scheduler()
+
+    scheduler.run()
+
+    assert scheduler.get_stats() == []
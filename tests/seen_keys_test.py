@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from wypt.seen_keys import SeenKeys
+
+
+def test_filter_new_returns_unseen_keys() -> None:
+    seen = SeenKeys()
+
+    first = seen.filter_new(["a", "b"])
+    second = seen.filter_new(["b", "c", "c"])
+
+    assert first == {"a", "b"}
+    assert second == {"c"}
+    assert len(seen) == 3
+
+
+def test_update_drops_oldest_beyond_capacity() -> None:
+    seen = SeenKeys(capacity=2)
+
+    seen.update(["a", "b"])
+    seen.update(["a"])  # Refreshes "a" so "b" is oldest
+    seen.update(["c"])
+
+    assert "a" in seen
+    assert "b" not in seen
+    assert "c" in seen
+
+
+def test_zero_capacity_holds_nothing() -> None:
+    seen = SeenKeys(capacity=0)
+
+    assert seen.filter_new(["a"]) == {"a"}
+    assert seen.filter_new(["a"]) == {"a"}